@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark: verificaciones por segundo de tieneError con la búsqueda anterior
+(decodificar toda la respuesta y buscar hasta cinco patrones) contra el
+detector incremental de utils.soap_errors, sobre respuestas de pedimento
+completo de distintos tamaños.
+
+Uso:
+    python benchmarks/bench_soap_errors.py --sizes 16 1024 8192 --seconds 1
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.vucem_stub import load_pedimento_completo
+from utils.soap_errors import detect_soap_error
+
+
+def legacy_has_soap_error(content):
+    """Detección anterior de MainProcess._has_soap_error"""
+    xml_content = content.decode('utf-8')
+    if '<ns3:tieneError>true</ns3:tieneError>' in xml_content:
+        return True
+    for pattern in ('<tieneError>true</tieneError>', ':tieneError>true</', 'tieneError="true"'):
+        if pattern in xml_content:
+            return True
+    return False
+
+
+def checks_per_second(check, content, seconds):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(10):
+            check(content)
+        count += 10
+    return count / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la detección de errores SOAP")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[16, 1024, 8192], help="Tamaños de respuesta en KB")
+    parser.add_argument("--seconds", '-s', type=float, default=1.0, help="Duración por tamaño y modo")
+    args = parser.parse_args()
+
+    print(f"{'tamaño':>10} {'anterior/s':>12} {'incremental/s':>14} {'mejora':>8}")
+    for size_kb in args.sizes:
+        content = load_pedimento_completo(size_kb)
+        assert not legacy_has_soap_error(content) and detect_soap_error(content) is None
+        legacy = checks_per_second(legacy_has_soap_error, content, args.seconds)
+        streaming = checks_per_second(detect_soap_error, content, args.seconds)
+        print(f"{size_kb:>8}KB {legacy:>12,.0f} {streaming:>14,.0f} {streaming / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
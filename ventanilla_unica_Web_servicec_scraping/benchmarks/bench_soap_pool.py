@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latencia por petición SOAP con un httpx.Client nuevo por llamada
+(comportamiento anterior) contra el pool compartido de SOAPController.
+
+Levanta un stub HTTPS local con un certificado autofirmado generado con
+openssl, así que no toca ventanillaunica.gob.mx.
+
+El modo pooled no pasa por el token bucket global de VUCEM
+(SOAP_RATE_LIMIT_RPS), que de otro modo mediría la espera del límite y no
+el pool; --rate-limit lo aplica si se quiere comparar con él.
+
+Uso:
+    python benchmarks/bench_soap_pool.py --requests 200
+    python benchmarks/bench_soap_pool.py --requests 200 --rate-limit 10
+"""
+
+import argparse
+import os
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controllers.SOAPService import SOAPController
+from utils.rate_limiter import TokenBucket
+
+RESPONSE_BODY = (
+    b'<?xml version="1.0" encoding="UTF-8"?>'
+    b'<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/"><S:Body>'
+    b'<ns3:respuesta xmlns:ns3="http://www.ventanillaunica.gob.mx/pedimentos/ws/oxml/comunes">'
+    b'<ns3:tieneError>false</ns3:tieneError></ns3:respuesta></S:Body></S:Envelope>'
+)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Necesario para keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(RESPONSE_BODY)))
+        self.end_headers()
+        self.wfile.write(RESPONSE_BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_tls_stub(cert_dir):
+    """Genera un certificado autofirmado y levanta el stub en un puerto libre"""
+    cert_file = os.path.join(cert_dir, 'cert.pem')
+    key_file = os.path.join(cert_dir, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-keyout', key_file, '-out', cert_file, '-days', '1', '-subj', '/CN=localhost'],
+        check=True, capture_output=True
+    )
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(cert_file, key_file)
+    server.socket = server_context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"https://127.0.0.1:{server.server_address[1]}"
+
+
+def client_context():
+    """Mismo contexto SECLEVEL=1 que producción, sin validar el certificado local"""
+    context = ssl.create_default_context()
+    context.set_ciphers('DEFAULT:@SECLEVEL=1')
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def run_legacy(base_url, context, total):
+    """Un httpx.Client por petición, como hacía make_request antes"""
+    latencies = []
+    for _ in range(total):
+        start = time.perf_counter()
+        with httpx.Client(verify=context, timeout=5) as client:
+            client.post(f"{base_url}/ventanilla-ws-pedimentos/ConsultarPedimentoCompletoService?wsdl",
+                        content=b'<x/>').raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_pooled(base_url, context, total, rate_limit=0):
+    """Pool compartido de SOAPController, con su propio límite de peticiones por segundo"""
+    latencies = []
+    with SOAPController(base_url=base_url, verify=context, rate_limiter=TokenBucket(rate_limit)) as controller:
+        for _ in range(total):
+            start = time.perf_counter()
+            controller.make_request(
+                'ventanilla-ws-pedimentos/ConsultarPedimentoCompletoService?wsdl', data='<x/>'
+            )
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{name:<10} media={statistics.mean(latencies) * 1000:7.2f}ms "
+          f"p50={statistics.median(latencies) * 1000:7.2f}ms p95={p95 * 1000:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pool de conexiones SOAP")
+    parser.add_argument("--requests", '-n', type=int, default=200, help="Peticiones por modo")
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="Peticiones por segundo del modo pooled (default 0, sin límite)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cert_dir:
+        server, base_url = start_tls_stub(cert_dir)
+        context = client_context()
+        try:
+            print(f"Stub TLS en {base_url}, {args.requests} peticiones por modo")
+            report("legacy", run_legacy(base_url, context, args.requests))
+            report("pooled", run_pooled(base_url, context, args.requests, args.rate_limit))
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
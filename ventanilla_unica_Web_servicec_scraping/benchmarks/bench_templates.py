@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: renders por segundo de cada template SOAP con el render anterior
+(leer el archivo en cada llamada + string.Template + reemplazos manuales)
+contra los templates precompilados de SOAPTemplateManager, uno por uno y en
+lotes de una página (render_batch, --batch envelopes de --importers importadores).
+
+Uso:
+    python benchmarks/bench_templates.py --seconds 1
+"""
+
+import argparse
+import os
+import sys
+import time
+from string import Template
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from payload_structure.soap_models import CredencialesSOAP
+from payload_structure.template_manager import SOAPTemplateManager
+
+CREDENTIALS = {'username': 'MFN031210AT9', 'password': 'S3cr3t&<pass>'}
+FIELDS = {
+    'consultar_pedimento_completo': {'aduana': '07', 'patente': '1800', 'pedimento': '1005033'},
+    'consultar_partida': {'aduana': '07', 'patente': '1800', 'pedimento': '1005033',
+                          'numero_operacion': '21196267099', 'numero_partida': '16'},
+    'consultar_remesas': {'aduana': '07', 'patente': '1800', 'pedimento': '1005033',
+                          'numero_operacion': '21196267099'},
+    'consultar_estado_pedimento': {'aduana': '07', 'patente': '1800', 'pedimento': '1005033',
+                                   'numero_operacion': '21196267099'},
+    'consultar_acuses': {'id_edocument': 'COVE2474LMA64'},
+}
+
+
+def legacy_render(templates_dir, template_name, **kwargs):
+    """Render anterior: archivo leído en cada llamada, Template.substitute y reemplazos"""
+    with open(os.path.join(templates_dir, f"{template_name}.xml"), 'r', encoding='utf-8') as file:
+        template_content = file.read()
+    try:
+        rendered = Template(template_content).substitute(**kwargs)
+    except Exception:
+        rendered = template_content
+        for key, value in kwargs.items():
+            rendered = rendered.replace(f"{{{key}}}", str(value))
+    if template_content == rendered:
+        for key, value in kwargs.items():
+            placeholder = f"{{{key}}}"
+            if placeholder in template_content:
+                rendered = rendered.replace(placeholder, str(value))
+    return rendered.encode('utf-8')
+
+
+def renders_per_second(render, seconds, per_call=1):
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            render()
+        count += 100 * per_call
+    return count / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los templates SOAP")
+    parser.add_argument("--seconds", '-s', type=float, default=1.0, help="Duración por template y modo")
+    parser.add_argument("--batch", type=int, default=10, help="Envelopes por lote (tamaño de página)")
+    parser.add_argument("--importers", type=int, default=3, help="Importadores distintos por lote")
+    args = parser.parse_args()
+
+    manager = SOAPTemplateManager()
+    importers = [CredencialesSOAP(f"{CREDENTIALS['username']}{n}", CREDENTIALS['password']) for n in range(args.importers)]
+    print(f"{'template':<30} {'anterior/s':>12} {'compilado/s':>12} {'lote/s':>12} {'mejora':>8}")
+    for template_name, fields in FIELDS.items():
+        values = {**CREDENTIALS, **fields}
+        consulta = type('Consulta', (), fields)()
+        batch = [(importers[n % args.importers], consulta) for n in range(args.batch)]
+        legacy = renders_per_second(lambda: legacy_render(manager.templates_dir, template_name, **values), args.seconds)
+        compiled = renders_per_second(lambda: manager.render(template_name, **values), args.seconds)
+        batched = renders_per_second(lambda: manager.render_batch(template_name, batch), args.seconds, args.batch)
+        print(f"{template_name:<30} {legacy:>12,.0f} {compiled:>12,.0f} {batched:>12,.0f} {batched / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+Stub local de VUCEM para pruebas de carga y benchmarks sin tocar
+ventanillaunica.gob.mx.
+
+Atiende los cinco servicios SOAP que consulta el scraper (pedimento completo,
+partida, remesas, estado de pedimento y acuses). El servicio se reconoce por
+el elemento de petición del Body, tomado de los templates de
+payload_structure/templates, así que un envelope mal formado falla como
+fallaría contra VUCEM. La respuesta de pedimento completo parte de una
+respuesta real (benchmarks/samples/) y se puede inflar al tamaño deseado.
+
+Con --api también simula los endpoints del backend que usa MainProcess
+(servicios pendientes, credenciales VUCEM y documentos), de modo que una
+corrida completa no necesita red:
+
+    python benchmarks/vucem_stub.py --port 8089 --services 500 --latency-ms 300
+    SOAP_SERVICE_URL=http://127.0.0.1:8089 API_URL=http://127.0.0.1:8089/api/v1 python main.py --end_page 50
+
+El resultado de cada petición (latencia, error HTTP, 429, timeout o
+tieneError=true) depende solo de --seed, de la consulta y de cuántas veces se
+ha repetido, no del orden en que lleguen, así que las corridas son repetibles
+con cualquier número de hilos. GET /__stats__ devuelve los contadores.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'payload_structure', 'templates')
+SAMPLE_PEDIMENTO_COMPLETO = os.path.join(BASE_DIR, 'benchmarks', 'samples', 'consultar_pedimento_completo_respuesta.xml')
+
+ENVELOPE_NS = 'http://schemas.xmlsoap.org/soap/envelope/'
+RESPUESTA_NS = 'http://www.ventanillaunica.gob.mx/common/ws/oxml/respuesta'
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+
+
+@dataclass
+class StubConfig:
+    """Comportamiento del stub; las tasas son probabilidades por petición SOAP"""
+    latency_ms: float = 0              # Mediana (lognormal) o media del resto de distribuciones
+    latency_dist: str = 'lognormal'
+    latency_spread: float = 0.5        # sigma en lognormal, ±fracción en uniform
+    error_rate: float = 0              # 500 con SOAP Fault
+    throttle_rate: float = 0           # 429
+    timeout_rate: float = 0            # No responde hasta pasados hang_seconds
+    hang_seconds: float = 30
+    soap_error_rate: float = 0         # 200 con tieneError=true
+    response_kb: int = 0               # Tamaño mínimo de pedimento completo (0 = el de la muestra)
+    gzip: bool = True                  # Comprime si el cliente manda Accept-Encoding: gzip
+    seed: int = 0
+    api: bool = True                   # Simular también el backend
+    services: int = 100                # Servicios pendientes (servicio 3) en el backend simulado
+    importers: int = 5
+    importer_skew: float = 0           # 0 = reparto uniforme; >0 concentra servicios en los primeros importadores
+    page_size: int = 10
+
+
+def load_services(templates_dir: str = TEMPLATES_DIR) -> dict:
+    """Elemento de petición -> (template, namespace) de cada template SOAP"""
+    services = {}
+    for name in sorted(os.listdir(templates_dir)):
+        if not name.endswith('.xml'):
+            continue
+        with open(os.path.join(templates_dir, name), 'r', encoding='utf-8') as file:
+            xml = file.read()
+        prefix, element = re.search(r'<\w+:Body>\s*<(\w+):(\w+)', xml).groups()
+        namespace = re.search(rf'xmlns:{prefix}="([^"]+)"', xml).group(1)
+        services[element] = (name[:-len('.xml')], namespace)
+    return services
+
+
+def numero_operacion(aduana, patente, pedimento) -> str:
+    """Número de operación determinista para un pedimento"""
+    digest = hashlib.sha256(f"{aduana}|{patente}|{pedimento}".encode('utf-8')).hexdigest()
+    return str(10 ** 10 + int(digest[:12], 16) % (9 * 10 ** 10))
+
+
+def load_pedimento_completo(response_kb: int) -> bytes:
+    """
+    Respuesta de muestra con marcadores para pedimento y número de operación,
+    inflada repitiendo bloques <ns2:descargos> hasta response_kb
+    """
+    with open(SAMPLE_PEDIMENTO_COMPLETO, 'r', encoding='utf-8') as file:
+        xml = file.read()
+    xml = re.sub(r'<ns2:numeroOperacion>\d+</ns2:numeroOperacion>',
+                 '<ns2:numeroOperacion>@@OPERACION@@</ns2:numeroOperacion>', xml, count=1)
+    xml = re.sub(r'(<ns2:pedimento>\s*<ns2:pedimento>)\d+(</ns2:pedimento>)', r'\1@@PEDIMENTO@@\2', xml, count=1)
+    descargo = re.search(r'\s*<ns2:descargos>.*?</ns2:descargos>', xml, re.S).group(0)
+    missing = response_kb * 1024 - len(xml.encode('utf-8'))
+    if missing > 0:
+        position = xml.index('</ns2:descargos>') + len('</ns2:descargos>')
+        copies = math.ceil(missing / len(descargo.encode('utf-8')))
+        xml = xml[:position] + descargo * copies + xml[position:]
+    return xml.encode('utf-8')
+
+
+def soap_respuesta(element: str, namespace: str, body: str = '', mensaje: str = None) -> bytes:
+    """Envelope de respuesta; con mensaje se marca tieneError=true"""
+    element = element.replace('Peticion', 'Respuesta')
+    error = f'<ns3:error><ns3:mensaje>{mensaje}</ns3:mensaje></ns3:error>' if mensaje else ''
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><S:Envelope xmlns:S="{ENVELOPE_NS}"><S:Body>'
+        f'<ns2:{element} xmlns:ns2="{namespace}" xmlns:ns3="{RESPUESTA_NS}">'
+        f'<ns3:tieneError>{"true" if mensaje else "false"}</ns3:tieneError>{error}{body}'
+        f'</ns2:{element}></S:Body></S:Envelope>'
+    ).encode('utf-8')
+
+
+def soap_fault(message: str) -> bytes:
+    return (
+        f'<?xml version="1.0" encoding="UTF-8"?><S:Envelope xmlns:S="{ENVELOPE_NS}"><S:Body><S:Fault>'
+        f'<faultcode>S:Server</faultcode><faultstring>{message}</faultstring>'
+        f'</S:Fault></S:Body></S:Envelope>'
+    ).encode('utf-8')
+
+
+class BackendState:
+    """Backend simulado: servicios de procesamiento, credenciales y documentos"""
+
+    def __init__(self, config: StubConfig):
+        rng = random.Random(config.seed)
+        self.page_size = config.page_size
+        self.importers = [f"STB{index:06d}AB{index % 10}" for index in range(config.importers)]
+        weights = [1 / (rank + 1) ** config.importer_skew for rank in range(config.importers)]
+        self.services = {}
+        for service_id in range(1, config.services + 1):
+            importer = rng.choices(self.importers, weights)[0]
+            self.services[service_id] = {
+                'id': service_id,
+                'estado': 1,
+                'servicio': 3,
+                'tipo_procesamiento': 2,
+                'pedimento': {
+                    'id': f'ped-{service_id}',
+                    'contribuyente': importer,
+                    'aduana': '07',
+                    'patente': '1800',
+                    'pedimento': str(1000000 + service_id)
+                }
+            }
+        self.documents = 0
+        self.credential_requests = 0
+        self.pedimentos = {}
+        self._next_id = config.services + 1
+        self._lock = threading.Lock()
+
+    def list_services(self, query: dict):
+        """GET customs/procesamientopedimentos/ con la paginación de DRF (404 fuera de rango)"""
+        page = int(query.get('page', ['1'])[0])
+        page_size = int(query.get('page_size', [self.page_size])[0])
+        estado = int(query.get('estado', ['1'])[0])
+        servicio = int(query.get('servicio', ['3'])[0])
+        with self._lock:
+            pending = [service for service in self.services.values()
+                       if service['estado'] == estado and service['servicio'] == servicio]
+            start = (page - 1) * page_size
+            if page < 1 or (start >= len(pending) and page > 1):
+                return 404, {'detail': 'Invalid page.'}
+            results = [dict(service) for service in pending[start:start + page_size]]
+        return 200, {
+            'count': len(pending),
+            'next': page + 1 if start + page_size < len(pending) else None,
+            'previous': page - 1 if page > 1 else None,
+            'organizacion': 'org-stub',
+            'results': results
+        }
+
+    def create_service(self, data: dict):
+        with self._lock:
+            service_id = self._next_id
+            self._next_id += 1
+            pedimento = data.get('pedimento')
+            original = next((service['pedimento'] for service in self.services.values()
+                             if service['pedimento']['id'] == pedimento), {'id': pedimento})
+            self.services[service_id] = {**data, 'id': service_id, 'pedimento': dict(original)}
+        return 201, {'id': service_id, **data}
+
+    def update_service(self, service_id: int, data: dict):
+        with self._lock:
+            service = self.services.get(service_id)
+            if service is None:
+                return 404, {'detail': 'Not found.'}
+            service.update({key: value for key, value in data.items() if key != 'pedimento'})
+        return 200, {'id': service_id, **data}
+
+    def update_pedimento(self, pedimento_id: str, data: dict):
+        with self._lock:
+            if not any(service['pedimento']['id'] == pedimento_id for service in self.services.values()):
+                return 404, {'detail': 'Not found.'}
+            self.pedimentos.setdefault(pedimento_id, {}).update(data)
+        return 200, {'id': pedimento_id, **data}
+
+    def credentials(self, query: dict):
+        """GET vucem/vucem/ filtrando por usuario o por usuario__in (lista separada por comas)"""
+        if 'usuario__in' in query:
+            usuarios = query['usuario__in'][0].split(',')
+        else:
+            usuarios = [query.get('usuario', [''])[0]]
+        with self._lock:
+            self.credential_requests += 1
+        return 200, [{
+            'id': f'cred-{usuario}', 'usuario': usuario, 'password': 'stub-password', 'patente': '1800',
+            'is_importador': True, 'acusecove': True, 'acuseedocument': True, 'is_active': True,
+            'created_at': '', 'updated_at': '', 'created_by': '', 'updated_by': '', 'organizacion': 'org-stub'
+        } for usuario in usuarios if usuario in self.importers]
+
+    def add_document(self):
+        with self._lock:
+            self.documents += 1
+            return 201, {'id': f'doc-{self.documents}'}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            estados = {}
+            for service in self.services.values():
+                key = f"servicio{service['servicio']}_estado{service['estado']}"
+                estados[key] = estados.get(key, 0) + 1
+            return {'services': estados, 'documents': self.documents, 'pedimentos': len(self.pedimentos),
+                    'credential_requests': self.credential_requests}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Necesario para keep-alive
+    disable_nagle_algorithm = True
+
+    @property
+    def stub(self) -> 'VUCEMStub':
+        return self.server.stub
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/__stats__':
+            return self._send_json(200, self.stub.stats())
+        self._api('GET', url, b'')
+
+    def do_PUT(self):
+        self._api('PUT', urlsplit(self.path), self._read_body())
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        body = self._read_body()
+        if url.path.startswith('/api/'):
+            return self._api('POST', url, body)
+        self._soap(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def _send(self, status: int, body: bytes, content_type: str, compress: bool = False):
+        headers = {'Content-Type': content_type}
+        if compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+        try:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # El cliente ya se fue (timeout inyectado)
+        return len(body)
+
+    def _send_json(self, status: int, data):
+        self._send(status, json.dumps(data).encode('utf-8'), 'application/json')
+
+    def _soap(self, body: bytes):
+        self.stub.count('soap_bytes_out', self.stub.handle_soap(self, body))
+
+    def _api(self, method: str, url, body: bytes):
+        backend = self.stub.backend
+        path = url.path.split('/api/v1/', 1)[-1]
+        query = parse_qs(url.query)
+        self.stub.count(f'api_{method}')
+        if backend is None:
+            return self._send_json(404, {'detail': 'API simulada deshabilitada (--api)'})
+        if path == 'customs/procesamientopedimentos/' and method == 'GET':
+            return self._send_json(*backend.list_services(query))
+        if path == 'customs/procesamientopedimentos/' and method == 'POST':
+            return self._send_json(*backend.create_service(json.loads(body or b'{}')))
+        match = re.fullmatch(r'customs/procesamientopedimentos/(\d+)/', path)
+        if match and method == 'PUT':
+            return self._send_json(*backend.update_service(int(match.group(1)), json.loads(body or b'{}')))
+        match = re.fullmatch(r'customs/pedimentos/([^/]+)/', path)
+        if match and method == 'PUT':
+            return self._send_json(*backend.update_pedimento(match.group(1), json.loads(body or b'{}')))
+        if path == 'vucem/vucem/' and method == 'GET':
+            return self._send_json(*backend.credentials(query))
+        if path == 'record/documents/' and method == 'POST':
+            return self._send_json(*backend.add_document())
+        self._send_json(404, {'detail': 'Not found.'})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class VUCEMStub:
+    """Servidor stub en un hilo de fondo; usar como context manager o start()/stop()"""
+
+    def __init__(self, config: StubConfig = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or StubConfig()
+        if self.config.latency_dist not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_dist debe ser uno de {LATENCY_DISTRIBUTIONS}")
+        self.services = load_services()
+        self.pedimento_completo = load_pedimento_completo(self.config.response_kb)
+        self.backend = BackendState(self.config) if self.config.api else None
+        self.host = host
+        self.port = port
+        self._server = None
+        self._attempts = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    def start(self) -> str:
+        self._server = _Server((self.host, self.port), StubHandler)
+        self._server.stub = self
+        threading.Thread(target=self._server.serve_forever, name="VUCEMStub", daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] = self._stats.get(key, 0) + amount
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        if self.backend is not None:
+            stats['backend'] = self.backend.snapshot()
+        return stats
+
+    def _rng(self, key: str) -> random.Random:
+        """Aleatoriedad de la n-ésima petición de una consulta, independiente del orden de llegada"""
+        with self._lock:
+            attempt = self._attempts[key] = self._attempts.get(key, 0) + 1
+        return random.Random(f"{self.config.seed}|{key}|{attempt}")
+
+    def _latency(self, rng: random.Random) -> float:
+        config = self.config
+        base = config.latency_ms / 1000
+        if base <= 0:
+            return 0
+        if config.latency_dist == 'fixed':
+            return base
+        if config.latency_dist == 'uniform':
+            return max(0.0, rng.uniform(base * (1 - config.latency_spread), base * (1 + config.latency_spread)))
+        if config.latency_dist == 'exponential':
+            return rng.expovariate(1 / base)
+        return rng.lognormvariate(math.log(base), config.latency_spread)
+
+    def handle_soap(self, handler: StubHandler, body: bytes):
+        """Responde una petición SOAP; devuelve los bytes enviados"""
+        try:
+            root = ET.fromstring(body)
+            request = root.find(f'{{{ENVELOPE_NS}}}Body')[0]
+        except (ET.ParseError, TypeError, IndexError):
+            self.count('soap_malformed')
+            return handler._send(500, soap_fault('Envelope mal formado'), 'text/xml; charset=utf-8')
+        element = request.tag.rsplit('}', 1)[-1]
+        service = self.services.get(element)
+        if service is None:
+            self.count('soap_unknown')
+            return handler._send(500, soap_fault(f'Operación desconocida {element}'), 'text/xml; charset=utf-8')
+        template, namespace = service
+        fields = {node.tag.rsplit('}', 1)[-1]: (node.text or '').strip() for node in request.iter()}
+
+        query = '|'.join(fields.get(name, '') for name in ('aduana', 'patente', 'pedimento', 'numeroPartida', 'idEdocument'))
+        rng = self._rng(f"{template}|{query}")
+        self.count(f'{template}_requests')
+        time.sleep(self._latency(rng))
+
+        roll = rng.random()
+        config = self.config
+        if roll < config.timeout_rate:
+            self.count(f'{template}_timeouts')
+            time.sleep(config.hang_seconds)
+            return handler._send(504, soap_fault('Timeout'), 'text/xml; charset=utf-8')
+        roll -= config.timeout_rate
+        if roll < config.throttle_rate:
+            self.count(f'{template}_throttled')
+            return handler._send(429, soap_fault('Too Many Requests'), 'text/xml; charset=utf-8')
+        roll -= config.throttle_rate
+        if roll < config.error_rate:
+            self.count(f'{template}_http_errors')
+            return handler._send(500, soap_fault('Error interno'), 'text/xml; charset=utf-8')
+        roll -= config.error_rate
+        if roll < config.soap_error_rate:
+            self.count(f'{template}_soap_errors')
+            response = soap_respuesta(element, namespace, mensaje='No existe información para el pedimento solicitado')
+        else:
+            self.count(f'{template}_ok')
+            response = self._success_body(template, element, namespace, fields)
+        return handler._send(200, response, 'text/xml; charset=utf-8', compress=config.gzip)
+
+    def _success_body(self, template: str, element: str, namespace: str, fields: dict) -> bytes:
+        operacion = fields.get('numeroOperacion') or numero_operacion(
+            fields.get('aduana'), fields.get('patente'), fields.get('pedimento'))
+        if template == 'consultar_pedimento_completo':
+            return (self.pedimento_completo
+                    .replace(b'@@OPERACION@@', operacion.encode('ascii'))
+                    .replace(b'@@PEDIMENTO@@', fields.get('pedimento', '').encode('utf-8')))
+        if template == 'consultar_partida':
+            body = (f'<ns2:partida><ns2:numeroPartida>{fields.get("numeroPartida")}</ns2:numeroPartida>'
+                    f'<ns2:fraccionArancelaria>48211001</ns2:fraccionArancelaria>'
+                    f'<ns2:descripcionMercancia>ETIQUETAS DE PAPEL IMPRESAS</ns2:descripcionMercancia>'
+                    f'<ns2:cantidadUMComercial>1000</ns2:cantidadUMComercial>'
+                    f'<ns2:valorAduana>12500</ns2:valorAduana></ns2:partida>')
+        elif template == 'consultar_remesas':
+            body = ''.join(
+                f'<ns2:remesas><ns2:numeroRemesa>{remesa}</ns2:numeroRemesa>'
+                f'<ns2:numeroOperacion>{operacion}</ns2:numeroOperacion>'
+                f'<ns2:fechaRemesa>2021-09-08-06:00</ns2:fechaRemesa></ns2:remesas>'
+                for remesa in range(1, 4)
+            )
+        elif template == 'consultar_estado_pedimento':
+            body = (f'<ns2:numeroOperacion>{operacion}</ns2:numeroOperacion>'
+                    f'<ns2:estado><ns2:estado>7</ns2:estado>'
+                    f'<ns2:descripcionEstado>PEDIMENTO PAGADO</ns2:descripcionEstado></ns2:estado>')
+        else:
+            body = (f'<ns2:acuse><ns2:idEdocument>{fields.get("idEdocument")}</ns2:idEdocument>'
+                    f'<ns2:acuseDocumento>{"QUNVU0U=" * 512}</ns2:acuseDocumento></ns2:acuse>')
+        return soap_respuesta(element, namespace, body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub local de VUCEM (y del backend) para pruebas de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Mediana/media de la latencia SOAP")
+    parser.add_argument("--latency-dist", choices=LATENCY_DISTRIBUTIONS, default='lognormal')
+    parser.add_argument("--latency-spread", type=float, default=0.5, help="sigma (lognormal) o ±fracción (uniform)")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fracción de respuestas 500")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fracción de respuestas 429")
+    parser.add_argument("--timeout-rate", type=float, default=0, help="Fracción de peticiones que no responden")
+    parser.add_argument("--hang-seconds", type=float, default=30, help="Espera de las peticiones que no responden")
+    parser.add_argument("--soap-error-rate", type=float, default=0, help="Fracción de respuestas con tieneError=true")
+    parser.add_argument("--response-kb", type=int, default=0, help="Tamaño mínimo de la respuesta de pedimento completo")
+    parser.add_argument("--no-gzip", action="store_true", help="No comprimir aunque el cliente lo pida")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-api", action="store_true", help="No simular el backend")
+    parser.add_argument("--services", type=int, default=100, help="Servicios pendientes en el backend simulado")
+    parser.add_argument("--importers", type=int, default=5, help="Importadores distintos en el backend simulado")
+    parser.add_argument("--importer-skew", type=float, default=0, help="Concentración de servicios en pocos importadores")
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency_ms=args.latency_ms, latency_dist=args.latency_dist, latency_spread=args.latency_spread,
+        error_rate=args.error_rate, throttle_rate=args.throttle_rate, timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds, soap_error_rate=args.soap_error_rate, response_kb=args.response_kb,
+        gzip=not args.no_gzip, seed=args.seed, api=not args.no_api, services=args.services,
+        importers=args.importers, importer_skew=args.importer_skew
+    )
+    stub = VUCEMStub(config, host=args.host, port=args.port)
+    url = stub.start()
+    print(f"Stub VUCEM en {url}")
+    print(f"  SOAP_SERVICE_URL={url}")
+    if config.api:
+        print(f"  API_URL={url}/api/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(json.dumps(stub.stats(), indent=2))
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
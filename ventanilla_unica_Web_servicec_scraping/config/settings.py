@@ -8,7 +8,7 @@ load_dotenv()
 
 # Load environment variables from .env file
 class Config:
-    SOAP_SERVICE_URL = "https://www.ventanillaunica.gob.mx"
+    SOAP_SERVICE_URL = os.getenv("SOAP_SERVICE_URL", "https://www.ventanillaunica.gob.mx")
     API_URL = os.getenv("API_URL", "http://localhost:8000/api/v1")
     API_TOKEN = os.getenv("API_TOKEN")
     
@@ -21,24 +21,201 @@ class Config:
 
     context = ssl.create_default_context()
     context.set_ciphers('DEFAULT:@SECLEVEL=1')
-    
+
+    """# SOAP connection pool #
+        Un solo cliente httpx compartido por todos los hilos, asi cada
+        peticion reutiliza conexiones TCP/TLS abiertas hacia VUCEM en lugar
+        de hacer un handshake completo por pedimento.
+    """
+    SOAP_TIMEOUT_SECONDS = float(os.getenv("SOAP_TIMEOUT_SECONDS", "5"))
+    SOAP_POOL_MAX_CONNECTIONS = int(os.getenv("SOAP_POOL_MAX_CONNECTIONS", "20"))
+    SOAP_POOL_MAX_KEEPALIVE = int(os.getenv("SOAP_POOL_MAX_KEEPALIVE", "10"))
+    SOAP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("SOAP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+
+    """# SOAP retry policy #
+        Solo se reintentan fallos transitorios (timeouts, errores de conexion,
+        429 y 5xx) con backoff exponencial + jitter. El presupuesto limita los
+        reintentos a una fraccion del trafico total del proceso.
+    """
+    SOAP_RETRY_MAX_ATTEMPTS = int(os.getenv("SOAP_RETRY_MAX_ATTEMPTS", os.getenv("MAX_RETRIES", "3")))
+    SOAP_RETRY_BASE_DELAY_SECONDS = float(os.getenv("SOAP_RETRY_BASE_DELAY_SECONDS", "0.5"))
+    SOAP_RETRY_MAX_DELAY_SECONDS = float(os.getenv("SOAP_RETRY_MAX_DELAY_SECONDS", "8"))
+    SOAP_RETRY_BUDGET_RATIO = float(os.getenv("SOAP_RETRY_BUDGET_RATIO", "0.2"))
+    SOAP_RETRY_BUDGET_RESERVE = int(os.getenv("SOAP_RETRY_BUDGET_RESERVE", "10"))
+
+    """# SOAP adaptive concurrency #
+        Limite AIMD de peticiones en vuelo por endpoint: sube mientras la
+        latencia este por debajo del objetivo y se reduce ante timeouts/5xx.
+    """
+    SOAP_LIMIT_INITIAL = int(os.getenv("SOAP_LIMIT_INITIAL", "4"))
+    SOAP_LIMIT_MIN = int(os.getenv("SOAP_LIMIT_MIN", "1"))
+    SOAP_LIMIT_MAX = int(os.getenv("SOAP_LIMIT_MAX", "20"))
+    SOAP_LIMIT_LATENCY_TARGET_SECONDS = float(os.getenv("SOAP_LIMIT_LATENCY_TARGET_SECONDS", "2"))
+    SOAP_LIMIT_BACKOFF_RATIO = float(os.getenv("SOAP_LIMIT_BACKOFF_RATIO", "0.5"))
+
+    """# SOAP circuit breaker #
+        Tras SOAP_BREAKER_FAILURE_THRESHOLD fallos de disponibilidad seguidos
+        el endpoint se da por caido durante SOAP_BREAKER_OPEN_SECONDS y los
+        servicios se dejan pendientes en lugar de marcarse como fallidos.
+    """
+    SOAP_BREAKER_FAILURE_THRESHOLD = int(os.getenv("SOAP_BREAKER_FAILURE_THRESHOLD", "5"))
+    SOAP_BREAKER_OPEN_SECONDS = float(os.getenv("SOAP_BREAKER_OPEN_SECONDS", "30"))
+    SOAP_BREAKER_HALF_OPEN_PROBES = int(os.getenv("SOAP_BREAKER_HALF_OPEN_PROBES", "1"))
+
+    """# SOAP hedged requests #
+        Opcional: si una peticion tarda mas que el percentil SOAP_HEDGE_PERCENTILE
+        de la latencia reciente se lanza un duplicado y se usa la primera
+        respuesta. Los duplicados no pasan de SOAP_HEDGE_MAX_RATIO de las peticiones.
+    """
+    SOAP_HEDGE_ENABLED = os.getenv("SOAP_HEDGE_ENABLED", "false").lower() == "true"
+    SOAP_HEDGE_ENDPOINTS = [name.strip() for name in os.getenv("SOAP_HEDGE_ENDPOINTS", "ConsultarPedimentoCompletoService").split(",") if name.strip()]
+    SOAP_HEDGE_PERCENTILE = float(os.getenv("SOAP_HEDGE_PERCENTILE", "95"))
+    SOAP_HEDGE_MIN_SAMPLES = int(os.getenv("SOAP_HEDGE_MIN_SAMPLES", "20"))
+    SOAP_HEDGE_MAX_RATIO = float(os.getenv("SOAP_HEDGE_MAX_RATIO", "0.05"))
+
+    """# SOAP response cache #
+        Cache en disco (gzip, TTL + LRU por tamaño) de las respuestas de
+        pedimento completo, partidas, remesas y acuses.
+    """
+    SOAP_CACHE_ENABLED = os.getenv("SOAP_CACHE_ENABLED", "false").lower() == "true"
+    SOAP_CACHE_DIR = os.getenv("SOAP_CACHE_DIR", "cache/soap_responses")
+    SOAP_CACHE_TTL_SECONDS = float(os.getenv("SOAP_CACHE_TTL_SECONDS", "86400"))
+    SOAP_CACHE_MAX_BYTES = int(os.getenv("SOAP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+    """# Compresion #
+        Todas las peticiones SOAP piden la respuesta comprimida. API_UPLOAD_GZIP
+        sube los XML a la API comprimidos con gzip; solo debe activarse si el
+        backend acepta archivos .xml.gz (se suben con extension "gz" y
+        Content-Type application/gzip).
+    """
+    SOAP_ACCEPT_ENCODING = os.getenv("SOAP_ACCEPT_ENCODING", "gzip, deflate")
+    API_UPLOAD_GZIP = os.getenv("API_UPLOAD_GZIP", "false").lower() == "true"
+
+    """# API connection pool #
+        Una sola sesion HTTP con pool de conexiones keep-alive hacia nuestra
+        API para todos los hilos (el pool crece al numero de hilos si es
+        menor). Los reintentos de la API solo aplican a los metodos de
+        API_RETRY_METHODS y a los status de API_RETRY_STATUS.
+    """
+    API_POOL_MAXSIZE = int(os.getenv("API_POOL_MAXSIZE", "10"))
+    API_RETRY_TOTAL = int(os.getenv("API_RETRY_TOTAL", "3"))
+    API_RETRY_BACKOFF_SECONDS = float(os.getenv("API_RETRY_BACKOFF_SECONDS", "0.5"))
+    API_RETRY_STATUS = [int(status) for status in os.getenv("API_RETRY_STATUS", "502,503,504").split(",") if status.strip()]
+    API_RETRY_METHODS = [method.strip().upper() for method in os.getenv("API_RETRY_METHODS", "GET,PUT").split(",") if method.strip()]
+
+    """# Campos del pedimento completo #
+        Campos que se leen de la respuesta de pedimento completo y se escriben
+        en el pedimento al subir el documento (campo=ruta en el namespace
+        consultarpedimentocompleto, separados por coma). Vacio desactiva la
+        extraccion y el pedimento queda para ventanilla_unica_document_scraping.
+    """
+    PEDIMENTO_COMPLETO_FIELDS = os.getenv(
+        "PEDIMENTO_COMPLETO_FIELDS",
+        "numero_operacion=numeroOperacion,pedimento=pedimento/pedimento,"
+        "curp_apoderado=curpApoderadomandatario,agente_aduanal=rfcAgenteAduanalSocFactura"
+    )
+
     """# Script configuration #
         Nos indica el nivel de generacion de logs que estaremos utilizando
     """
 
-    SCRIPT_LOG_LEVEL = os.getenv("SCRIPT_LOG_LEVEL", "DEBUG")
+    SCRIPT_LOG_LEVEL = os.getenv("SCRIPT_LOG_LEVEL", "INFO")
     SCRIPT_LOG_FILE = os.getenv("SCRIPT_LOG_FILE", "logs/soap_service.log")
     
     # Multithreading configuration
     DEFAULT_START_PAGE = int(os.getenv("DEFAULT_START_PAGE", "1"))
-    DEFAULT_END_PAGE = int(os.getenv("DEFAULT_END_PAGE", "3"))
+    DEFAULT_END_PAGE = int(os.getenv("DEFAULT_END_PAGE", "0"))  # 0 = hasta vaciar el backlog pendiente
     DEFAULT_SERVICE_TYPE = int(os.getenv("DEFAULT_SERVICE_TYPE", "3"))
     DEFAULT_MAX_WORKERS = int(os.getenv("DEFAULT_MAX_WORKERS", "2"))
     
-    # Thread safety and rate limiting
-    REQUEST_DELAY_SECONDS = float(os.getenv("REQUEST_DELAY_SECONDS", "0.5"))  # Delay between requests in same thread
+    """# Feed de servicios pendientes #
+        Un hilo productor recorre customs/procesamientopedimentos/ de
+        SERVICE_FEED_PAGE_SIZE en SERVICE_FEED_PAGE_SIZE y mantiene hasta
+        SERVICE_FEED_QUEUE_SIZE servicios encolados para los hilos de trabajo.
+    """
+    SERVICE_FEED_PAGE_SIZE = int(os.getenv("SERVICE_FEED_PAGE_SIZE", "10"))
+    SERVICE_FEED_QUEUE_SIZE = int(os.getenv("SERVICE_FEED_QUEUE_SIZE", "50"))
+    
+    """# Reparto justo por importador #
+        Los servicios encolados se entregan a los hilos por turnos entre
+        importadores (weighted fair queuing), no en el orden de la API.
+        SCHEDULER_IMPORTER_WEIGHTS da más turnos a algunos ("RFC1=3,RFC2=0.5",
+        default 1). SCHEDULER_IMPORTER_CAPS ("RFC1=4") y
+        SCHEDULER_DEFAULT_IMPORTER_CAP limitan los servicios en vuelo por
+        importador (0 = sin tope). SCHEDULER_MAX_QUEUED_PER_IMPORTER limita
+        los que un importador puede tener encolados, para que el productor
+        siga buscando servicios de otros hasta SCHEDULER_LOOKAHEAD_PAGES
+        páginas (0 = sin tope).
+    """
+    SCHEDULER_IMPORTER_WEIGHTS = os.getenv("SCHEDULER_IMPORTER_WEIGHTS", "")
+    SCHEDULER_IMPORTER_CAPS = os.getenv("SCHEDULER_IMPORTER_CAPS", "")
+    SCHEDULER_DEFAULT_IMPORTER_CAP = int(os.getenv("SCHEDULER_DEFAULT_IMPORTER_CAP", "0"))
+    SCHEDULER_MAX_QUEUED_PER_IMPORTER = int(os.getenv("SCHEDULER_MAX_QUEUED_PER_IMPORTER", "10"))
+    SCHEDULER_LOOKAHEAD_PAGES = int(os.getenv("SCHEDULER_LOOKAHEAD_PAGES", "20"))
+    
+    """# Micro-lotes por importador y tipo de servicio #
+        Cada hilo toma hasta SCHEDULER_BATCH_MAX_SIZE servicios encolados del
+        mismo importador y tipo y los procesa seguidos con la misma credencial
+        y conexión. Si no hay suficientes encolados espera a lo sumo
+        SCHEDULER_BATCH_MAX_DELAY_SECONDS a que lleguen más. 1 desactiva los
+        micro-lotes.
+    """
+    SCHEDULER_BATCH_MAX_SIZE = int(os.getenv("SCHEDULER_BATCH_MAX_SIZE", "4"))
+    SCHEDULER_BATCH_MAX_DELAY_SECONDS = float(os.getenv("SCHEDULER_BATCH_MAX_DELAY_SECONDS", "0.02"))
+    
+    """# Cache de credenciales VUCEM #
+        Las credenciales de cada importador se guardan en memoria
+        CREDENTIALS_CACHE_TTL_SECONDS; pasada la fracción
+        CREDENTIALS_REFRESH_AHEAD del TTL se refrescan en segundo plano. Los
+        importadores sin credenciales activas se recuerdan solo
+        CREDENTIALS_NEGATIVE_TTL_SECONDS.
+        Al preparar cada página las credenciales de sus importadores se piden
+        en una sola consulta (usuario__in) si CREDENTIALS_BULK_ENABLED; si no,
+        o para los que no vengan en ella, con CREDENTIALS_PREFETCH_WORKERS
+        consultas individuales en paralelo.
+        Las peticiones de un importador con varias credenciales activas se
+        reparten entre ellas; una credencial que VUCEM limita (429) o rechaza
+        queda en pausa CREDENTIALS_BENCH_SECONDS.
+    """
+    CREDENTIALS_CACHE_TTL_SECONDS = float(os.getenv("CREDENTIALS_CACHE_TTL_SECONDS", "900"))
+    CREDENTIALS_NEGATIVE_TTL_SECONDS = float(os.getenv("CREDENTIALS_NEGATIVE_TTL_SECONDS", "60"))
+    CREDENTIALS_REFRESH_AHEAD = float(os.getenv("CREDENTIALS_REFRESH_AHEAD", "0.8"))
+    CREDENTIALS_BULK_ENABLED = os.getenv("CREDENTIALS_BULK_ENABLED", "true").lower() == "true"
+    CREDENTIALS_PREFETCH_WORKERS = int(os.getenv("CREDENTIALS_PREFETCH_WORKERS", "4"))
+    CREDENTIALS_BENCH_SECONDS = float(os.getenv("CREDENTIALS_BENCH_SECONDS", "60"))
+    
+    """# Rate limiting global #
+        Peticiones por segundo (token bucket) que admite todo el proceso hacia
+        VUCEM y hacia la API, sin importar cuántos hilos o tareas haya. BURST
+        es cuántas peticiones pueden salir de golpe tras un rato sin tráfico
+        (default = RPS). RPS <= 0 desactiva el límite.
+    """
+    SOAP_RATE_LIMIT_RPS = float(os.getenv("SOAP_RATE_LIMIT_RPS", "10"))
+    SOAP_RATE_LIMIT_BURST = float(os.getenv("SOAP_RATE_LIMIT_BURST", "0"))
+    API_RATE_LIMIT_RPS = float(os.getenv("API_RATE_LIMIT_RPS", "50"))
+    API_RATE_LIMIT_BURST = float(os.getenv("API_RATE_LIMIT_BURST", "0"))
+    
+    # Thread safety
+    REQUEST_DELAY_SECONDS = float(os.getenv("REQUEST_DELAY_SECONDS", "0.5"))  # Solo run2 (depuración); el pipeline usa los rate limits
     MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))  # Max retries per failed request
 
+    """# Modo continuo (daemon) #
+        python main.py --daemon consulta servicios pendientes sin parar. Sin
+        servicios nuevos espera de DAEMON_IDLE_MIN_SECONDS a
+        DAEMON_IDLE_MAX_SECONDS (duplicando) entre consultas; un servicio que
+        sigue pendiente se vuelve a intentar tras DAEMON_RETRY_PENDING_SECONDS.
+        /health y /metrics se sirven en DAEMON_HEALTH_HOST:DAEMON_HEALTH_PORT
+        (puerto 0 desactiva el endpoint).
+    """
+    DAEMON_IDLE_MIN_SECONDS = float(os.getenv("DAEMON_IDLE_MIN_SECONDS", "1"))
+    DAEMON_IDLE_MAX_SECONDS = float(os.getenv("DAEMON_IDLE_MAX_SECONDS", "60"))
+    DAEMON_RETRY_PENDING_SECONDS = float(os.getenv("DAEMON_RETRY_PENDING_SECONDS", "300"))
+    DAEMON_HEALTH_HOST = os.getenv("DAEMON_HEALTH_HOST", "127.0.0.1")
+    DAEMON_HEALTH_PORT = int(os.getenv("DAEMON_HEALTH_PORT", "8081"))
+
+    # Asyncio execution mode
+    ASYNC_MAX_CONCURRENCY = int(os.getenv("ASYNC_MAX_CONCURRENCY", "50"))  # Max services in flight on the event loop
+
 
 # Project Settings
 # This is where you can define your project settings and configurations
@@ -0,0 +1,143 @@
+import datetime
+import gzip
+from typing import Dict, Any
+
+import httpx
+
+from config.settings import SETTINGS
+from utils.debug_logger import get_logger
+from utils.rate_limiter import API, TokenBucket, get_rate_limiter
+
+logger = get_logger(__name__)
+
+class AsyncAPIController:
+    """
+    Versión asyncio de APIController sobre httpx.AsyncClient.
+
+    Expone solo las operaciones que usa el pipeline asíncrono de MainProcess.
+    """
+
+    def __init__(self, max_connections=None, rate_limiter: TokenBucket = None):
+        self.base_url = SETTINGS.API_URL # URL base de la API
+        self.headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Token {SETTINGS.API_TOKEN}'  # Token de autenticación
+        }
+
+        self.timeout = 10  # Timeout para las peticiones a la API
+        self.limits = httpx.Limits(max_connections=max_connections or SETTINGS.ASYNC_MAX_CONCURRENCY)
+        # Mismo bucket que APIController: el límite es por proceso
+        self.rate_limiter = rate_limiter or get_rate_limiter(API)
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def aclose(self):
+        """Cierra el pool de conexiones."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def _make_request(self, method, endpoint, data=None):
+        """
+        Método para hacer peticiones a la API.
+        """
+        url = f"{self.base_url}/{endpoint}"
+        await self.rate_limiter.acquire_async()
+        try:
+            response = await self.client.request(method, url, json=data, headers=self.headers)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            # ValueError: cuerpo que no es JSON (página HTML de un 502, 204 vacío);
+            # como en APIController, la petición se da por fallida
+            logger.error("Error al hacer la petición a la API: %s", e)
+            if isinstance(e, httpx.HTTPStatusError):
+                logger.error("Status code del error: %s", e.response.status_code)
+                logger.debug("Contenido del error: %s", e.response.text)
+            return None
+
+    async def get_pedimento_services(self, page, service_type=3) -> Dict[str, Any]:
+        """
+        Método para obtener la lista de servicios desde la API.
+        """
+        return await self._make_request('GET', f'customs/procesamientopedimentos/?page={page}&page_size={SETTINGS.SERVICE_FEED_PAGE_SIZE}&estado=1&servicio={service_type}')
+
+    async def post_pedimento_service(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Método para crear un nuevo servicio de pedimento en la API.
+        """
+        return await self._make_request('POST', 'customs/procesamientopedimentos/', data=data)
+
+    async def put_pedimento_service(self, service_id: int, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Método para actualizar un servicio de pedimento en la API.
+        """
+        return await self._make_request('PUT', f'customs/procesamientopedimentos/{service_id}/', data=data)
+
+    async def put_pedimento(self, pedimento_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Método para actualizar los datos de un pedimento en la API.
+        """
+        return await self._make_request('PUT', f'customs/pedimentos/{pedimento_id}/', data=data)
+
+    async def post_document(self, soap_response, organizacion: str, pedimento: str, file_name: str = None) -> Dict[str, Any]:
+        """
+        Método para enviar una respuesta SOAP como documento archivo a la API.
+
+        Args:
+            soap_response: Respuesta del servicio SOAP
+            organizacion: UUID de la organización (requerido)
+            pedimento: UUID del pedimento (requerido)
+            file_name: Nombre del archivo (opcional, se genera automáticamente)
+        """
+        if not soap_response:
+            logger.error("Error: No hay respuesta SOAP para enviar")
+            return None
+
+        if not file_name:
+            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+            file_name = f"soap_response_{timestamp}.xml"
+        if not file_name.endswith('.xml'):
+            file_name += '.xml'
+
+        content = soap_response.content
+        content_type = 'application/xml'
+        extension = 'xml'
+        if SETTINGS.API_UPLOAD_GZIP:
+            content = gzip.compress(content)
+            file_name += '.gz'
+            content_type = 'application/gzip'
+            extension = 'gz'
+        document_data = {
+            'organizacion': organizacion,
+            'pedimento': pedimento,
+            'extension': extension,
+            'document_type': 2,
+            'size': len(content)
+        }
+
+        await self.rate_limiter.acquire_async()
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/record/documents/",
+                data=document_data,
+                files={'archivo': (file_name, content, content_type)},
+                headers={'Authorization': f'Token {SETTINGS.API_TOKEN}'}
+            )
+            response.raise_for_status()
+            logger.debug("Documento XML enviado exitosamente: %s (tamaño: %s bytes)", file_name, len(content))
+            return response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logger.error("Error al enviar documento SOAP: %s", e)
+            return None
@@ -0,0 +1,178 @@
+from config.settings import SETTINGS
+from utils.retry_policy import RetryPolicy, classify_exception
+from utils.concurrency_limiter import EndpointLimiters
+from utils.circuit_breaker import CircuitBreakers, CircuitOpenError
+from utils.hedging import RequestHedger
+from utils.transfer_stats import TransferStats
+from utils.single_flight import AsyncSingleFlight, soap_request_key
+from controllers.SOAPService import BenchedCredential
+from utils.debug_logger import get_logger
+from utils.rate_limiter import VUCEM, TokenBucket, get_rate_limiter
+import asyncio
+import time
+import httpx
+
+logger = get_logger(__name__)
+
+class AsyncSOAPController:
+    """
+    Versión asyncio de SOAPController.
+
+    Un solo httpx.AsyncClient multiplexa todas las peticiones en vuelo del
+    event loop; la concurrencia la limita quien llama (ver
+    MainProcess.process_pedimento_services_async).
+    """
+
+    LIMITER_POLL_SECONDS = 0.01
+
+    def __init__(self, base_url=None, verify=None, timeout=None,
+                 max_connections=None, max_keepalive_connections=None,
+                 keepalive_expiry=None, retry_policy: RetryPolicy = None,
+                 limiters: EndpointLimiters = None, breakers: CircuitBreakers = None,
+                 hedger: RequestHedger = None, rate_limiter: TokenBucket = None):
+        self.base_url = base_url or SETTINGS.SOAP_SERVICE_URL
+        self.verify = verify if verify is not None else SETTINGS.context
+        self.timeout = timeout if timeout is not None else SETTINGS.SOAP_TIMEOUT_SECONDS
+        self.limits = httpx.Limits(
+            max_connections=max_connections or SETTINGS.SOAP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or SETTINGS.SOAP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else SETTINGS.SOAP_KEEPALIVE_EXPIRY_SECONDS
+        )
+        self.retry_policy = retry_policy or RetryPolicy.from_settings()
+        self.limiters = limiters or EndpointLimiters()
+        self.breakers = breakers or CircuitBreakers()
+        self.hedger = hedger or (RequestHedger() if SETTINGS.SOAP_HEDGE_ENABLED else None)
+        # Peticiones por segundo hacia VUCEM, compartido por todo el proceso
+        self.rate_limiter = rate_limiter or get_rate_limiter(VUCEM)
+        self.single_flight = AsyncSingleFlight()
+        self.transfer_stats = TransferStats()
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Cliente compartido; se crea dentro del event loop que lo usa."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                verify=self.verify,
+                timeout=self.timeout,
+                limits=self.limits
+            )
+        return self._client
+
+    async def aclose(self):
+        """Cierra el pool de conexiones."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+
+    async def make_request(self, endpoint, data=None, headers=None, max_retries=None, on_failure=None):
+        """
+        Envía la petición SOAP; misma política de reintentos y límite
+        adaptativo por endpoint que SOAPController.make_request.
+        """
+        max_attempts = max_retries or self.retry_policy.max_attempts
+        # Los templates ya entregan bytes; se acepta str por compatibilidad
+        content = data.encode('utf-8') if isinstance(data, str) else data
+        content = content or None
+        leader = []
+
+        def call():
+            leader.append(True)
+            return self._make_request(endpoint, content, headers, max_attempts, on_failure)
+
+        # Peticiones idénticas en vuelo (misma consulta, aunque con otras
+        # credenciales) comparten una sola llamada y el mismo objeto respuesta
+        response = await self.single_flight.do(soap_request_key(endpoint, content), call)
+        if isinstance(response, BenchedCredential) and not leader:
+            response = await self._follow_benched(response, endpoint, content, headers, max_attempts, on_failure)
+        return None if isinstance(response, BenchedCredential) else response
+
+    async def _follow_benched(self, benched, endpoint, content, headers, max_attempts, on_failure):
+        """Ver SOAPController._follow_benched"""
+        if content == benched.content:
+            if on_failure:
+                on_failure(benched.failure)
+            return None
+        return await self._make_request(endpoint, content, headers, max_attempts, on_failure)
+
+    async def _make_request(self, endpoint, content, headers, max_attempts, on_failure=None):
+        """Petición real a VUCEM con reintentos, límite adaptativo, circuit breaker y hedging"""
+        self.retry_policy.record_request(endpoint)
+        limiter = self.limiters.get(endpoint)
+        breaker = self.breakers.get(endpoint)
+        hedger = self.hedger if self.hedger and self.hedger.applies_to(endpoint) else None
+        # Todas las rutas SOAP negocian compresión; httpx descomprime al leer
+        headers = {'Accept-Encoding': SETTINGS.SOAP_ACCEPT_ENCODING, **(headers or {})}
+
+        async def send():
+            response = await self.client.post(
+                f"{self.base_url}/{endpoint}",
+                content=content,
+                headers=headers
+            )
+            response.raise_for_status()
+            return response
+
+        intento = 0
+        while True:
+            intento += 1
+            if not breaker.allow_request():
+                raise CircuitOpenError(endpoint, breaker.retry_after())
+            # Turno del límite global antes de ocupar lugar en el límite adaptativo,
+            # para que la espera no cuente como latencia del endpoint
+            await self.rate_limiter.acquire_async()
+            # El limitador es de hilos; en el event loop se espera sin bloquear
+            while not limiter.try_acquire():
+                await asyncio.sleep(self.LIMITER_POLL_SECONDS)
+            start = time.perf_counter()
+            try:
+                if hedger:
+                    response = await hedger.acall(endpoint, send, self.rate_limiter)
+                else:
+                    response = await send()
+            except Exception as e:
+                failure = classify_exception(e)
+                if on_failure and on_failure(failure):
+                    # El fallo es de la credencial, no del endpoint: no reduce el
+                    # límite adaptativo ni cuenta para el circuito de VUCEM
+                    limiter.release(time.perf_counter() - start, failure, adjust=False)
+                    breaker.record_neutral()
+                    # El envelope va firmado con una credencial que quedó en pausa:
+                    # reintentarlo solo insiste contra la cuenta limitada
+                    logger.warning("[%s] Fallo (%s) en intento %s: %s. Sin reintentos con esta credencial.",
+                                   endpoint, failure, intento, e)
+                    return BenchedCredential(failure, content)
+                limiter.release(time.perf_counter() - start, failure)
+                breaker.record_failure(failure)
+                if not self.retry_policy.should_retry(endpoint, failure, intento, max_attempts):
+                    logger.warning("[%s] Fallo (%s) en intento %s: %s. Sin más reintentos.", endpoint, failure, intento, e)
+                    return None
+                wait_time = self.retry_policy.backoff(intento)
+                logger.warning("[%s] Error (%s) intento %s: %s. Reintentando en %.2fs...", endpoint, failure, intento, e, wait_time)
+                await asyncio.sleep(wait_time)
+                continue
+            elapsed = time.perf_counter() - start
+            limiter.release(elapsed)
+            breaker.record_success()
+            self.transfer_stats.record(endpoint, response)
+            if hedger:
+                hedger.record_latency(endpoint, elapsed)
+            return response
+
+    def metrics(self):
+        """Métricas del cliente SOAP por endpoint"""
+        return {
+            'retries': self.retry_policy.stats(),
+            'concurrency_limits': self.limiters.snapshot(),
+            'circuit_breakers': self.breakers.snapshot(),
+            'hedging': self.hedger.stats() if self.hedger else {},
+            'coalescing': self.single_flight.stats(),
+            'transfer': self.transfer_stats.snapshot(),
+            'rate_limit': self.rate_limiter.stats(),
+        }
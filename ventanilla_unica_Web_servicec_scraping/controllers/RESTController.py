@@ -1,16 +1,45 @@
 import requests
 import asyncio
+import threading
+import time
 from typing import List, Dict, Any
-import os
+import gzip
+from urllib.parse import quote
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from config.settings import SETTINGS
+from utils.debug_logger import get_logger
+from utils.rate_limiter import API, TokenBucket, get_rate_limiter
+from utils.latency_stats import LatencyStats
+from utils.multipart import MultipartBody
+
+logger = get_logger(__name__)
+
+
+def retry_from_settings() -> Retry:
+    """Reintentos del adaptador HTTP configurados con las variables API_RETRY_*"""
+    return Retry(
+        total=SETTINGS.API_RETRY_TOTAL,
+        backoff_factor=SETTINGS.API_RETRY_BACKOFF_SECONDS,
+        status_forcelist=SETTINGS.API_RETRY_STATUS,
+        allowed_methods=frozenset(SETTINGS.API_RETRY_METHODS),
+        raise_on_status=False  # El último status lo revisa raise_for_status
+    )
+
 
 class APIController:
     """
     Controlador para manejar las peticiones a la API.
+
+    Todas las peticiones pasan por un mismo HTTPAdapter cuyo pool de
+    conexiones keep-alive comparten todos los hilos. Cada hilo usa su propia
+    requests.Session montada sobre ese adaptador, así no se comparte estado
+    de sesión (cookies) entre hilos pero sí las conexiones abiertas.
     """
 
-    def __init__(self):
+    def __init__(self, pool_maxsize=None, retries: Retry = None, rate_limiter: TokenBucket = None):
         self.base_url = SETTINGS.API_URL # URL base de la API
         self.headers = {
             'Content-Type': 'application/json',
@@ -18,6 +47,63 @@ class APIController:
         }
 
         self.timeout = 10  # Timeout para las peticiones a la API
+        self.pool_maxsize = pool_maxsize or SETTINGS.API_POOL_MAXSIZE
+        self.retries = retries if retries is not None else retry_from_settings()
+        self.latency = LatencyStats()
+        # Peticiones por segundo hacia la API, compartido por todo el proceso
+        self.rate_limiter = rate_limiter or get_rate_limiter(API)
+        self._adapter = self._build_adapter(self.pool_maxsize)
+        self._adapter_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _build_adapter(self, pool_maxsize) -> HTTPAdapter:
+        return HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=self.retries)
+
+    @property
+    def session(self) -> requests.Session:
+        """Sesión del hilo actual, montada sobre el adaptador compartido"""
+        adapter = self._adapter
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        if session.adapters.get('https://') is not adapter:
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        return session
+
+    def size_pool(self, workers: int):
+        """
+        Asegura que el pool admita `workers` conexiones simultáneas.
+        Llamar antes de arrancar los hilos.
+        """
+        with self._adapter_lock:
+            if workers <= self.pool_maxsize:
+                return
+            self.pool_maxsize = workers
+            previous, self._adapter = self._adapter, self._build_adapter(workers)
+            # Las sesiones de los hilos montan el nuevo en su siguiente petición;
+            # cerrar el anterior libera sus conexiones keep-alive
+            previous.close()
+
+    def close(self):
+        """Cierra las conexiones del pool"""
+        with self._adapter_lock:
+            self._adapter.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Latencia por endpoint y conexiones abiertas por el pool"""
+        connections = requests_sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                requests_sent += pool.num_requests
+        return {
+            'latency': self.latency.snapshot(),
+            'pool': {'maxsize': self.pool_maxsize, 'connections': connections, 'requests': requests_sent},
+            'rate_limit': self.rate_limiter.stats(),
+        }
 
     def _make_request(self, method, endpoint, data=None):
         """
@@ -25,33 +111,46 @@ class APIController:
         """
 
         url = f"{self.base_url}/{endpoint}"
+        self.rate_limiter.acquire()
+        start = time.perf_counter()
+        ok = False
         try:
-            print(self.headers)
-            print(f"Haciendo {method} request a: {url}")
-            response = requests.request(method, url, json=data, headers=self.headers, timeout=self.timeout)
-            print(f"Status code recibido: {response.status_code}")
+            response = self.session.request(method, url, json=data, headers=self.headers, timeout=self.timeout)
+            logger.debug("%s %s -> %s (%s bytes)", method, url, response.status_code, len(response.content))
             response.raise_for_status()  # Lanza un error si la respuesta no es 200
             result = response.json()
-            print(f"Respuesta JSON recibida: {type(result)} con contenido: {len(str(result)) if result else 0} caracteres")
+            ok = True
             return result  # Retorna el JSON de la respuesta
         except requests.RequestException as e:
-            print(f"Error al hacer la petición a la API: {e}")
+            logger.error("Error al hacer la petición a la API: %s", e)
             if hasattr(e, 'response') and e.response is not None:
-                print(f"Status code del error: {e.response.status_code}")
-                print(f"Contenido del error: {e.response.text}")
+                logger.error("Status code del error: %s", e.response.status_code)
+                logger.debug("Contenido del error: %s", e.response.text)
             return None
+        finally:
+            self.latency.record(endpoint, time.perf_counter() - start, ok)
 
     def get_pedimento_services(self, page, service_type=3) -> List[Dict[str, Any]]:
         """
         Método para obtener la lista de servicios desde la API.
         """
-        return self._make_request('GET', f'customs/procesamientopedimentos/?page={page}&page_size=10&estado=1&servicio={service_type}')
+        return self._make_request('GET', f'customs/procesamientopedimentos/?page={page}&page_size={SETTINGS.SERVICE_FEED_PAGE_SIZE}&estado=1&servicio={service_type}')
 
     def get_vucem_credentials(self, importador) -> Dict[str, Any]:
         """
         Método para obtener las credenciales de VUCEM desde la API.
         """
         return self._make_request('GET', f'vucem/vucem/?usuario={importador}')
+
+    def get_vucem_credentials_bulk(self, importadores: List[str]) -> Any:
+        """
+        Método para obtener en una sola petición las credenciales de VUCEM de
+        varios importadores (filtro usuario__in). Devuelve la lista o la página
+        tal como llega de la API, o None si la petición falla.
+        """
+        usuarios = ','.join(quote(importador, safe='') for importador in importadores)
+        # Un importador puede tener varias credenciales: se pide espacio para 10 por importador
+        return self._make_request('GET', f'vucem/vucem/?usuario__in={usuarios}&page_size={len(importadores) * 10}')
     
     def post_pedimento_service(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -68,6 +167,12 @@ class APIController:
         """
         return self._make_request('PUT', f'customs/procesamientopedimentos/{service_id}/', data=data)
 
+    def put_pedimento(self, pedimento_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Método para actualizar los datos de un pedimento en la API.
+        """
+        return self._make_request('PUT', f'customs/pedimentos/{pedimento_id}/', data=data)
+
     def post_document(self, soap_response, organizacion: str, pedimento: str, file_name: str = None) -> Dict[str, Any]:
         """
         Método para enviar una respuesta SOAP como documento archivo a la API.
@@ -79,10 +184,9 @@ class APIController:
             file_name: Nombre del archivo (opcional, se genera automáticamente)
         """
         import datetime
-        import tempfile
         
         if not soap_response:
-            print("Error: No hay respuesta SOAP para enviar")
+            logger.error("Error: No hay respuesta SOAP para enviar")
             return None
         
         try:
@@ -95,65 +199,63 @@ class APIController:
             if not file_name.endswith('.xml'):
                 file_name += '.xml'
             
-            # Crear archivo temporal
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.xml', delete=False, encoding='utf-8') as temp_file:
-                # Obtener contenido de la respuesta SOAP
-                if hasattr(soap_response, 'content'):
-                    content = soap_response.content.decode('utf-8')
-                elif hasattr(soap_response, 'text'):
-                    content = soap_response.text
-                else:
-                    content = str(soap_response)
-                
-                temp_file.write(content)
-                temp_file_path = temp_file.name
+            # Obtener contenido de la respuesta SOAP
+            if hasattr(soap_response, 'content'):
+                content = soap_response.content
+            elif hasattr(soap_response, 'text'):
+                content = soap_response.text.encode('utf-8')
+            else:
+                content = str(soap_response).encode('utf-8')
             
-            # Preparar headers para multipart/form-data (sin Content-Type)
-            headers = {
-                'Authorization': f'Token {SETTINGS.API_TOKEN}'
-            }
+            # Comprimir el XML si el backend acepta archivos .xml.gz; la extensión
+            # declarada es la del archivo que se sube, no la del XML
+            content_type = 'application/xml'
+            extension = 'xml'
+            if SETTINGS.API_UPLOAD_GZIP:
+                content = gzip.compress(content)
+                file_name += '.gz'
+                content_type = 'application/gzip'
+                extension = 'gz'
             
-            # Calcular tamaño del archivo
-            file_size = os.path.getsize(temp_file_path)
-            print(temp_file_path)
             # Preparar datos del documento (estos van en el body como form-data)
             document_data = {
                 'organizacion': organizacion,
                 'pedimento': pedimento,
-                'extension': 'xml',  # Asumimos que es XML
+                'extension': extension,
                 'document_type': 2,
-                'size': file_size
+                'size': len(content)
+            }
+            
+            # El multipart se envía directo desde el buffer de la respuesta,
+            # sin archivo temporal ni copias (ver utils/multipart.py)
+            body = MultipartBody(document_data, 'archivo', file_name, content, content_type)
+            headers = {
+                'Authorization': f'Token {SETTINGS.API_TOKEN}',
+                **body.headers()
             }
             
             # Subir archivo
             url = f"{self.base_url}/record/documents/"
-            
-            with open(temp_file_path, 'rb') as file:
-                files = {
-                    'archivo': (file_name, file, 'application/xml')
-                }
-                
-                response = requests.request(
+            self.rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(
                     'POST',
                     url,
-                    data=document_data,  # Datos van como form-data
-                    files=files,         # Archivo va como multipart
+                    data=body,
                     headers=headers
                 )
+                response.raise_for_status()
+                result = response.json()
+            except Exception:
+                self.latency.record('record/documents/', time.perf_counter() - start, False)
+                raise
+            self.latency.record('record/documents/', time.perf_counter() - start)
             
-            # Limpiar archivo temporal
-            os.unlink(temp_file_path)
-            
-            response.raise_for_status()
-            result = response.json()
-            
-            print(f"Documento XML enviado exitosamente: {file_name} (tamaño: {file_size} bytes)")
+            logger.debug("Documento XML enviado exitosamente: %s (tamaño: %s bytes)", file_name, len(content))
             return result
             
         except Exception as e:
-            print(f"Error al enviar documento SOAP: {e}")
-            # Limpiar archivo temporal en caso de error
-            if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+            logger.error("Error al enviar documento SOAP: %s", e)
             return None
 
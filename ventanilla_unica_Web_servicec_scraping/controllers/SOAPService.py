@@ -1,37 +1,224 @@
-from config import SETTINGS
-from dataclasses import dataclass
-import requests
+from config.settings import SETTINGS
+from utils.retry_policy import RetryPolicy, classify_exception
+from utils.concurrency_limiter import EndpointLimiters
+from utils.circuit_breaker import CircuitBreakers, CircuitOpenError
+from utils.hedging import RequestHedger
+from utils.transfer_stats import TransferStats
+from utils.single_flight import SingleFlight, soap_request_key
+from utils.debug_logger import get_logger
+from utils.rate_limiter import VUCEM, TokenBucket, get_rate_limiter
+import threading
 import httpx
-import datetime
 import time
 
+logger = get_logger(__name__)
+
+
+class BenchedCredential:
+    """
+    Resultado de _make_request cuando on_failure dejó en pausa la credencial
+    que firma el envelope. Las peticiones coalescidas lo reciben en lugar de
+    None para decidir con su propia credencial (ver make_request).
+    """
+
+    __slots__ = ('failure', 'content')
+
+    def __init__(self, failure, content):
+        self.failure = failure
+        self.content = content
+
+
 class SOAPController:
     """
     Controlador para manejar las peticiones SOAP.
+
+    Mantiene un único httpx.Client con pool de conexiones que comparten todos
+    los hilos (httpx.Client es thread-safe). Las conexiones keep-alive hacia
+    VUCEM conservan su sesión TLS, por lo que solo la primera petición de cada
+    conexión paga el handshake.
     """
 
-    def __init__(self):
-        self.base_url = SETTINGS.SOAP_SERVICE_URL
-        self.timeout = 5  # Timeout por default
+    def __init__(self, base_url=None, verify=None, timeout=None,
+                 max_connections=None, max_keepalive_connections=None,
+                 keepalive_expiry=None, retry_policy: RetryPolicy = None,
+                 limiters: EndpointLimiters = None, breakers: CircuitBreakers = None,
+                 hedger: RequestHedger = None, rate_limiter: TokenBucket = None):
+        self.base_url = base_url or SETTINGS.SOAP_SERVICE_URL
+        self.verify = verify if verify is not None else SETTINGS.context
+        self.timeout = timeout if timeout is not None else SETTINGS.SOAP_TIMEOUT_SECONDS
+        self.limits = httpx.Limits(
+            max_connections=max_connections or SETTINGS.SOAP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or SETTINGS.SOAP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else SETTINGS.SOAP_KEEPALIVE_EXPIRY_SECONDS
+        )
+        self.retry_policy = retry_policy or RetryPolicy.from_settings()
+        self.limiters = limiters or EndpointLimiters()
+        self.breakers = breakers or CircuitBreakers()
+        self.hedger = hedger or (RequestHedger() if SETTINGS.SOAP_HEDGE_ENABLED else None)
+        # Peticiones por segundo hacia VUCEM, compartido por todo el proceso
+        self.rate_limiter = rate_limiter or get_rate_limiter(VUCEM)
+        self.single_flight = SingleFlight()
+        self.transfer_stats = TransferStats()
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> httpx.Client:
+        """Cliente compartido, creado la primera vez que se necesita."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        verify=self.verify,
+                        timeout=self.timeout,
+                        limits=self.limits
+                    )
+        return self._client
+
+    def close(self):
+        """Cierra el pool de conexiones. Un make_request posterior abre uno nuevo."""
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+        if self.hedger:
+            self.hedger.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def make_request(self, endpoint, data=None, headers=None, max_retries=None, on_failure=None):
+        """
+        Envía la petición SOAP reintentando solo fallos transitorios según
+        self.retry_policy. Cada intento ocupa un lugar del límite adaptativo
+        del endpoint mientras está en vuelo.
+
+        Args:
+            endpoint: Ruta del servicio relativa a base_url
+            data: XML de la petición (bytes o str)
+            headers: Headers HTTP
+            max_retries: Máximo de intentos (default el de la política)
+            on_failure: Función opcional que recibe el tipo de fallo de cada
+                intento fallido (p. ej. para dejar en pausa una credencial
+                limitada por VUCEM); si devuelve True no se reintenta y quien
+                llama genera la petición con otra credencial. Si una petición
+                coalescida se detiene así, las que esperaban con la misma
+                credencial reciben el fallo y las firmadas con otra se envían
+                por su cuenta
+
+        Returns:
+            httpx.Response o None si la petición no se pudo completar
+
+        Raises:
+            CircuitOpenError: si el circuito del endpoint está abierto; la
+                petición no llegó a VUCEM y el servicio debe quedar pendiente
+        """
+        max_attempts = max_retries or self.retry_policy.max_attempts
+        # Los templates ya entregan bytes; se acepta str por compatibilidad
+        content = data.encode('utf-8') if isinstance(data, str) else data
+        content = content or None
+        leader = []
+
+        def call():
+            leader.append(True)
+            return self._make_request(endpoint, content, headers, max_attempts, on_failure)
+
+        # Peticiones idénticas en vuelo (misma consulta, aunque con otras
+        # credenciales) comparten una sola llamada y el mismo objeto respuesta
+        response = self.single_flight.do(soap_request_key(endpoint, content), call)
+        if isinstance(response, BenchedCredential) and not leader:
+            response = self._follow_benched(response, endpoint, content, headers, max_attempts, on_failure)
+        return None if isinstance(response, BenchedCredential) else response
+
+    def _follow_benched(self, benched, endpoint, content, headers, max_attempts, on_failure):
+        """
+        Petición coalescida cuya llamada real se detuvo por la credencial:
+        con la misma credencial se reporta el mismo fallo sin volver a VUCEM;
+        con otra, la consulta no tiene por qué fallar y se envía por separado.
+        """
+        if content == benched.content:
+            if on_failure:
+                on_failure(benched.failure)
+            return None
+        return self._make_request(endpoint, content, headers, max_attempts, on_failure)
+
+    def _make_request(self, endpoint, content, headers, max_attempts, on_failure=None):
+        """Petición real a VUCEM con reintentos, límite adaptativo, circuit breaker y hedging"""
+        self.retry_policy.record_request(endpoint)
+        limiter = self.limiters.get(endpoint)
+        breaker = self.breakers.get(endpoint)
+        hedger = self.hedger if self.hedger and self.hedger.applies_to(endpoint) else None
+        # Todas las rutas SOAP negocian compresión; httpx descomprime al leer
+        headers = {'Accept-Encoding': SETTINGS.SOAP_ACCEPT_ENCODING, **(headers or {})}
+
+        def send():
+            response = self.client.post(
+                f"{self.base_url}/{endpoint}",
+                content=content,
+                headers=headers
+            )
+            response.raise_for_status()
+            return response
 
-    def make_request(self, endpoint, data=None, headers=None, max_retries=5):
         intento = 0
-        while intento < max_retries:
+        while True:
+            intento += 1
+            if not breaker.allow_request():
+                raise CircuitOpenError(endpoint, breaker.retry_after())
+            # Turno del límite global antes de ocupar lugar en el límite adaptativo,
+            # para que la espera no cuente como latencia del endpoint
+            self.rate_limiter.acquire()
+            limiter.acquire()
+            start = time.perf_counter()
             try:
-                with httpx.Client(verify=SETTINGS.context, timeout=self.timeout) as client:
-                    content = data.encode('utf-8') if data else None
-                    response = client.post(
-                        f"{self.base_url}/{endpoint}",
-                        content=content,
-                        headers=headers
-                    )
-                    response.raise_for_status()
-                    return response  # ✅ éxito
+                if hedger:
+                    response = hedger.call(endpoint, send, self.rate_limiter)
+                else:
+                    response = send()
             except Exception as e:
-                intento += 1
-                wait_time = 0
-                print(f"[{endpoint}] Error intento {intento}: {e}. Reintentando en {wait_time}s...")
+                failure = classify_exception(e)
+                if on_failure and on_failure(failure):
+                    # El fallo es de la credencial, no del endpoint: no reduce el
+                    # límite adaptativo ni cuenta para el circuito de VUCEM
+                    limiter.release(time.perf_counter() - start, failure, adjust=False)
+                    breaker.record_neutral()
+                    # El envelope va firmado con una credencial que quedó en pausa:
+                    # reintentarlo solo insiste contra la cuenta limitada
+                    logger.warning("[%s] Fallo (%s) en intento %s: %s. Sin reintentos con esta credencial.",
+                                   endpoint, failure, intento, e)
+                    return BenchedCredential(failure, content)
+                limiter.release(time.perf_counter() - start, failure)
+                breaker.record_failure(failure)
+                if not self.retry_policy.should_retry(endpoint, failure, intento, max_attempts):
+                    logger.warning("[%s] Fallo (%s) en intento %s: %s. Sin más reintentos.", endpoint, failure, intento, e)
+                    return None
+                wait_time = self.retry_policy.backoff(intento)
+                logger.warning("[%s] Error (%s) intento %s: %s. Reintentando en %.2fs...", endpoint, failure, intento, e, wait_time)
                 time.sleep(wait_time)
+                continue
+            elapsed = time.perf_counter() - start
+            limiter.release(elapsed)
+            breaker.record_success()
+            self.transfer_stats.record(endpoint, response)
+            if hedger:
+                hedger.record_latency(endpoint, elapsed)
+            return response  # ✅ éxito
+
+    def retry_stats(self):
+        """Reintentos y fallos por endpoint desde que se creó el controlador"""
+        return self.retry_policy.stats()
 
-        print(f"[{endpoint}] Fallo tras {max_retries} intentos.")
-        return None
+    def metrics(self):
+        """Métricas del cliente SOAP por endpoint"""
+        return {
+            'retries': self.retry_policy.stats(),
+            'concurrency_limits': self.limiters.snapshot(),
+            'circuit_breakers': self.breakers.snapshot(),
+            'hedging': self.hedger.stats() if self.hedger else {},
+            'coalescing': self.single_flight.stats(),
+            'transfer': self.transfer_stats.snapshot(),
+            'rate_limit': self.rate_limiter.stats(),
+        }
@@ -1,13 +1,30 @@
 from dataclasses import dataclass
+import asyncio
+import math
+import signal
 import threading
+import httpx
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from contextlib import nullcontext
 
 from controllers.RESTController import APIController
 from controllers.SOAPService import SOAPController
+from controllers.AsyncRESTController import AsyncAPIController
+from controllers.AsyncSOAPService import AsyncSOAPController
+from utils.circuit_breaker import CircuitOpenError
+from utils.response_cache import SOAPResponseCache
+from utils.soap_errors import detect_soap_error
+from utils.pedimento_extractor import FieldExtractor, parse_fields
+from utils.service_feed import ServiceFeed
+from utils.fair_queue import FairQueue, importer_of
+from utils.health_server import HealthServer
 from payload_structure.template_manager import SOAPTemplateManager
 from payload_structure.credentials_manager import CredentialsManager
+from payload_structure.credential_pool import CredentialLease
 from config.settings import SETTINGS  # Import SETTINGS
+from utils.debug_logger import get_logger, setup_logging
 
 from payload_structure.soap_models import (
     CredencialesSOAP, 
@@ -19,6 +36,8 @@ from payload_structure.soap_models import (
     ConsultaRemesas
 )
 
+logger = get_logger(__name__)
+
 @dataclass
 class MainProcess:
     """
@@ -28,17 +47,27 @@ class MainProcess:
     soap_controller: SOAPController = SOAPController()
     template_manager: SOAPTemplateManager = SOAPTemplateManager()
     credentials_manager: CredentialsManager = None
+    async_api_controller: AsyncAPIController = AsyncAPIController()
+    async_soap_controller: AsyncSOAPController = AsyncSOAPController()
+    response_cache: SOAPResponseCache = None
+    pedimento_extractor: FieldExtractor = None
     
     def __post_init__(self):
         """
         Método que se ejecuta después de la inicialización de la clase.
         Aquí puedes agregar cualquier configuración adicional necesaria.
         """
-        print("Inicializando el proceso de scraping...")
+        logger.info("Inicializando el proceso de scraping...")
         
         # Inicializar el gestor de credenciales
         self.credentials_manager = CredentialsManager(self.api_controller)
 
+        if self.response_cache is None and SETTINGS.SOAP_CACHE_ENABLED:
+            self.response_cache = SOAPResponseCache()
+
+        if self.pedimento_extractor is None and SETTINGS.PEDIMENTO_COMPLETO_FIELDS.strip():
+            self.pedimento_extractor = FieldExtractor(parse_fields(SETTINGS.PEDIMENTO_COMPLETO_FIELDS))
+
         #self.pedimentos = APIController.get_pedimentos()
     
     def consultar_estado_pedimento(self, importador: str, numero_operacion: str, 
@@ -58,10 +87,10 @@ class MainProcess:
             'SOAPAction': 'http://www.ventanillaunica.gob.mx/pedimentos/ws/oxml/consultarpedimentocompleto/consultarPedimentoCompleto'
         }
         
-        # Obtener credenciales dinámicamente
-        credenciales = self.credentials_manager.get_soap_credentials(importador)
-        if not credenciales:
-            print(f"No se pudieron obtener credenciales para el importador: {importador}")
+        # Obtener credenciales dinámicamente; con varias credenciales activas se reparte la carga
+        lease = self.credentials_manager.lease(importador)
+        if not lease:
+            logger.warning("No se pudieron obtener credenciales para el importador: %s", importador)
             return None
         
         # Crear objeto de consulta
@@ -72,27 +101,26 @@ class MainProcess:
             pedimento=pedimento
         )
         
-        # Generar XML usando el template manager
-        _data = self.template_manager.generar_consulta_estado_pedimento(
-            credenciales=credenciales,
-            consulta=consulta
-        )
-        
-        pedimento_result = self.soap_controller.make_request(
-            "ventanilla-ws-pedimentos/ConsultarEstadoPedimentosService?wsdl",
-            data=_data,
-            headers=headers
-        )
+        with lease:
+            # Generar XML usando el template manager (con otra credencial si VUCEM limita esta)
+            pedimento_result = self._send_with_credentials(
+                lease, importador, "ventanilla-ws-pedimentos/ConsultarEstadoPedimentosService?wsdl",
+                lambda credenciales: self.template_manager.generar_consulta_estado_pedimento(
+                    credenciales=credenciales,
+                    consulta=consulta
+                ),
+                headers
+            )
 
         if pedimento_result:
             # Verificar si la respuesta contiene error
             if self._has_soap_error(pedimento_result):
-                print(f"Respuesta SOAP contiene error para estado de pedimento {pedimento}, descartando...")
+                logger.warning("Respuesta SOAP contiene error para estado de pedimento %s, descartando...", pedimento)
                 return None
-            print(f"Estado del pedimento obtenido: {pedimento_result.content}")
+            logger.debug("Estado del pedimento obtenido (%s bytes)", len(pedimento_result.content))
             return pedimento_result
         else:
-            print("Error al consultar estado del pedimento")
+            logger.error("Error al consultar estado del pedimento")
             return None
     # Funcion deprecada, se recomienda usar get_pedimento_completo
     def listar_pedimentos(self):
@@ -115,11 +143,12 @@ class MainProcess:
         )
         
         if pedimentos:
-            print(f"Pedimentos listados: {pedimentos.content}")
+            logger.debug("Pedimentos listados (%s bytes)", len(pedimentos.content))
         else:
-            print("Error al listar pedimentos")
+            logger.error("Error al listar pedimentos")
     
-    def get_pedimento_completo(self, importador: str, aduana: str, patente: str, pedimento: str):
+    def get_pedimento_completo(self, importador: str, aduana: str, patente: str, pedimento: str,
+                               envelope: bytes = None, lease: CredentialLease = None):
         """
         Obtiene la información completa de un pedimento
         
@@ -128,44 +157,59 @@ class MainProcess:
             aduana: Código de aduana
             patente: Número de patente
             pedimento: Número de pedimento
+            envelope: Envelope ya generado (ver _render_page_envelopes); si no
+                se da, se obtienen las credenciales y se genera aquí
+            lease: Credencial ya prestada para generar el envelope (ver
+                _process_batch); quien la da la devuelve
         """
         headers = {
             'Content-Type': 'text/xml; charset=utf-8',
         }
         
-        # Obtener credenciales dinámicamente
-        credenciales = self.credentials_manager.get_soap_credentials(importador)
-        if not credenciales:
-            print(f"No se pudieron obtener credenciales para el importador: {importador}")
-            return None
-        
-        # Crear objeto de consulta
-        consulta = ConsultaPedimentoCompleto(
-            aduana=aduana,
-            patente=patente,
-            pedimento=pedimento
-        )
-        
-        # Generar XML usando el template manager
-        _data = self.template_manager.generar_consulta_pedimento_completo(
-            credenciales=credenciales,
-            consulta=consulta
-        )
-
+        cache_key = SOAPResponseCache.make_key('pedimento_completo', aduana, patente, pedimento)
+        cached = self._cached_response(cache_key)
+        if cached:
+            return self._extract_pedimento_fields(cached)
         
-        pedimento_response = self.soap_controller.make_request(
-            endpoint='ventanilla-ws-pedimentos/ConsultarPedimentoCompletoService?wsdl',
-            data=_data,
-            headers=headers
-        )
+        endpoint = 'ventanilla-ws-pedimentos/ConsultarPedimentoCompletoService?wsdl'
+        if envelope is not None:
+            # Los envelopes pre-generados son de importadores con una sola credencial
+            pedimento_response = self.soap_controller.make_request(endpoint=endpoint, data=envelope, headers=headers)
+        else:
+            # Obtener credenciales dinámicamente; con varias credenciales activas se reparte la carga
+            own_lease = None
+            if lease is None:
+                lease = own_lease = self.credentials_manager.lease(importador)
+            if not lease:
+                logger.warning("No se pudieron obtener credenciales para el importador: %s", importador)
+                return None
+            
+            # Crear objeto de consulta
+            consulta = ConsultaPedimentoCompleto(
+                aduana=aduana,
+                patente=patente,
+                pedimento=pedimento
+            )
+            
+            with own_lease or nullcontext():
+                # Generar XML usando el template manager (con otra credencial si VUCEM limita esta)
+                pedimento_response = self._send_with_credentials(
+                    lease, importador, endpoint,
+                    lambda credenciales: self.template_manager.generar_consulta_pedimento_completo(
+                        credenciales=credenciales,
+                        consulta=consulta
+                    ),
+                    headers
+                )
 
         
         if pedimento_response:
             # Verificar si la respuesta contiene error
             if self._has_soap_error(pedimento_response):
-                print(f"Respuesta SOAP contiene error para pedimento {pedimento}, descartando...")
+                logger.warning("Respuesta SOAP contiene error para pedimento %s, descartando...", pedimento)
                 return None
-            return pedimento_response
+            self._store_response(cache_key, pedimento_response)
+            return self._extract_pedimento_fields(pedimento_response)
         else:
             return None
     
@@ -186,10 +230,15 @@ class MainProcess:
             'Content-Type': 'text/xml; charset=utf-8',
         }
         
-        # Obtener credenciales dinámicamente
-        credenciales = self.credentials_manager.get_soap_credentials(importador)
-        if not credenciales:
-            print(f"No se pudieron obtener credenciales para el importador: {importador}")
+        cache_key = SOAPResponseCache.make_key('partida', aduana, patente, pedimento, numero_partida)
+        cached = self._cached_response(cache_key)
+        if cached:
+            return cached
+        
+        # Obtener credenciales dinámicamente; con varias credenciales activas se reparte la carga
+        lease = self.credentials_manager.lease(importador)
+        if not lease:
+            logger.warning("No se pudieron obtener credenciales para el importador: %s", importador)
             return None
         
         # Crear objeto de consulta
@@ -201,27 +250,27 @@ class MainProcess:
             numero_partida=numero_partida
         )
         
-        # Generar XML usando el template manager
-        _data = self.template_manager.generar_consulta_partida(
-            credenciales=credenciales,
-            consulta=consulta
-        )
-
-        response = self.soap_controller.make_request(
-            endpoint='/ventanilla-ws-pedimentos/ConsultarPartidaService?wsdl',
-            data=_data,
-            headers=headers
-        )
+        with lease:
+            # Generar XML usando el template manager (con otra credencial si VUCEM limita esta)
+            response = self._send_with_credentials(
+                lease, importador, '/ventanilla-ws-pedimentos/ConsultarPartidaService?wsdl',
+                lambda credenciales: self.template_manager.generar_consulta_partida(
+                    credenciales=credenciales,
+                    consulta=consulta
+                ),
+                headers
+            )
 
         if response:
             # Verificar si la respuesta contiene error
             if self._has_soap_error(response):
-                print(f"Respuesta SOAP contiene error para partidas del pedimento {pedimento}, descartando...")
+                logger.warning("Respuesta SOAP contiene error para partidas del pedimento %s, descartando...", pedimento)
                 return None
-            print(f"Partidas obtenidas: {response.content}")
+            logger.debug("Partidas obtenidas (%s bytes)", len(response.content))
+            self._store_response(cache_key, response)
             return response
         else:
-            print("Error al consultar partidas")
+            logger.error("Error al consultar partidas")
             return None
     
     def consultar_remesas(self, importador: str, aduana: str, patente: str, pedimento: str):
@@ -238,10 +287,15 @@ class MainProcess:
             'Content-Type': 'text/xml; charset=utf-8',
         }
         
-        # Obtener credenciales dinámicamente
-        credenciales = self.credentials_manager.get_soap_credentials(importador)
-        if not credenciales:
-            print(f"No se pudieron obtener credenciales para el importador: {importador}")
+        cache_key = SOAPResponseCache.make_key('remesas', aduana, patente, pedimento)
+        cached = self._cached_response(cache_key)
+        if cached:
+            return cached
+        
+        # Obtener credenciales dinámicamente; con varias credenciales activas se reparte la carga
+        lease = self.credentials_manager.lease(importador)
+        if not lease:
+            logger.warning("No se pudieron obtener credenciales para el importador: %s", importador)
             return None
         
         # Crear objeto de consulta
@@ -251,27 +305,27 @@ class MainProcess:
             pedimento=pedimento
         )
         
-        # Generar XML usando el template manager
-        _data = self.template_manager.generar_consulta_remesas(
-            credenciales=credenciales,
-            consulta=consulta
-        )
-        
-        remesas = self.soap_controller.make_request(
-            endpoint='ventanilla-ws-pedimentos/ConsultarRemesasService?wsdl',
-            data=_data,
-            headers=headers
-        )
+        with lease:
+            # Generar XML usando el template manager (con otra credencial si VUCEM limita esta)
+            remesas = self._send_with_credentials(
+                lease, importador, 'ventanilla-ws-pedimentos/ConsultarRemesasService?wsdl',
+                lambda credenciales: self.template_manager.generar_consulta_remesas(
+                    credenciales=credenciales,
+                    consulta=consulta
+                ),
+                headers
+            )
         
         if remesas:
             # Verificar si la respuesta contiene error
             if self._has_soap_error(remesas):
-                print(f"Respuesta SOAP contiene error para remesas del pedimento {pedimento}, descartando...")
+                logger.warning("Respuesta SOAP contiene error para remesas del pedimento %s, descartando...", pedimento)
                 return None
-            print(f"Remesas obtenidas: {remesas.content}")
+            logger.debug("Remesas obtenidas (%s bytes)", len(remesas.content))
+            self._store_response(cache_key, remesas)
             return remesas
         else:
-            print("Error al consultar remesas")
+            logger.error("Error al consultar remesas")
             return None
     
     def get_acuses(self, importador: str, id_edocument: str):
@@ -284,20 +338,23 @@ class MainProcess:
         """
         headers = {
             'Content-Type': 'text/xml; charset=utf-8',
-            'SOAPAction': 'http://www.ventanillaunica.gob.mx/ventanilla/ConsultaAcusesService/consultarAcuseCove',
-            'Accept-Encoding': 'gzip, deflate'
+            'SOAPAction': 'http://www.ventanillaunica.gob.mx/ventanilla/ConsultaAcusesService/consultarAcuseCove'
         }
 
-        # Obtener credenciales dinámicamente
-        credenciales = self.credentials_manager.get_soap_credentials(importador)
-        if not credenciales:
-            print(f"No se pudieron obtener credenciales para el importador: {importador}")
+        cache_key = SOAPResponseCache.make_key('acuses', id_edocument)
+        cached = self._cached_response(cache_key)
+        if cached:
+            return cached
+
+        # Obtener credenciales dinámicamente (una sola consulta para credenciales y permisos)
+        if not self.credentials_manager.get_credentials_by_user(importador):
+            logger.warning("No se pudieron obtener credenciales para el importador: %s", importador)
             return None
         
-        # Verificar si el usuario tiene permisos para acuses
-        vucem_creds = self.credentials_manager.get_credentials_by_user(importador)
-        if vucem_creds and not vucem_creds.acusecove:
-            print(f"El usuario {importador} no tiene permisos para consultar acuses COVE")
+        # Solo se reparte entre las credenciales con permiso para acuses COVE
+        lease = self.credentials_manager.lease(importador, capability='acusecove')
+        if not lease:
+            logger.warning("El usuario %s no tiene permisos para consultar acuses COVE", importador)
             return None
 
         # Crear objeto de consulta
@@ -305,37 +362,308 @@ class MainProcess:
             id_edocument=id_edocument
         )
         
-        # Generar XML usando el template manager
-        _data = self.template_manager.generar_consulta_acuses(
-            credenciales=credenciales,
-            consulta=consulta
-        )
-
-        response = self.soap_controller.make_request(
-            endpoint='ventanilla-acuses-HA/ConsultaAcusesServiceWS?wsdl',
-            data=_data,
-            headers=headers
-        )
+        with lease:
+            # Generar XML usando el template manager (con otra credencial con
+            # permiso para acuses si VUCEM limita esta)
+            response = self._send_with_credentials(
+                lease, importador, 'ventanilla-acuses-HA/ConsultaAcusesServiceWS?wsdl',
+                lambda credenciales: self.template_manager.generar_consulta_acuses(
+                    credenciales=credenciales,
+                    consulta=consulta
+                ),
+                headers, capability='acusecove'
+            )
 
         if response:
             # Verificar si la respuesta contiene error
             if self._has_soap_error(response):
-                print(f"Respuesta SOAP contiene error para acuses del documento {id_edocument}, descartando...")
+                logger.warning("Respuesta SOAP contiene error para acuses del documento %s, descartando...", id_edocument)
                 return None
-            print(f"Acuse obtenido: {response.content}")
+            logger.debug("Acuse obtenido (%s bytes)", len(response.content))
+            self._store_response(cache_key, response)
             return response
         else:
-            print("Error al obtener acuses")
+            logger.error("Error al obtener acuses")
             return None
     
+    def _send_with_credentials(self, lease, importador, endpoint, render, headers, capability=None):
+        """
+        Envía a VUCEM la consulta que genera render(credenciales SOAP) con la credencial prestada
+        
+        Si VUCEM limita (429) o rechaza la credencial, make_request no reintenta
+        con ese envelope: la credencial queda en pausa y la consulta se vuelve a
+        generar con otra credencial del importador que no esté en pausa, hasta
+        agotarlas. Quien llama devuelve lease; los préstamos extra se devuelven aquí.
+        
+        Args:
+            lease: Credencial prestada para el primer intento
+            importador: Usuario del importador
+            endpoint: Ruta del servicio SOAP
+            render: Función credenciales SOAP -> envelope
+            headers: Headers HTTP
+            capability: Permiso que deben tener las otras credenciales (ver CredentialsManager.lease)
+        
+        Returns:
+            httpx.Response o None
+        """
+        response = self.soap_controller.make_request(
+            endpoint, data=render(lease.soap_credentials), headers=headers, on_failure=lease.report)
+        tried = {lease.key}
+        while response is None and lease.benched:
+            lease = self.credentials_manager.lease(importador, capability)
+            if lease is None or lease.benched or lease.key in tried:
+                if lease:
+                    lease.release()
+                break
+            tried.add(lease.key)
+            logger.info("Reintentando %s de %s con la credencial %s", endpoint, importador, lease.key)
+            with lease:
+                response = self.soap_controller.make_request(
+                    endpoint, data=render(lease.soap_credentials), headers=headers, on_failure=lease.report)
+        return response
+
+    async def _send_with_credentials_async(self, lease, importador, endpoint, render, headers, capability=None):
+        """Versión asíncrona de _send_with_credentials"""
+        response = await self.async_soap_controller.make_request(
+            endpoint, data=render(lease.soap_credentials), headers=headers, on_failure=lease.report)
+        tried = {lease.key}
+        while response is None and lease.benched:
+            lease = await asyncio.to_thread(self.credentials_manager.lease, importador, capability)
+            if lease is None or lease.benched or lease.key in tried:
+                if lease:
+                    lease.release()
+                break
+            tried.add(lease.key)
+            logger.info("Reintentando %s de %s con la credencial %s", endpoint, importador, lease.key)
+            with lease:
+                response = await self.async_soap_controller.make_request(
+                    endpoint, data=render(lease.soap_credentials), headers=headers, on_failure=lease.report)
+        return response
+
+    def _cached_response(self, cache_key):
+        """
+        Busca una respuesta en el cache en disco
+        
+        Returns:
+            httpx.Response reconstruida con el cuerpo guardado, o None
+        """
+        if not self.response_cache:
+            return None
+        body = self.response_cache.get(cache_key)
+        if body is None:
+            return None
+        return httpx.Response(200, content=body, headers={'Content-Type': 'text/xml; charset=utf-8'})
+    
+    def _store_response(self, cache_key, response):
+        """Guarda en el cache una respuesta SOAP sin errores; un fallo del disco no afecta al servicio"""
+        if self.response_cache:
+            try:
+                self.response_cache.put(cache_key, response.content)
+            except OSError as e:
+                logger.warning("No se pudo guardar la respuesta en el cache: %s", e)
+    
+    def _extract_pedimento_fields(self, response):
+        """
+        Lee de la respuesta de pedimento completo los campos de
+        PEDIMENTO_COMPLETO_FIELDS y los deja en response.extensions['campos_pedimento']
+        """
+        if self.pedimento_extractor and 'campos_pedimento' not in response.extensions:
+            response.extensions['campos_pedimento'] = self.pedimento_extractor.extract(response.content)
+        return response
+    
+    def _update_pedimento_fields(self, pedimento_id, soap_result, pedimento):
+        """
+        Escribe en el pedimento los campos extraídos de la respuesta
+        
+        Returns:
+            bool: True si se actualizó el pedimento
+        """
+        campos = self._campos_pedimento(soap_result, pedimento)
+        if not campos:
+            return False
+        return bool(self.api_controller.put_pedimento(pedimento_id, campos))
+    
+    def _campos_pedimento(self, soap_result, pedimento):
+        """
+        Datos para actualizar el pedimento con los campos extraídos
+        
+        Returns:
+            dict para put_pedimento, o None si no se extrajo ningún campo
+        """
+        campos = getattr(soap_result, 'extensions', {}).get('campos_pedimento')
+        if not campos or not any(campos.values()):
+            return None
+        # Igual que ventanilla_unica_document_scraping: el número de pedimento es el del servicio
+        return {**campos, 'pedimento': pedimento}
+    
     def run_services(self):
         """
         Método para iniciar los servicios necesarios.
         Aquí puedes agregar la lógica para iniciar los servicios que necesites.
         """
-        print("Iniciando servicios...")
+        logger.info("Iniciando servicios...")
         # Ejemplo: iniciar el servicio SOAP
     
+    def _render_page_envelopes(self, services_list):
+        """
+        Genera en un solo render_batch los envelopes de pedimento completo de
+        toda la página. Las credenciales de todos los importadores de la página
+        se piden de una vez (ver CredentialsManager.prefetch) y quedan en cache
+        para los hilos de trabajo. Los servicios incompletos, sin credenciales
+        o de importadores con varias credenciales activas (que se eligen al
+        enviar, según la carga de cada una) no se incluyen y siguen el camino
+        normal de get_pedimento_completo.
+        
+        Returns:
+            Dict id de servicio -> envelope
+        """
+        try:
+            credenciales_por_importador = {
+                importador: credenciales.to_soap_credentials()
+                for importador, credenciales in self.credentials_manager.prefetch_for_services(services_list).items()
+                if credenciales and len(self.credentials_manager.get_active_credentials_for_user(importador)) <= 1
+            }
+        except Exception as e:
+            logger.error("Error obteniendo las credenciales de la página: %s", e)
+            credenciales_por_importador = {}
+        service_ids = []
+        consultas = []
+        for service in services_list:
+            pedimento = service.get('pedimento', {})
+            importador = pedimento.get('contribuyente')
+            campos = (pedimento.get('aduana'), pedimento.get('patente'), pedimento.get('pedimento'))
+            if not all((importador, service.get('id')) + campos):
+                continue
+            credenciales = credenciales_por_importador.get(importador)
+            if credenciales:
+                service_ids.append(service['id'])
+                consultas.append((credenciales, ConsultaPedimentoCompleto(*campos)))
+        envelopes = self.template_manager.render_batch('consultar_pedimento_completo', consultas)
+        return dict(zip(service_ids, envelopes))
+
+    def _process_service(self, service, organizacion, envelope, results, thread_id, lease=None):
+        """
+        Procesa un servicio de pedimento completo: consulta SOAP, documento,
+        campos del pedimento y estados del servicio
+        
+        Args:
+            service: Servicio tal como lo devuelve la API
+            organizacion: Organización de la página del servicio
+            envelope: Envelope ya generado (ver _render_page_envelopes) o None
+            results: Contadores del hilo o página, se actualizan en sitio
+            thread_id: Nombre del hilo para los mensajes
+            lease: Credencial del micro-lote (ver _process_batch) o None
+        """
+        results['processed'] += 1
+        
+        try:
+            importador = service.get('pedimento', {}).get('contribuyente')
+            aduana = service.get('pedimento', {}).get('aduana')
+            patente = service.get('pedimento', {}).get('patente')
+            pedimento = service.get('pedimento', {}).get('pedimento')
+            service_id = service.get('id')
+            
+            if not all([importador, aduana, patente, pedimento, service_id]):
+                error_msg = f"Datos incompletos en servicio {service_id}: importador={importador}, aduana={aduana}, patente={patente}, pedimento={pedimento}"
+                logger.error("[%s] %s", thread_id, error_msg)
+                results['errors'].append(error_msg)
+                results['failed'] += 1
+                return
+            
+            logger.debug("[%s] Procesando pedimento %s (servicio %s)", thread_id, pedimento, service_id)
+            
+            # Obtener el pedimento completo. Los reintentos de fallos
+            # transitorios los hace SOAPController según su política
+            soap_result = None
+            try:
+                soap_result = self.get_pedimento_completo(
+                    importador=importador,
+                    aduana=aduana,
+                    patente=patente,
+                    pedimento=pedimento,
+                    envelope=envelope,
+                    lease=lease
+                )
+            except CircuitOpenError as e:
+                # VUCEM no está disponible: el servicio queda pendiente (estado 1)
+                # para la siguiente corrida en lugar de marcarse como fallido
+                logger.warning("[%s] %s. Servicio %s queda pendiente", thread_id, e, service_id)
+                results['skipped'] += 1
+                return
+            except IndexError as e:
+                logger.error("[%s] Error de índice de lista para pedimento %s: %s", thread_id, pedimento, e)
+                results['errors'].append(f"Error de credenciales para pedimento {pedimento}: {str(e)}")
+            except Exception as e:
+                logger.error("[%s] Error obteniendo pedimento %s: %s", thread_id, pedimento, e)
+                results['errors'].append(f"Error obteniendo pedimento {pedimento}: {str(e)}")
+            
+            if soap_result:
+                # Enviar respuesta SOAP como documento
+                doc_result = self.api_controller.post_document(
+                    soap_response=soap_result, 
+                    organizacion=organizacion, 
+                    pedimento=service.get('pedimento', {}).get('id'), 
+                    file_name=f"pedimento_completo_{pedimento}.xml"
+                )
+                
+                if doc_result:
+                    logger.debug("[%s] Pedimento completo XML %s enviado exitosamente", thread_id, pedimento)
+                    
+                    # Escribir en el pedimento los campos ya extraídos de la respuesta
+                    pedimento_actualizado = self._update_pedimento_fields(
+                        service.get('pedimento', {}).get('id'), soap_result, pedimento
+                    )
+                    
+                    # Actualizar estado a exitoso (3)
+                    update_result = self.api_controller.put_pedimento_service(
+                        service_id=service_id,
+                        data={
+                            "estado": 3,
+                            "pedimento": service.get('pedimento', {}).get('id'),
+                            "tipo_procesamiento": 2,
+                            "servicio": 8
+                        }
+                    )
+                    # Con los campos ya escritos el servicio 8 nace terminado y el
+                    # scraper de documentos no vuelve a descargar el XML
+                    self.api_controller.post_pedimento_service(
+                        data={
+                            "estado": 3 if pedimento_actualizado else 1,
+                            "pedimento": service.get('pedimento', {}).get('id'),
+                            "tipo_procesamiento": 2,
+                            "servicio": 8
+                        }
+                    )
+                        
+                    
+                    
+                    if update_result:
+                        results['successful'] += 1
+                        logger.debug("[%s] Estado actualizado a exitoso para servicio %s", thread_id, service_id)
+                    else:
+                        results['errors'].append(f"Error actualizando estado exitoso para servicio {service_id}")
+                else:
+                    results['errors'].append(f"Error enviando documento para pedimento {pedimento}")
+                    results['failed'] += 1
+            else:
+                logger.error("[%s] Error obteniendo pedimento completo %s", thread_id, pedimento)
+                
+                # Actualizar estado a fallido (2)
+                self.api_controller.put_pedimento_service(
+                    service_id=service_id,
+                    data={
+                        "estado": 2,
+                        "pedimento": service.get('pedimento', {}).get('id')
+                    }
+                )
+                results['failed'] += 1
+                
+        except Exception as e:
+            error_msg = f"Error procesando servicio {service.get('id', 'unknown')}: {str(e)}"
+            logger.error("[%s] %s", thread_id, error_msg)
+            results['errors'].append(error_msg)
+            results['failed'] += 1
+
     def process_pedimento_services_single_page(self, page=1, service_type=3):
         """
         Procesa servicios de pedimentos de una página específica
@@ -348,7 +676,7 @@ class MainProcess:
             Dict con resultados del procesamiento de la página
         """
         thread_id = threading.current_thread().name
-        print(f"[{thread_id}] Procesando página {page} con service_type={service_type}")
+        logger.info("[%s] Procesando página %s con service_type=%s", thread_id, page, service_type)
         
         results = {
             'page': page,
@@ -356,92 +684,411 @@ class MainProcess:
             'processed': 0,
             'successful': 0,
             'failed': 0,
+            'skipped': 0,
             'errors': []
         }
         
         try:
-            # Pequeña pausa para evitar sobrecarga del servidor
-            time.sleep(SETTINGS.REQUEST_DELAY_SECONDS)
-            
             # Obtener servicios de pedimentos desde la API para esta página
             services = self.api_controller.get_pedimento_services(page=page, service_type=service_type)
             services_list = services.get('results', []) if services else []
 
             if not services:
-                print(f"[{thread_id}] No se pudieron obtener servicios para página {page}")
+                logger.warning("[%s] No se pudieron obtener servicios para página %s", thread_id, page)
                 results['errors'].append(f"No se pudieron obtener servicios para página {page}")
                 return results
             
             if not services_list:
-                print(f"[{thread_id}] No hay servicios en página {page}")
+                logger.info("[%s] No hay servicios en página %s", thread_id, page)
                 return results
             
-            print(f"[{thread_id}] Procesando {len(services_list)} servicios en página {page}")
+            logger.info("[%s] Procesando %s servicios en página %s", thread_id, len(services_list), page)
+            envelopes = self._render_page_envelopes(services_list)
             
             # Procesar cada servicio de esta página
             for service in services_list:
-                results['processed'] += 1
+                self._process_service(service, services.get('organizacion', ''), envelopes.get(service.get('id')),
+                                      results, thread_id)
+            
+            logger.info("[%s] Página %s completada: %s exitosos, %s fallidos", thread_id, page, results['successful'], results['failed'])
+            return results
+            
+        except Exception as e:
+            error_msg = f"Error general en página {page}: {str(e)}"
+            logger.error("[%s] %s", thread_id, error_msg)
+            results['errors'].append(error_msg)
+            return results
+
+    def _process_batch(self, batch, results, thread_id):
+        """
+        Procesa seguidos los servicios de un micro-lote (mismo importador y tipo)
+        
+        Los servicios sin envelope pre-generado comparten una sola credencial
+        prestada para todo el lote, y al ir uno detrás de otro en el mismo hilo
+        reutilizan la conexión a VUCEM que dejó abierta el anterior. Si VUCEM
+        pone la credencial en pausa se pide otra para el resto del lote.
+        
+        Args:
+            batch: Lista de FeedItem (ver ServiceFeed.batches)
+            results: Contadores del hilo, se actualizan en sitio
+            thread_id: Nombre del hilo para los mensajes
+        """
+        lease = None
+        try:
+            for item in batch:
+                if item.envelope is None and (lease is None or lease.benched):
+                    if lease:
+                        lease.release()
+                    lease = self.credentials_manager.lease(importer_of(item))
+                self._process_service(item.service, item.organizacion, item.envelope, results, thread_id,
+                                      lease=lease if item.envelope is None else None)
+        finally:
+            if lease:
+                lease.release()
+
+    def _consume_services(self, feed, results=None):
+        """
+        Consumidor del feed: procesa servicios hasta que el productor termina
+        
+        Args:
+            feed: ServiceFeed del que se toman los servicios
+            results: Contadores a actualizar (default unos nuevos); el modo
+                     continuo los lee mientras el hilo trabaja
+        
+        Returns:
+            Dict con los resultados del hilo
+        """
+        thread_id = threading.current_thread().name
+        if results is None:
+            results = {
+                'processed': 0,
+                'successful': 0,
+                'failed': 0,
+                'skipped': 0,
+                'errors': []
+            }
+        results['thread_id'] = thread_id
+        for batch in feed.batches():
+            self._process_batch(batch, results, thread_id)
+        logger.info("[%s] Feed agotado: %s exitosos, %s fallidos", thread_id, results['successful'], results['failed'])
+        return results
+
+    def process_pedimento_services(self, start_page=1, end_page=None, service_type=3, max_workers=3):
+        """
+        Procesa servicios de pedimentos con un productor y max_workers consumidores
+        
+        Un hilo recorre el listado paginado de la API por delante y encola los
+        servicios (ver utils/service_feed.py); cada hilo de trabajo toma el
+        siguiente servicio disponible, así ningún hilo espera a una página lenta.
+        
+        Args:
+            start_page: Página inicial (default 1)
+            end_page: Página final; None procesa todo el backlog pendiente (default)
+            service_type: Tipo de servicio (default 3)
+            max_workers: Número máximo de hilos concurrentes (default 3)
+        """
+        logger.info("=== Iniciando procesamiento multihilo de servicios de pedimentos ===")
+        logger.info("Páginas: %s a %s, Tipo de servicio: %s, Hilos: %s",
+                    start_page, end_page or 'fin del feed', service_type, max_workers)
+        
+        start_time = time.time()
+        all_results = []
+        all_errors = []
+        
+        # Una conexión a la API por hilo como mínimo, más la del productor
+        self.api_controller.size_pool(max_workers + 1)
+        
+        feed = ServiceFeed(
+            fetch_page=lambda page: self.api_controller.get_pedimento_services(page=page, service_type=service_type),
+            prepare_page=self._render_page_envelopes,
+            start_page=start_page,
+            end_page=end_page,
+            scheduler=FairQueue.from_settings(SETTINGS.SERVICE_FEED_QUEUE_SIZE),
+            lookahead_pages=SETTINGS.SCHEDULER_LOOKAHEAD_PAGES,
+            batch_size=SETTINGS.SCHEDULER_BATCH_MAX_SIZE,
+            batch_delay=SETTINGS.SCHEDULER_BATCH_MAX_DELAY_SECONDS
+        ).start()
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="PedimentoWorker") as executor:
+                futures = [executor.submit(self._consume_services, feed) for _ in range(max_workers)]
                 
+                # Procesar resultados conforme terminan los consumidores
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                        all_results.append(result)
+                        all_errors.extend(result['errors'])
+                    except Exception as e:
+                        error_msg = f"Error en hilo consumidor: {str(e)}"
+                        logger.error("%s", error_msg)
+                        all_errors.append(error_msg)
+        finally:
+            feed.close()
+        all_errors.extend(feed.stats.errors)
+        
+        # Mostrar resumen final
+        duration = time.time() - start_time
+        return self._summarize_results(
+            "RESUMEN DEL PROCESAMIENTO MULTIHILO", duration, all_results, all_errors,
+            self._soap_metrics(self.soap_controller), self.api_controller.metrics(),
+            pages_processed=feed.stats.pages, importer_stats=feed.scheduler.stats(),
+            batch_stats=feed.scheduler.batch_stats()
+        )
+        
+    def run_daemon(self, service_type=None, max_workers=None, health_port=None, stop_event=None):
+        """
+        Modo continuo: procesa servicios pendientes conforme aparecen hasta
+        recibir SIGTERM/SIGINT (o hasta que se active stop_event).
+        
+        El feed se consulta sin parar mientras haya trabajo y, sin servicios
+        nuevos, con espera creciente entre DAEMON_IDLE_MIN_SECONDS y
+        DAEMON_IDLE_MAX_SECONDS. Controladores, pools y caches se conservan
+        entre consultas. Al parar, los servicios ya encolados se descartan
+        (siguen en estado 1) y se espera a que terminen los que están en curso.
+        
+        Args:
+            service_type: Tipo de servicio (default desde configuración)
+            max_workers: Hilos consumidores (default desde configuración)
+            health_port: Puerto de /health y /metrics; 0 lo desactiva (default DAEMON_HEALTH_PORT)
+            stop_event: threading.Event para detener el modo continuo desde otro hilo
+        """
+        service_type = service_type or SETTINGS.DEFAULT_SERVICE_TYPE
+        max_workers = max_workers or SETTINGS.DEFAULT_MAX_WORKERS
+        health_port = SETTINGS.DAEMON_HEALTH_PORT if health_port is None else health_port
+        stop_event = stop_event or threading.Event()
+        logger.info("=== Iniciando modo continuo: Tipo de servicio: %s, Hilos: %s ===", service_type, max_workers)
+        
+        start_time = time.time()
+        state = {'status': 'ok'}
+        restore_signals = self._install_stop_signals(stop_event)
+        self.api_controller.size_pool(max_workers + 1)
+        feed = ServiceFeed(
+            fetch_page=lambda page: self.api_controller.get_pedimento_services(page=page, service_type=service_type),
+            prepare_page=self._render_page_envelopes,
+            # Corre semanas: los importadores sin trabajo no se acumulan en /metrics
+            scheduler=FairQueue.from_settings(SETTINGS.SERVICE_FEED_QUEUE_SIZE, forget_idle=True),
+            lookahead_pages=SETTINGS.SCHEDULER_LOOKAHEAD_PAGES,
+            batch_size=SETTINGS.SCHEDULER_BATCH_MAX_SIZE,
+            batch_delay=SETTINGS.SCHEDULER_BATCH_MAX_DELAY_SECONDS,
+            continuous=True,
+            idle_min_seconds=SETTINGS.DAEMON_IDLE_MIN_SECONDS,
+            idle_max_seconds=SETTINGS.DAEMON_IDLE_MAX_SECONDS,
+            seen_ttl=SETTINGS.DAEMON_RETRY_PENDING_SECONDS
+        )
+        # Errores acotados: el proceso puede correr semanas
+        worker_results = [
+            {'processed': 0, 'successful': 0, 'failed': 0, 'skipped': 0, 'errors': deque(maxlen=100)}
+            for _ in range(max_workers)
+        ]
+        
+        def health():
+            # Sin consultas exitosas en varios periodos de espera la API no responde
+            poll_age = time.time() - feed.stats.last_poll
+            stale = poll_age > 3 * SETTINGS.DAEMON_IDLE_MAX_SECONDS
+            status = state['status'] if feed.running and not stale else 'unhealthy'
+            return {'status': status, 'uptime_seconds': round(time.time() - start_time, 1),
+                    'last_poll_seconds_ago': round(poll_age, 1)}
+        
+        def metrics():
+            return {
+                **health(),
+                'services': {key: sum(results[key] for results in worker_results)
+                             for key in ('processed', 'successful', 'failed', 'skipped')},
+                'feed': {'pages': feed.stats.pages, 'sweeps': feed.stats.sweeps, 'queued': feed.stats.services,
+                         'idle_polls': feed.stats.idle_polls, 'deferred': feed.stats.deferred},
+                'importers': feed.scheduler.stats(),
+                'batching': feed.scheduler.batch_stats(),
+                'soap': self._soap_metrics(self.soap_controller),
+                'api': self.api_controller.metrics(),
+            }
+        
+        health_server = HealthServer(health_port, health, metrics, host=SETTINGS.DAEMON_HEALTH_HOST).start() \
+            if health_port else None
+        feed.start()
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="PedimentoWorker") as executor:
+                futures = [executor.submit(self._consume_services, feed, results) for results in worker_results]
+                # Espera en intervalos cortos para atender señales y detectar un productor caído
+                while not stop_event.wait(1):
+                    if all(future.done() for future in futures):
+                        logger.error("Los consumidores terminaron sin señal de parada")
+                        break
+                state['status'] = 'draining'
+                logger.info("Deteniendo modo continuo: esperando servicios en curso...")
+                feed.close()
+                wait(futures)
+        finally:
+            feed.close()
+            if health_server:
+                health_server.stop()
+            restore_signals()
+        
+        all_errors = [error for results in worker_results for error in results['errors']]
+        all_errors.extend(feed.stats.errors)
+        return self._summarize_results(
+            "RESUMEN DEL MODO CONTINUO", time.time() - start_time, worker_results, all_errors,
+            self._soap_metrics(self.soap_controller), self.api_controller.metrics(),
+            pages_processed=feed.stats.pages, importer_stats=feed.scheduler.stats(),
+            batch_stats=feed.scheduler.batch_stats()
+        )
+
+    @staticmethod
+    def _install_stop_signals(stop_event):
+        """
+        SIGTERM/SIGINT activan stop_event (solo desde el hilo principal)
+        
+        Returns:
+            Función que restaura los handlers anteriores
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return lambda: None
+        previous = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT)}
+        
+        def handler(signum, frame):
+            logger.info("Señal %s recibida", signal.Signals(signum).name)
+            stop_event.set()
+        
+        for sig in previous:
+            signal.signal(sig, handler)
+        return lambda: [signal.signal(sig, previous_handler) for sig, previous_handler in previous.items()]
+
+    def test_multithreading(self, max_workers=2):
+        """
+        Método de prueba para verificar que el multithreading funciona correctamente
+        Procesa solo las primeras 2 páginas como test
+        """
+        print("=== MODO PRUEBA: Verificando multithreading ===")
+        return self.process_pedimento_services(
+            start_page=1,
+            end_page=2,
+            service_type=3,
+            max_workers=max_workers
+        )
+
+    async def get_pedimento_completo_async(self, importador: str, aduana: str, patente: str, pedimento: str,
+                                           envelope: bytes = None):
+        """
+        Versión asíncrona de get_pedimento_completo
+
+        Args:
+            importador: Usuario del importador para obtener credenciales
+            aduana: Código de aduana
+            patente: Número de patente
+            pedimento: Número de pedimento
+            envelope: Envelope ya generado (ver _render_page_envelopes)
+        """
+        headers = {
+            'Content-Type': 'text/xml; charset=utf-8',
+        }
+
+        cache_key = SOAPResponseCache.make_key('pedimento_completo', aduana, patente, pedimento)
+        cached = await asyncio.to_thread(self._cached_response, cache_key)
+        if cached:
+            return self._extract_pedimento_fields(cached)
+
+        endpoint = 'ventanilla-ws-pedimentos/ConsultarPedimentoCompletoService?wsdl'
+        if envelope is not None:
+            pedimento_response = await self.async_soap_controller.make_request(
+                endpoint=endpoint, data=envelope, headers=headers)
+        else:
+            # Las credenciales casi siempre salen del cache; la consulta a la API
+            # (cuando hace falta) se delega a un hilo para no bloquear el event loop
+            lease = await asyncio.to_thread(self.credentials_manager.lease, importador)
+            if not lease:
+                logger.warning("No se pudieron obtener credenciales para el importador: %s", importador)
+                return None
+
+            consulta = ConsultaPedimentoCompleto(
+                aduana=aduana,
+                patente=patente,
+                pedimento=pedimento
+            )
+
+            with lease:
+                pedimento_response = await self._send_with_credentials_async(
+                    lease, importador, endpoint,
+                    lambda credenciales: self.template_manager.generar_consulta_pedimento_completo(
+                        credenciales=credenciales,
+                        consulta=consulta
+                    ),
+                    headers
+                )
+
+        if pedimento_response:
+            if self._has_soap_error(pedimento_response):
+                logger.warning("Respuesta SOAP contiene error para pedimento %s, descartando...", pedimento)
+                return None
+            await asyncio.to_thread(self._store_response, cache_key, pedimento_response)
+            return self._extract_pedimento_fields(pedimento_response)
+        else:
+            return None
+
+    async def _process_service_async(self, service, organizacion, semaphore, results, envelope=None):
+        """
+        Procesa un servicio individual dentro del event loop
+
+        Args:
+            service: Servicio tal como lo devuelve la API
+            organizacion: Organización de la página a la que pertenece el servicio
+            semaphore: Semáforo que limita los servicios en vuelo
+            results: Diccionario de resultados compartido que se actualiza
+            envelope: Envelope ya generado con render_batch (opcional)
+        """
+        async with semaphore:
+            results['processed'] += 1
+            try:
+                importador = service.get('pedimento', {}).get('contribuyente')
+                aduana = service.get('pedimento', {}).get('aduana')
+                patente = service.get('pedimento', {}).get('patente')
+                pedimento = service.get('pedimento', {}).get('pedimento')
+                service_id = service.get('id')
+
+                if not all([importador, aduana, patente, pedimento, service_id]):
+                    error_msg = f"Datos incompletos en servicio {service_id}: importador={importador}, aduana={aduana}, patente={patente}, pedimento={pedimento}"
+                    logger.error("[async] %s", error_msg)
+                    results['errors'].append(error_msg)
+                    results['failed'] += 1
+                    return
+
+                soap_result = None
                 try:
-                    importador = service.get('pedimento', {}).get('contribuyente')
-                    aduana = service.get('pedimento', {}).get('aduana')
-                    patente = service.get('pedimento', {}).get('patente')
-                    pedimento = service.get('pedimento', {}).get('pedimento')
-                    service_id = service.get('id')
-                    
-                    if not all([importador, aduana, patente, pedimento, service_id]):
-                        error_msg = f"Datos incompletos en servicio {service_id}: importador={importador}, aduana={aduana}, patente={patente}, pedimento={pedimento}"
-                        print(f"[{thread_id}] {error_msg}")
-                        results['errors'].append(error_msg)
-                        results['failed'] += 1
-                        continue
-                    
-                    print(f"[{thread_id}] Procesando pedimento {pedimento} (servicio {service_id})")
-                    
-                    # Intentar obtener el pedimento completo con reintentos
-                    soap_result = None
-                    for attempt in range(SETTINGS.MAX_RETRIES):
-                        try:
-                            # Pequeña pausa entre intentos
-                            if attempt > 0:
-                                time.sleep(SETTINGS.REQUEST_DELAY_SECONDS * (attempt + 1))
-                                print(f"[{thread_id}] Reintento {attempt + 1}/{SETTINGS.MAX_RETRIES} para pedimento {pedimento}")
-                            
-                            soap_result = self.get_pedimento_completo(
-                                importador=importador,
-                                aduana=aduana,
-                                patente=patente,
-                                pedimento=pedimento
-                            )
-                            
-                            if soap_result:
-                                break  # Éxito, salir del loop de reintentos
-                                
-                        except IndexError as e:
-                            error_msg = f"Error de índice de lista en intento {attempt + 1} para pedimento {pedimento}: {str(e)}"
-                            print(f"[{thread_id}] {error_msg}")
-                            # Para IndexError, no reintentar ya que es un problema de datos
-                            results['errors'].append(f"Error de credenciales para pedimento {pedimento}: {str(e)}")
-                            break
-                        except Exception as e:
-                            print(f"[{thread_id}] Error en intento {attempt + 1} para pedimento {pedimento}: {str(e)}")
-                            if attempt == SETTINGS.MAX_RETRIES - 1:  # Último intento
-                                results['errors'].append(f"Error después de {SETTINGS.MAX_RETRIES} intentos para pedimento {pedimento}: {str(e)}")
-                    
-                    if soap_result:
-                        # Enviar respuesta SOAP como documento
-                        doc_result = self.api_controller.post_document(
-                            soap_response=soap_result, 
-                            organizacion=services.get('organizacion', ''), 
-                            pedimento=service.get('pedimento', {}).get('id'), 
-                            file_name=f"pedimento_completo_{pedimento}.xml"
-                        )
-                        
-                        if doc_result:
-                            print(f"[{thread_id}] Pedimento completo XML {pedimento} enviado exitosamente")
-                            
-                            # Actualizar estado a exitoso (3)
-                            update_result = self.api_controller.put_pedimento_service(
+                    soap_result = await self.get_pedimento_completo_async(
+                        importador=importador,
+                        aduana=aduana,
+                        patente=patente,
+                        pedimento=pedimento,
+                        envelope=envelope
+                    )
+                except CircuitOpenError as e:
+                    logger.warning("[async] %s. Servicio %s queda pendiente", e, service_id)
+                    results['skipped'] += 1
+                    return
+                except IndexError as e:
+                    results['errors'].append(f"Error de credenciales para pedimento {pedimento}: {str(e)}")
+                except Exception as e:
+                    logger.error("[async] Error obteniendo pedimento %s: %s", pedimento, e)
+                    results['errors'].append(f"Error obteniendo pedimento {pedimento}: {str(e)}")
+
+                if soap_result:
+                    # El documento y los campos extraídos del pedimento se envían a la vez
+                    pedimento_id = service.get('pedimento', {}).get('id')
+                    campos = self._campos_pedimento(soap_result, pedimento)
+                    envios = [self.async_api_controller.post_document(
+                        soap_response=soap_result,
+                        organizacion=organizacion,
+                        pedimento=pedimento_id,
+                        file_name=f"pedimento_completo_{pedimento}.xml"
+                    )]
+                    if campos:
+                        envios.append(self.async_api_controller.put_pedimento(pedimento_id, campos))
+                    doc_result, *pedimento_result = await asyncio.gather(*envios)
+                    pedimento_actualizado = bool(pedimento_result and pedimento_result[0])
+
+                    if doc_result:
+                        # Actualizar estado a exitoso (3) y encolar el servicio 8; si el
+                        # pedimento ya tiene sus campos el servicio 8 nace terminado
+                        update_result, _ = await asyncio.gather(
+                            self.async_api_controller.put_pedimento_service(
                                 service_id=service_id,
                                 data={
                                     "estado": 3,
@@ -449,153 +1096,256 @@ class MainProcess:
                                     "tipo_procesamiento": 2,
                                     "servicio": 8
                                 }
-                            )
-                            self.api_controller.post_pedimento_service(
+                            ),
+                            self.async_api_controller.post_pedimento_service(
                                 data={
-                                    "estado": 1,
+                                    "estado": 3 if pedimento_actualizado else 1,
                                     "pedimento": service.get('pedimento', {}).get('id'),
                                     "tipo_procesamiento": 2,
                                     "servicio": 8
                                 }
                             )
-                                
-                            
-                            
-                            if update_result:
-                                results['successful'] += 1
-                                print(f"[{thread_id}] Estado actualizado a exitoso para servicio {service_id}")
-                            else:
-                                results['errors'].append(f"Error actualizando estado exitoso para servicio {service_id}")
+                        )
+                        if update_result:
+                            results['successful'] += 1
                         else:
-                            results['errors'].append(f"Error enviando documento para pedimento {pedimento}")
-                            results['failed'] += 1
+                            results['errors'].append(f"Error actualizando estado exitoso para servicio {service_id}")
                     else:
-                        print(f"[{thread_id}] Error obteniendo pedimento completo {pedimento} después de {SETTINGS.MAX_RETRIES} intentos")
-                        
-                        # Actualizar estado a fallido (2)
-                        self.api_controller.put_pedimento_service(
-                            service_id=service_id,
-                            data={
-                                "estado": 2,
-                                "pedimento": service.get('pedimento', {}).get('id')
-                            }
-                        )
+                        results['errors'].append(f"Error enviando documento para pedimento {pedimento}")
                         results['failed'] += 1
-                        
-                    # Pausa entre servicios para no sobrecargar
-                    time.sleep(SETTINGS.REQUEST_DELAY_SECONDS)
-                        
-                except Exception as e:
-                    error_msg = f"Error procesando servicio {service.get('id', 'unknown')}: {str(e)}"
-                    print(f"[{thread_id}] {error_msg}")
-                    results['errors'].append(error_msg)
+                else:
+                    logger.error("[async] Error obteniendo pedimento completo %s", pedimento)
+                    # Actualizar estado a fallido (2)
+                    await self.async_api_controller.put_pedimento_service(
+                        service_id=service_id,
+                        data={
+                            "estado": 2,
+                            "pedimento": service.get('pedimento', {}).get('id')
+                        }
+                    )
                     results['failed'] += 1
-                    continue
-            
-            print(f"[{thread_id}] Página {page} completada: {results['successful']} exitosos, {results['failed']} fallidos")
-            return results
-            
-        except Exception as e:
-            error_msg = f"Error general en página {page}: {str(e)}"
-            print(f"[{thread_id}] {error_msg}")
-            results['errors'].append(error_msg)
-            return results
 
-    def process_pedimento_services(self, start_page=1, end_page=5, service_type=3, max_workers=3):
+            except Exception as e:
+                error_msg = f"Error procesando servicio {service.get('id', 'unknown')}: {str(e)}"
+                logger.error("[async] %s", error_msg)
+                results['errors'].append(error_msg)
+                results['failed'] += 1
+
+    async def process_pedimento_services_async(self, start_page=1, end_page=None, service_type=3, max_concurrency=None):
         """
-        Procesa servicios de pedimentos usando múltiples hilos para diferentes páginas
-        
+        Procesa servicios de pedimentos en un solo event loop.
+
+        Todas las páginas se piden a la vez y cada servicio se vuelve una tarea;
+        un semáforo limita cuántos servicios hay en vuelo, así que el
+        rendimiento queda acotado por max_concurrency y no por el número de hilos.
+
         Args:
             start_page: Página inicial (default 1)
-            end_page: Página final (default 5)
+            end_page: Página final; None toma las páginas que reporta la API en 'count' (default)
             service_type: Tipo de servicio (default 3)
-            max_workers: Número máximo de hilos concurrentes (default 3)
+            max_concurrency: Máximo de servicios en vuelo (default desde configuración)
         """
-        print("=== Iniciando procesamiento multihilo de servicios de pedimentos ===")
-        print(f"Páginas: {start_page} a {end_page}, Tipo de servicio: {service_type}, Hilos: {max_workers}")
-        
+        max_concurrency = max_concurrency or SETTINGS.ASYNC_MAX_CONCURRENCY
+        logger.info("=== Iniciando procesamiento asíncrono de servicios de pedimentos ===")
+        logger.info("Páginas: %s a %s, Tipo de servicio: %s, Concurrencia: %s",
+                    start_page, end_page or 'fin del feed', service_type, max_concurrency)
+
         start_time = time.time()
+        semaphore = asyncio.Semaphore(max_concurrency)
         all_results = []
-        total_processed = 0
-        total_successful = 0
-        total_failed = 0
         all_errors = []
-        
-        # Crear pool de hilos
-        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="PedimentoWorker") as executor:
-            # Enviar tareas para cada página
-            future_to_page = {
-                executor.submit(self.process_pedimento_services_single_page, page, service_type): page 
-                for page in range(start_page, end_page + 1)
-            }
-            
-            # Procesar resultados conforme se completan
-            for future in as_completed(future_to_page):
-                page = future_to_page[future]
-                try:
-                    result = future.result()
-                    all_results.append(result)
-                    
-                    # Agregar estadísticas
-                    total_processed += result['processed']
-                    total_successful += result['successful']
-                    total_failed += result['failed']
-                    all_errors.extend(result['errors'])
-                    
-                    print(f"✓ Página {page} completada por {result['thread_id']}: "
-                          f"{result['successful']}/{result['processed']} exitosos")
-                    
-                except Exception as e:
-                    error_msg = f"Error en hilo procesando página {page}: {str(e)}"
-                    print(f"✗ {error_msg}")
-                    all_errors.append(error_msg)
-        
-        # Mostrar resumen final
-        end_time = time.time()
-        duration = end_time - start_time
-        
+
+        try:
+            first_page = await self.async_api_controller.get_pedimento_services(page=start_page, service_type=service_type)
+            if end_page is None:
+                # Todas las páginas se piden antes de procesar, así que 'count' no cambia entre ellas
+                count = first_page.get('count', 0) if first_page else 0
+                end_page = max(start_page, math.ceil(count / SETTINGS.SERVICE_FEED_PAGE_SIZE))
+            pages = list(range(start_page, end_page + 1))
+            page_responses = [first_page] + list(await asyncio.gather(
+                *(self.async_api_controller.get_pedimento_services(page=page, service_type=service_type) for page in pages[1:])
+            ))
+
+            tasks = []
+            for page, services in zip(pages, page_responses):
+                results = {
+                    'page': page,
+                    'thread_id': 'async',
+                    'processed': 0,
+                    'successful': 0,
+                    'failed': 0,
+                    'skipped': 0,
+                    'errors': []
+                }
+                all_results.append(results)
+                if not services:
+                    results['errors'].append(f"No se pudieron obtener servicios para página {page}")
+                    continue
+                # Credenciales y envelopes de toda la página en un solo paso (fuera del event loop)
+                envelopes = await asyncio.to_thread(self._render_page_envelopes, services.get('results', []))
+                for service in services.get('results', []):
+                    tasks.append(self._process_service_async(
+                        service, services.get('organizacion', ''), semaphore, results,
+                        envelopes.get(service.get('id'))
+                    ))
+
+            await asyncio.gather(*tasks)
+        finally:
+            await self.async_soap_controller.aclose()
+            await self.async_api_controller.aclose()
+
+        for result in all_results:
+            all_errors.extend(result['errors'])
+
+        return self._summarize_results(
+            "RESUMEN DEL PROCESAMIENTO ASÍNCRONO", time.time() - start_time, all_results, all_errors,
+            self._soap_metrics(self.async_soap_controller)
+        )
+
+    def _soap_metrics(self, soap_controller):
+        """Métricas del controlador SOAP más las de los caches de respuestas y de credenciales"""
+        metrics = soap_controller.metrics()
+        metrics['response_cache'] = self.response_cache.stats() if self.response_cache else {}
+        metrics['credentials_cache'] = self.credentials_manager.metrics()
+        return metrics
+
+    @staticmethod
+    def _print_rate_limit(target, rate_limit):
+        """Línea del resumen con el uso del token bucket de un destino"""
+        if not rate_limit or rate_limit['rate'] <= 0:
+            return
+        print(f"\nRate limit hacia {target}: {rate_limit['rate']:g} req/s (ráfaga {rate_limit['burst']:g}), "
+              f"{rate_limit['acquired']} peticiones, {rate_limit['delayed']} esperaron "
+              f"{rate_limit['waited_seconds']:.2f}s en total")
+
+    def _summarize_results(self, title, duration, all_results, all_errors, soap_metrics=None, api_metrics=None,
+                           pages_processed=None, importer_stats=None, batch_stats=None):
+        """
+        Imprime el resumen final y construye el diccionario de resultados
+
+        Args:
+            title: Título del resumen
+            duration: Duración total en segundos
+            all_results: Resultados por página (o por hilo consumidor)
+            all_errors: Lista de errores acumulados
+            soap_metrics: Métricas del controlador SOAP (ver SOAPController.metrics)
+            api_metrics: Métricas del controlador de la API (ver APIController.metrics)
+            pages_processed: Páginas leídas del feed (default una por resultado)
+            importer_stats: Reparto del feed por importador (ver FairQueue.stats)
+            batch_stats: Micro-lotes del feed (ver FairQueue.batch_stats)
+        """
+        if pages_processed is None:
+            pages_processed = len(all_results)
+        total_processed = sum(result['processed'] for result in all_results)
+        total_successful = sum(result['successful'] for result in all_results)
+        total_failed = sum(result['failed'] for result in all_results)
+        total_skipped = sum(result.get('skipped', 0) for result in all_results)
+
         print("\n" + "="*60)
-        print("RESUMEN DEL PROCESAMIENTO MULTIHILO")
+        print(title)
         print("="*60)
         print(f"Tiempo total: {duration:.2f} segundos")
-        print(f"Páginas procesadas: {len(all_results)}")
+        print(f"Páginas procesadas: {pages_processed}")
         print(f"Total servicios procesados: {total_processed}")
         print(f"Total servicios exitosos: {total_successful}")
         print(f"Total servicios fallidos: {total_failed}")
+        print(f"Total servicios pendientes (circuito abierto): {total_skipped}")
         print(f"Tasa de éxito: {(total_successful/total_processed*100):.1f}%" if total_processed > 0 else "N/A")
-        
+
         if all_errors:
             print(f"\nErrores encontrados ({len(all_errors)}):")
             for i, error in enumerate(all_errors[:10], 1):  # Mostrar solo los primeros 10 errores
                 print(f"  {i}. {error}")
             if len(all_errors) > 10:
                 print(f"  ... y {len(all_errors) - 10} errores más")
-        
+
+        if importer_stats and len(importer_stats) > 1:
+            busiest = sorted(importer_stats.items(), key=lambda entry: -entry[1]['dispatched'])
+            print(f"\nReparto por importador ({len(importer_stats)} importadores):")
+            for importador, stats in busiest[:10]:
+                print(f"  {importador}: {stats['dispatched']} servicios, espera media en cola "
+                      f"{stats['avg_wait_seconds']:.2f}s, peso {stats['weight']:g}"
+                      + (f", tope {stats['cap']} en vuelo" if stats['cap'] else "")
+                      + (f", {stats['deferred']} diferidos" if stats['deferred'] else ""))
+
+        if batch_stats and batch_stats['batches']:
+            print(f"\nMicro-lotes por importador y tipo: {batch_stats['services']} servicios en "
+                  f"{batch_stats['batches']} lotes ({batch_stats['avg_batch_size']:.1f} por lote, "
+                  f"{batch_stats['grouping_ratio']:.0%} agrupados)")
+
+        soap_metrics = soap_metrics or {}
+        if soap_metrics.get('retries'):
+            print("\nPeticiones SOAP por endpoint:")
+            for endpoint, stats in soap_metrics['retries'].items():
+                print(f"  {endpoint}: {stats['requests']} peticiones, {stats['retries']} reintentos, "
+                      f"{stats['budget_exhausted']} sin presupuesto, fallos={stats['failures']}")
+        if soap_metrics.get('concurrency_limits'):
+            print("\nLímite de concurrencia SOAP por endpoint:")
+            for endpoint, limit in soap_metrics['concurrency_limits'].items():
+                print(f"  {endpoint}: límite={limit['limit']}, en vuelo={limit['in_flight']}")
+        if soap_metrics.get('circuit_breakers'):
+            print("\nCircuit breakers SOAP por endpoint:")
+            for endpoint, breaker in soap_metrics['circuit_breakers'].items():
+                print(f"  {endpoint}: estado={breaker['state']}, rechazadas={breaker['rejected']}")
+        if soap_metrics.get('response_cache'):
+            cache = soap_metrics['response_cache']
+            print(f"\nCache de respuestas SOAP: {cache['hits']} hits, {cache['misses']} misses, "
+                  f"{cache['entries']} entradas ({cache['bytes']} bytes), {cache['evictions']} desalojadas")
+        if soap_metrics.get('credentials_cache'):
+            credentials = soap_metrics['credentials_cache']
+            print(f"\nCache de credenciales: {credentials['hits']} hits, {credentials['negative_hits']} hits negativos, "
+                  f"{credentials['misses']} misses, {credentials['refreshes']} refrescos, "
+                  f"{credentials['errors'] + credentials['refresh_errors']} errores")
+            prefetch = credentials.get('prefetch', {})
+            if prefetch.get('bulk_requests') or prefetch.get('individual_loads'):
+                print(f"  Precarga por página: {prefetch['bulk_credentials']} importadores en "
+                      f"{prefetch['bulk_requests']} consultas masivas, {prefetch['individual_loads']} consultas individuales")
+            limited = {key: state for key, state in credentials.get('pool', {}).items()
+                       if state['throttled'] or state['rejected']}
+            for key, state in limited.items():
+                print(f"  Credencial {key} de {state['usuario']}: {state['leases']} usos, "
+                      f"{state['throttled']} limitadas (429), {state['rejected']} rechazadas")
+        if soap_metrics.get('coalescing', {}).get('coalesced'):
+            print(f"\nPeticiones SOAP coalescidas: {soap_metrics['coalescing']['coalesced']} "
+                  f"(sobre {soap_metrics['coalescing']['calls']} llamadas reales)")
+        if soap_metrics.get('hedging'):
+            print("\nHedging SOAP por endpoint:")
+            for endpoint, hedging in soap_metrics['hedging'].items():
+                print(f"  {endpoint}: {hedging['hedged']}/{hedging['requests']} duplicadas, "
+                      f"{hedging['hedge_wins']} ganadas por el duplicado")
+        if soap_metrics.get('transfer'):
+            print("\nTransferencia SOAP por endpoint:")
+            for endpoint, transfer in soap_metrics['transfer'].items():
+                ratio = transfer['wire_bytes'] / transfer['decoded_bytes'] if transfer['decoded_bytes'] else 1
+                print(f"  {endpoint}: {transfer['wire_bytes']} bytes en red, {transfer['decoded_bytes']} descomprimidos "
+                      f"({ratio:.0%}), {transfer['compressed_responses']}/{transfer['responses']} respuestas comprimidas")
+        self._print_rate_limit("VUCEM", soap_metrics.get('rate_limit'))
+
+        api_metrics = api_metrics or {}
+        if api_metrics.get('latency'):
+            pool = api_metrics['pool']
+            print(f"\nPeticiones a la API por endpoint ({pool['requests']} peticiones en "
+                  f"{pool['connections']} conexiones, pool de {pool['maxsize']}):")
+            for endpoint, latency in api_metrics['latency'].items():
+                print(f"  {endpoint}: {latency['requests']} peticiones, {latency['errors']} errores, "
+                      f"p50={latency['p50_ms']:.0f}ms, p95={latency['p95_ms']:.0f}ms, max={latency['max_ms']:.0f}ms")
+        self._print_rate_limit("la API", api_metrics.get('rate_limit'))
+
         print("="*60)
-        
+
         return {
             'duration': duration,
-            'pages_processed': len(all_results),
+            'pages_processed': pages_processed,
             'total_processed': total_processed,
             'total_successful': total_successful,
             'total_failed': total_failed,
+            'total_skipped': total_skipped,
             'success_rate': (total_successful/total_processed*100) if total_processed > 0 else 0,
             'errors': all_errors,
+            'soap_metrics': soap_metrics,
+            'api_metrics': api_metrics,
             'detailed_results': all_results
         }
-        
-    def test_multithreading(self, max_workers=2):
-        """
-        Método de prueba para verificar que el multithreading funciona correctamente
-        Procesa solo las primeras 2 páginas como test
-        """
-        print("=== MODO PRUEBA: Verificando multithreading ===")
-        return self.process_pedimento_services(
-            start_page=1,
-            end_page=2,
-            service_type=3,
-            max_workers=max_workers
-        )
 
     def run_example_queries(self):
         # """
@@ -653,13 +1403,14 @@ class MainProcess:
         """
         # Usar valores de configuración si no se especifican
         start_page = start_page or SETTINGS.DEFAULT_START_PAGE
-        end_page = end_page or SETTINGS.DEFAULT_END_PAGE
+        end_page = end_page or SETTINGS.DEFAULT_END_PAGE or None  # None: todo el backlog
         service_type = service_type or SETTINGS.DEFAULT_SERVICE_TYPE
         max_workers = max_workers or SETTINGS.DEFAULT_MAX_WORKERS
         
-        print("Iniciando el proceso de scraping multihilo con credenciales dinámicas...")
-        print(f"Configuración: Páginas {start_page}-{end_page}, Tipo servicio: {service_type}, Hilos: {max_workers}")
-        print(f"Rate limiting: {SETTINGS.REQUEST_DELAY_SECONDS}s entre requests, {SETTINGS.MAX_RETRIES} reintentos máximo")
+        logger.info("Iniciando el proceso de scraping multihilo con credenciales dinámicas...")
+        logger.info("Configuración: Páginas %s-%s, Tipo servicio: %s, Hilos: %s", start_page, end_page or 'fin', service_type, max_workers)
+        logger.info("Rate limiting: %s req/s a VUCEM, %s req/s a la API, %s intentos SOAP máximo",
+                    SETTINGS.SOAP_RATE_LIMIT_RPS, SETTINGS.API_RATE_LIMIT_RPS, SETTINGS.SOAP_RETRY_MAX_ATTEMPTS)
         
         # Procesar servicios de pedimentos con multithreading
         results = self.process_pedimento_services(
@@ -669,8 +1420,45 @@ class MainProcess:
             max_workers=max_workers
         )
         
-        print("\nProceso de scraping completado.")
+        logger.info("Proceso de scraping completado.")
+        return results
+
+    def run_async(self, start_page=None, end_page=None, service_type=None, max_concurrency=None):
+        """
+        Igual que run() pero usando el pipeline asyncio en lugar de hilos.
+        
+        Args:
+            start_page: Página inicial a procesar (default desde configuración)
+            end_page: Página final a procesar (default desde configuración)
+            service_type: Tipo de servicio a procesar (default desde configuración)
+            max_concurrency: Máximo de servicios en vuelo (default desde configuración)
+        """
+        start_page = start_page or SETTINGS.DEFAULT_START_PAGE
+        end_page = end_page or SETTINGS.DEFAULT_END_PAGE or None  # None: todo el backlog
+        service_type = service_type or SETTINGS.DEFAULT_SERVICE_TYPE
+        max_concurrency = max_concurrency or SETTINGS.ASYNC_MAX_CONCURRENCY
+        
+        logger.info("Iniciando el proceso de scraping asíncrono con credenciales dinámicas...")
+        logger.info("Configuración: Páginas %s-%s, Tipo servicio: %s, Concurrencia: %s", start_page, end_page or 'fin', service_type, max_concurrency)
+        
+        results = asyncio.run(self.process_pedimento_services_async(
+            start_page=start_page,
+            end_page=end_page,
+            service_type=service_type,
+            max_concurrency=max_concurrency
+        ))
+        
+        logger.info("Proceso de scraping completado.")
         return results
+
+    def shutdown(self):
+        """
+        Libera los recursos compartidos (pools de conexiones SOAP y de la API).
+        Debe llamarse una sola vez al terminar el proceso.
+        """
+        self.credentials_manager.close()
+        self.soap_controller.close()
+        self.api_controller.close()
     
     def run2(self):
         thread_id = 1
@@ -686,6 +1474,7 @@ class MainProcess:
             'processed': 0,
             'successful': 0,
             'failed': 0,
+            'skipped': 0,
             'errors': []
         }
         
@@ -707,6 +1496,7 @@ class MainProcess:
                 return results
             
             print(f"[{thread_id}] Procesando {len(services_list)} servicios en página {page}")
+            envelopes = self._render_page_envelopes(services_list)
             
             # Procesar cada servicio de esta página
             for service in services_list:
@@ -728,35 +1518,29 @@ class MainProcess:
                     
                     print(f"[{thread_id}] Procesando pedimento {pedimento} (servicio {service_id})")
                     
-                    # Intentar obtener el pedimento completo con reintentos
+                    # Obtener el pedimento completo. Los reintentos de fallos
+                    # transitorios los hace SOAPController según su política
                     soap_result = None
-                    for attempt in range(SETTINGS.MAX_RETRIES):
-                        try:
-                            # Pequeña pausa entre intentos
-                            if attempt > 0:
-                                time.sleep(SETTINGS.REQUEST_DELAY_SECONDS * (attempt + 1))
-                                print(f"[{thread_id}] Reintento {attempt + 1}/{SETTINGS.MAX_RETRIES} para pedimento {pedimento}")
-                            
-                            soap_result = self.get_pedimento_completo(
-                                importador=importador,
-                                aduana=aduana,
-                                patente=patente,
-                                pedimento=pedimento
-                            )
-                            
-                            if soap_result:
-                                break  # Éxito, salir del loop de reintentos
-                                
-                        except IndexError as e:
-                            error_msg = f"Error de índice de lista en intento {attempt + 1} para pedimento {pedimento}: {str(e)}"
-                            print(f"[{thread_id}] {error_msg}")
-                            # Para IndexError, no reintentar ya que es un problema de datos
-                            results['errors'].append(f"Error de credenciales para pedimento {pedimento}: {str(e)}")
-                            break
-                        except Exception as e:
-                            print(f"[{thread_id}] Error en intento {attempt + 1} para pedimento {pedimento}: {str(e)}")
-                            if attempt == SETTINGS.MAX_RETRIES - 1:  # Último intento
-                                results['errors'].append(f"Error después de {SETTINGS.MAX_RETRIES} intentos para pedimento {pedimento}: {str(e)}")
+                    try:
+                        soap_result = self.get_pedimento_completo(
+                            importador=importador,
+                            aduana=aduana,
+                            patente=patente,
+                            pedimento=pedimento,
+                            envelope=envelopes.get(service_id)
+                        )
+                    except CircuitOpenError as e:
+                        # VUCEM no está disponible: el servicio queda pendiente (estado 1)
+                        # para la siguiente corrida en lugar de marcarse como fallido
+                        print(f"[{thread_id}] {e}. Servicio {service_id} queda pendiente")
+                        results['skipped'] += 1
+                        continue
+                    except IndexError as e:
+                        print(f"[{thread_id}] Error de índice de lista para pedimento {pedimento}: {str(e)}")
+                        results['errors'].append(f"Error de credenciales para pedimento {pedimento}: {str(e)}")
+                    except Exception as e:
+                        print(f"[{thread_id}] Error obteniendo pedimento {pedimento}: {str(e)}")
+                        results['errors'].append(f"Error obteniendo pedimento {pedimento}: {str(e)}")
                     
                     if soap_result:
                         # Enviar respuesta SOAP como documento
@@ -770,6 +1554,11 @@ class MainProcess:
                         if doc_result:
                             print(f"[{thread_id}] Pedimento completo XML {pedimento} enviado exitosamente")
                             
+                            # Escribir en el pedimento los campos ya extraídos de la respuesta
+                            self._update_pedimento_fields(
+                                service.get('pedimento', {}).get('id'), soap_result, pedimento
+                            )
+                            
                             # Actualizar estado a exitoso (3)
                             update_result = self.api_controller.put_pedimento_service(
                                 service_id=service_id,
@@ -792,7 +1581,7 @@ class MainProcess:
                             results['errors'].append(f"Error enviando documento para pedimento {pedimento}")
                             results['failed'] += 1
                     else:
-                        print(f"[{thread_id}] Error obteniendo pedimento completo {pedimento} después de {SETTINGS.MAX_RETRIES} intentos")
+                        print(f"[{thread_id}] Error obteniendo pedimento completo {pedimento}")
                         
                         # Actualizar estado a fallido (2)
                         self.api_controller.put_pedimento_service(
@@ -837,31 +1626,18 @@ class MainProcess:
             # Verificar si la respuesta tiene contenido
             if not soap_response or not hasattr(soap_response, 'content'):
                 return False
-                
-            # Obtener el contenido XML como string
-            xml_content = soap_response.content
-            if isinstance(xml_content, bytes):
-                xml_content = xml_content.decode('utf-8')
-            
-            # Buscar el patrón de error en el XML
-            if '<ns3:tieneError>true</ns3:tieneError>' in xml_content:
-                return True
-                
-            # También verificar otras posibles variaciones del namespace
-            error_patterns = [
-                '<tieneError>true</tieneError>',
-                ':tieneError>true</',
-                'tieneError="true"'
-            ]
-            
-            for pattern in error_patterns:
-                if pattern in xml_content:
-                    return True
-                    
-            return False
+
+            # Solo se lee la respuesta hasta encontrar tieneError (o el S:Fault)
+            error = detect_soap_error(soap_response.content)
+            if error is None:
+                return False
+            detalle = ' - '.join(filter(None, (error.codigo, error.mensaje)))
+            if detalle:
+                logger.warning("VUCEM reportó error: %s", detalle)
+            return True
             
         except Exception as e:
-            print(f"Error verificando respuesta SOAP: {str(e)}")
+            logger.error("Error verificando respuesta SOAP: %s", e)
             # En caso de error de parsing, asumir que no hay error para continuar
             return False
     
@@ -926,9 +1702,13 @@ if __name__ == "__main__":
     # Usar argparse para manejar argumentos de línea de comandos
     parser = argparse.ArgumentParser(description="Procesador de servicios de pedimentos (scraping multihilo)")
     parser.add_argument("--start_page", '-sp',type=int, default=SETTINGS.DEFAULT_START_PAGE, help="Página inicial a procesar")
-    parser.add_argument("--end_page", '-ep',type=int, default=SETTINGS.DEFAULT_END_PAGE, help="Página final a procesar")
+    parser.add_argument("--end_page", '-ep',type=int, default=SETTINGS.DEFAULT_END_PAGE, help="Página final a procesar (0 = todo el backlog pendiente)")
     parser.add_argument("--service_type", '-st',type=int, default=SETTINGS.DEFAULT_SERVICE_TYPE, help="Tipo de servicio a procesar")
     parser.add_argument("--max_workers", '-mw',type=int, default=SETTINGS.DEFAULT_MAX_WORKERS, help="Número máximo de hilos concurrentes")
+    parser.add_argument("--async_mode", action="store_true", help="Usa el pipeline asyncio en lugar de hilos")
+    parser.add_argument("--daemon", action="store_true", help="Modo continuo: procesa servicios pendientes hasta recibir SIGTERM")
+    parser.add_argument("--health_port", type=int, default=SETTINGS.DAEMON_HEALTH_PORT, help="Puerto de /health y /metrics en modo continuo (0 = desactivado)")
+    parser.add_argument("--max_concurrency", '-mc', type=int, default=SETTINGS.ASYNC_MAX_CONCURRENCY, help="Máximo de servicios en vuelo en modo asyncio")
     parser.add_argument(
         "--list_service_types",
         action="store_true",
@@ -961,7 +1741,7 @@ if __name__ == "__main__":
     if args.start_page < 1:
         print(f"Advertencia: start_page inválido ({args.start_page}), usando default: {SETTINGS.DEFAULT_START_PAGE}")
         start_page = SETTINGS.DEFAULT_START_PAGE
-    if args.end_page < start_page:
+    if args.end_page and args.end_page < start_page:
         print(f"Advertencia: end_page ({args.end_page}) menor que start_page ({start_page}), usando default: {SETTINGS.DEFAULT_END_PAGE}")
         end_page = SETTINGS.DEFAULT_END_PAGE
     if args.service_type not in SERVICE_TYPE_DESCRIPTIONS:
@@ -977,10 +1757,28 @@ if __name__ == "__main__":
         print("  python main.py --start_page 1 --end_page 5 --service_type 3 --max_workers 3")
         print("  O usar variables de entorno: DEFAULT_START_PAGE, DEFAULT_END_PAGE, DEFAULT_SERVICE_TYPE, DEFAULT_MAX_WORKERS")
     
+    setup_logging()
     main_process = MainProcess()
-    final_results = main_process.run(
-        start_page=start_page, 
-        end_page=end_page, 
-        service_type=service_type, 
-        max_workers=max_workers
-    )
+    try:
+        if args.daemon:
+            final_results = main_process.run_daemon(
+                service_type=service_type,
+                max_workers=max_workers,
+                health_port=args.health_port
+            )
+        elif args.async_mode:
+            final_results = main_process.run_async(
+                start_page=start_page,
+                end_page=end_page,
+                service_type=service_type,
+                max_concurrency=args.max_concurrency
+            )
+        else:
+            final_results = main_process.run(
+                start_page=start_page, 
+                end_page=end_page, 
+                service_type=service_type, 
+                max_workers=max_workers
+            )
+    finally:
+        main_process.shutdown()
@@ -0,0 +1,155 @@
+"""
+Reparto de carga entre las credenciales VUCEM de un importador.
+
+Un importador puede tener varias credenciales activas y VUCEM limita las
+peticiones por usuario. Cada petición SOAP toma un préstamo (lease) de la
+credencial con menos peticiones en vuelo (a igualdad, la menos usada, lo que
+en la práctica es un round-robin). Si VUCEM responde 429 o rechaza la
+credencial, esa credencial queda en pausa `bench_seconds`, la misma
+petición se vuelve a generar con otra credencial (ver
+MainProcess._send_with_credentials) y las siguientes usan las demás; si
+todas están en pausa se usa la que sale antes de la pausa en vez de
+detener el servicio.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+from payload_structure.soap_models import CredencialesSOAP, CredencialesVUCEM
+from utils.debug_logger import get_logger
+from utils.retry_policy import CREDENTIALS_ERROR, THROTTLED
+
+logger = get_logger(__name__)
+
+# Fallos que indican un problema de la credencial y no del endpoint
+BENCH_FAILURES = frozenset({THROTTLED, CREDENTIALS_ERROR})
+
+
+class _CredentialState:
+    __slots__ = ('usuario', 'in_flight', 'leases', 'throttled', 'rejected', 'benched_until')
+
+    def __init__(self, usuario: str):
+        self.usuario = usuario
+        self.in_flight = 0
+        self.leases = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.benched_until = 0.0
+
+
+class CredentialLease:
+    """Credencial prestada para una petición; se devuelve al salir del with"""
+
+    def __init__(self, pool: 'CredentialPool', credentials: CredencialesVUCEM, key: str, benched: bool = False):
+        self.credentials = credentials
+        self._pool = pool
+        self._key = key
+        self._released = False
+        self.benched = benched  # La credencial estaba en pausa al prestarse o quedó en pausa después
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def soap_credentials(self) -> CredencialesSOAP:
+        return self.credentials.to_soap_credentials()
+
+    def report(self, failure: str) -> bool:
+        """
+        on_failure de SOAPController.make_request: pausa la credencial si VUCEM la limitó
+
+        Returns:
+            True si la credencial quedó en pausa (no tiene caso reintentar con ella)
+        """
+        if failure in BENCH_FAILURES:
+            self.benched = True
+            self._pool.bench(self._key, failure)
+            return True
+        return False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._pool._release(self._key)
+
+    def __enter__(self) -> 'CredentialLease':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class CredentialPool:
+    """Estado de uso de todas las credenciales del proceso, por id de credencial"""
+
+    def __init__(self, bench_seconds: float, clock=time.monotonic):
+        self.bench_seconds = bench_seconds
+        self._clock = clock
+        self._states: Dict[str, _CredentialState] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(credentials: CredencialesVUCEM) -> str:
+        return str(credentials.id or credentials.usuario)
+
+    def acquire(self, candidates: Sequence[CredencialesVUCEM]) -> Optional[CredentialLease]:
+        """
+        Presta la mejor credencial de candidates
+
+        Args:
+            candidates: Credenciales utilizables del importador (activas y con
+                el permiso que pide la consulta)
+
+        Returns:
+            CredentialLease o None si no hay candidatas
+        """
+        if not candidates:
+            return None
+        now = self._clock()
+        with self._lock:
+            scored = []
+            for index, credentials in enumerate(candidates):
+                key = self._key(credentials)
+                state = self._states.get(key)
+                if state is None:
+                    state = self._states[key] = _CredentialState(credentials.usuario)
+                benched = state.benched_until > now
+                scored.append(((benched, state.benched_until if benched else 0, state.in_flight,
+                                state.leases, index), key, state, credentials))
+            score, key, state, credentials = min(scored, key=lambda item: item[0])
+            state.in_flight += 1
+            state.leases += 1
+        return CredentialLease(self, credentials, key, benched=score[0])
+
+    def _release(self, key: str):
+        with self._lock:
+            self._states[key].in_flight -= 1
+
+    def bench(self, key: str, failure: str):
+        """Deja la credencial en pausa bench_seconds"""
+        with self._lock:
+            state = self._states[key]
+            if failure == THROTTLED:
+                state.throttled += 1
+            else:
+                state.rejected += 1
+            state.benched_until = self._clock() + self.bench_seconds
+        logger.warning("Credencial %s de %s en pausa %.0fs (%s)", key, state.usuario, self.bench_seconds, failure)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Uso por credencial"""
+        now = self._clock()
+        with self._lock:
+            return {
+                key: {
+                    'usuario': state.usuario,
+                    'in_flight': state.in_flight,
+                    'leases': state.leases,
+                    'throttled': state.throttled,
+                    'rejected': state.rejected,
+                    'benched': state.benched_until > now,
+                }
+                for key, state in self._states.items()
+            }
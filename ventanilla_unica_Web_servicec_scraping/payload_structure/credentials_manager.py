@@ -1,13 +1,42 @@
-from typing import Dict, Optional, List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, List, Tuple
 from controllers.RESTController import APIController
 from payload_structure.soap_models import CredencialesVUCEM, CredencialesSOAP
+from payload_structure.credential_pool import CredentialLease, CredentialPool
+from config.settings import SETTINGS
+from utils.ttl_cache import TTLCache
+from utils.debug_logger import get_logger
+
+logger = get_logger(__name__)
+
+class CredentialsUnavailable(Exception):
+    """La API no respondió la consulta de credenciales (no es lo mismo que no tenerlas)"""
+
 
 class CredentialsManager:
     """Gestor de credenciales VUCEM"""
     
-    def __init__(self, api_controller: APIController):
+    def __init__(self, api_controller: APIController, ttl: float = None, negative_ttl: float = None,
+                 refresh_ahead: float = None, pool: CredentialPool = None):
         self.api_controller = api_controller
-        self._credentials_cache: Dict[str, CredencialesVUCEM] = {}
+        # Todas las credenciales de cada importador, activas primero. Los importadores
+        # sin credenciales activas se guardan con el TTL negativo, más corto; la carga
+        # es single-flight y pasado refresh_ahead del TTL se refrescan en segundo plano,
+        # así una contraseña rotada en VUCEM se toma sin reiniciar el proceso.
+        self._credentials_cache = TTLCache(
+            self._load_credentials,
+            ttl=ttl if ttl is not None else SETTINGS.CREDENTIALS_CACHE_TTL_SECONDS,
+            negative_ttl=negative_ttl if negative_ttl is not None else SETTINGS.CREDENTIALS_NEGATIVE_TTL_SECONDS,
+            refresh_ahead=refresh_ahead if refresh_ahead is not None else SETTINGS.CREDENTIALS_REFRESH_AHEAD,
+            is_negative=lambda credentials: not any(cred.is_active for cred in credentials),
+            name="CredentialsCache"
+        )
+        # Reparto de peticiones entre las credenciales de un mismo importador
+        self._pool = pool or CredentialPool(SETTINGS.CREDENTIALS_BENCH_SECONDS)
+        self._bulk_enabled = SETTINGS.CREDENTIALS_BULK_ENABLED
+        self._stats = {'bulk_requests': 0, 'bulk_credentials': 0, 'individual_loads': 0}
+        self._stats_lock = threading.Lock()
     
     def get_credentials_by_user(self, importador: str) -> Optional[CredencialesVUCEM]:
         """
@@ -17,67 +46,152 @@ class CredentialsManager:
             importador: Usuario/importador para obtener credenciales
             
         Returns:
-            CredencialesVUCEM o None si no se encuentran
+            CredencialesVUCEM (la primera activa, o la primera si ninguna lo está)
+            o None si no se encuentran
         """
-        # Verificar cache primero
-        if importador in self._credentials_cache:
-            credentials = self._credentials_cache[importador]
-            if credentials.is_active:
-                return credentials
+        credentials = self._credentials(importador)
+        return credentials[0] if credentials else None
+    
+    def lease(self, importador: str, capability: str = None) -> Optional[CredentialLease]:
+        """
+        Presta una credencial del importador para una petición SOAP
         
-        # Obtener desde API
-        try:
-            response = self.api_controller.get_vucem_credentials(importador)
-            # Validar respuesta antes de procesarla
-            if not self.validate_response_data(response, importador):
-                return None
+        Entre las credenciales activas (con el permiso pedido) se elige la de
+        menos peticiones en vuelo que no esté en pausa por limitación de VUCEM.
+        Usar como context manager y pasar lease.report como on_failure de
+        make_request.
+        
+        Args:
+            importador: Usuario/importador para obtener credenciales
+            capability: Permiso requerido: "acusecove" o "acuseedocument" (opcional)
             
-            if response:
-                # Manejar respuesta como lista (formato actual de la API)
-                credentials_data = None
-                
-                if isinstance(response, list):
-                    if len(response) == 0:
-                        print(f"Lista de credenciales vacía para {importador}")
-                        return None
-                    
-                    # La API devuelve una lista, tomar el primer elemento activo
-                    for item in response:
-                        if isinstance(item, dict) and item.get('is_active', False):
-                            credentials_data = item
-                            break
-                    
-                    # Si no hay activos, tomar el primero disponible
-                    if not credentials_data:
-                        try:
-                            credentials_data = response[0]
-                        except IndexError:
-                            print(f"Error: Lista de credenciales está vacía para {importador}")
-                            return None
-                        
-                elif isinstance(response, dict):
-                    # Fallback: respuesta directa como diccionario
-                    credentials_data = response
-                else:
-                    print(f"Formato de respuesta inesperado para {importador}: {type(response)}")
-                    return None
-                
-                if credentials_data:
-                    credentials = CredencialesVUCEM(**credentials_data)
-                    # Guardar en cache si están activas
-                    if credentials.is_active:
-                        self._credentials_cache[importador] = credentials
-                    return credentials
-                else:
-                    print(f"No se encontraron credenciales válidas para {importador}")
-                    
+        Returns:
+            CredentialLease o None si no hay credenciales utilizables
+        """
+        credentials = self._credentials(importador)
+        # Sin credenciales activas se usa la primera, como antes del pool
+        candidates = [cred for cred in credentials if cred.is_active] or list(credentials[:1])
+        if capability:
+            candidates = [cred for cred in candidates if getattr(cred, capability, False)]
+        return self._pool.acquire(candidates)
+    
+    def _credentials(self, importador: str) -> Tuple[CredencialesVUCEM, ...]:
+        """Credenciales del importador desde el cache (tupla vacía si no hay o la API falla)"""
+        try:
+            return self._credentials_cache.get(importador)
         except Exception as e:
-            print(f"Error al obtener credenciales para {importador}: {e}")
-            if 'response' in locals():
-                print(f"Tipo de respuesta: {type(response)}")
-                print(f"Contenido: {response}")
+            logger.error("Error al obtener credenciales para %s: %s", importador, e)
+        return ()
+    
+    def _load_credentials(self, importador: str) -> Tuple[CredencialesVUCEM, ...]:
+        """
+        Consulta las credenciales de un importador en la API (loader del cache)
         
-        return None
+        Returns:
+            Credenciales del importador, activas primero (vacía si no tiene)
+            
+        Raises:
+            CredentialsUnavailable: Si la API no respondió; no se guarda en cache
+        """
+        response = self.api_controller.get_vucem_credentials(importador)
+        if response is None:
+            raise CredentialsUnavailable(f"Sin respuesta de la API de credenciales para {importador}")
+        return self._parse_credentials(response, importador)
+    
+    def _parse_credentials(self, response, importador: str) -> Tuple[CredencialesVUCEM, ...]:
+        """
+        Convierte la respuesta de la API en credenciales, las activas primero
+        y en el orden en que llegaron
+        """
+        # Validar respuesta antes de procesarla
+        if not self.validate_response_data(response, importador):
+            return ()
+        
+        # La API devuelve una lista; se acepta también un diccionario directo
+        items = response if isinstance(response, list) else [response]
+        credentials = []
+        for item in items:
+            try:
+                credentials.append(CredencialesVUCEM(**item))
+            except TypeError as e:
+                logger.error("Credenciales con formato inesperado para %s: %s", importador, e)
+        
+        if not credentials:
+            logger.warning("No se encontraron credenciales válidas para %s", importador)
+        return tuple(sorted(credentials, key=lambda cred: not cred.is_active))
+    
+    def prefetch(self, importadores: Iterable[str]) -> Dict[str, Optional[CredencialesVUCEM]]:
+        """
+        Carga de una vez las credenciales de varios importadores (p. ej. los de
+        una página de servicios) para que los hilos de trabajo las encuentren
+        en cache
+        
+        Los importadores que no están en cache se piden en una sola consulta
+        masiva (usuario__in); los que la API no devuelve en ella, o todos si la
+        consulta falla o el filtro no está soportado, se consultan uno por uno
+        en paralelo contra el endpoint de siempre.
+        
+        Args:
+            importadores: Importadores (RFC del contribuyente), con repetidos
+            
+        Returns:
+            Dict importador -> CredencialesVUCEM o None
+        """
+        distinct = list(dict.fromkeys(importador for importador in importadores if importador))
+        missing = [importador for importador in distinct if importador not in self._credentials_cache]
+        
+        if len(missing) > 1 and self._bulk_enabled:
+            found = self._prefetch_bulk(missing)
+            missing = [importador for importador in missing if importador not in found]
+        
+        loaded = {}
+        if missing:
+            self._count('individual_loads', len(missing))
+            workers = min(len(missing), SETTINGS.CREDENTIALS_PREFETCH_WORKERS)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="CredentialsPrefetch") as executor:
+                loaded = dict(zip(missing, executor.map(self.get_credentials_by_user, missing)))
+        
+        return {importador: loaded[importador] if importador in loaded else self.get_credentials_by_user(importador)
+                for importador in distinct}
+    
+    def prefetch_for_services(self, services: Iterable[dict]) -> Dict[str, Optional[CredencialesVUCEM]]:
+        """prefetch() de los contribuyentes de una lista de servicios de la API"""
+        return self.prefetch((service.get('pedimento') or {}).get('contribuyente') for service in services)
+    
+    def _prefetch_bulk(self, importadores: List[str]) -> set:
+        """
+        Consulta masiva de credenciales; guarda en cache las encontradas
+        
+        Returns:
+            Importadores que la API devolvió en la consulta
+        """
+        response = self.api_controller.get_vucem_credentials_bulk(importadores)
+        self._count('bulk_requests')
+        if isinstance(response, dict):
+            response = response.get('results')
+        if not isinstance(response, list):
+            logger.warning("Consulta masiva de credenciales sin respuesta; se consultan uno por uno")
+            return set()
+        
+        by_user = {}
+        for item in response:
+            if isinstance(item, dict):
+                by_user.setdefault(item.get('usuario'), []).append(item)
+        
+        if set(by_user) - set(importadores):
+            # La API ignoró el filtro usuario__in y devolvió otras credenciales
+            logger.warning("La API no soporta usuario__in; se desactiva la consulta masiva de credenciales")
+            self._bulk_enabled = False
+            return set()
+        
+        for importador, items in by_user.items():
+            self._credentials_cache.put(importador, self._parse_credentials(items, importador))
+        self._count('bulk_credentials', len(by_user))
+        return set(by_user)
+    
+    def _count(self, stat: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[stat] += amount
     
     def get_soap_credentials(self, importador: str) -> Optional[CredencialesSOAP]:
         """
@@ -109,8 +223,9 @@ class CredentialsManager:
             # Obtener credenciales de un importador específico
             all_creds = self.get_active_credentials_for_user(importador)
         else:
-            # Si no hay importador específico, usar cache disponible
-            all_creds = [cred for cred in self._credentials_cache.values() if cred.is_active]
+            # Si no hay importador específico, usar las credenciales vigentes en cache
+            all_creds = [cred for credentials in self._credentials_cache.values()
+                         for cred in credentials if cred.is_active]
         
         # Filtrar por tipo de acuse
         filtered_creds = []
@@ -126,6 +241,18 @@ class CredentialsManager:
         """Limpia el cache de credenciales"""
         self._credentials_cache.clear()
     
+    def metrics(self) -> dict:
+        """Métricas del cache de credenciales, de la consulta masiva y uso de cada credencial"""
+        metrics = self._credentials_cache.stats()
+        with self._stats_lock:
+            metrics['prefetch'] = dict(self._stats)
+        metrics['pool'] = self._pool.snapshot()
+        return metrics
+    
+    def close(self):
+        """Detiene los refrescos en segundo plano del cache"""
+        self._credentials_cache.close()
+    
     def refresh_credentials(self, importador: str) -> Optional[CredencialesVUCEM]:
         """
         Fuerza la actualización de credenciales desde la API
@@ -137,15 +264,15 @@ class CredentialsManager:
             CredencialesVUCEM actualizadas o None
         """
         # Limpiar cache para este usuario
-        if importador in self._credentials_cache:
-            del self._credentials_cache[importador]
+        self._credentials_cache.invalidate(importador)
         
         # Obtener credenciales frescas
         return self.get_credentials_by_user(importador)
     
     def get_all_credentials_for_user(self, importador: str) -> List[CredencialesVUCEM]:
         """
-        Obtiene todas las credenciales de un importador (puede tener múltiples)
+        Obtiene todas las credenciales de un importador (puede tener múltiples),
+        activas primero, desde el cache
         
         Args:
             importador: Usuario/importador para obtener credenciales
@@ -153,23 +280,7 @@ class CredentialsManager:
         Returns:
             Lista de CredencialesVUCEM
         """
-        try:
-            response = self.api_controller.get_vucem_credentials(importador)
-            if response and isinstance(response, list):
-                credentials_list = []
-                for item in response:
-                    if isinstance(item, dict):
-                        try:
-                            credentials = CredencialesVUCEM(**item)
-                            credentials_list.append(credentials)
-                        except Exception as e:
-                            print(f"Error al procesar credencial: {e}")
-                            continue
-                return credentials_list
-        except Exception as e:
-            print(f"Error al obtener todas las credenciales para {importador}: {e}")
-        
-        return []
+        return list(self._credentials(importador))
     
     def get_active_credentials_for_user(self, importador: str) -> List[CredencialesVUCEM]:
         """
@@ -237,18 +348,18 @@ class CredentialsManager:
         """
         try:
             if response is None:
-                print(f"Respuesta nula para {importador}")
+                logger.warning("Respuesta nula para %s", importador)
                 return False
             
             if isinstance(response, list):
                 if len(response) == 0:
-                    print(f"Lista de credenciales vacía para {importador}")
+                    logger.warning("Lista de credenciales vacía para %s", importador)
                     return False
                 
                 # Validar que todos los elementos de la lista sean diccionarios
                 for i, item in enumerate(response):
                     if not isinstance(item, dict):
-                        print(f"Elemento {i} no es un diccionario para {importador}: {type(item)}")
+                        logger.warning("Elemento %s no es un diccionario para %s: %s", i, importador, type(item))
                         return False
                         
                 return True
@@ -256,9 +367,9 @@ class CredentialsManager:
             elif isinstance(response, dict):
                 return True
             else:
-                print(f"Tipo de respuesta inesperado para {importador}: {type(response)}")
+                logger.warning("Tipo de respuesta inesperado para %s: %s", importador, type(response))
                 return False
                 
         except Exception as e:
-            print(f"Error validando respuesta para {importador}: {e}")
+            logger.error("Error validando respuesta para %s: %s", importador, e)
             return False
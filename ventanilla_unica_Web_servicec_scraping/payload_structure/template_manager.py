@@ -1,13 +1,85 @@
 import os
-from string import Template
-from typing import Dict, Any
+import re
+from typing import Any, Dict, Iterable, List, Tuple, Union
+from xml.sax.saxutils import escape
 from payload_structure.soap_models import *
 
+# Marcadores {campo} de los templates XML
+_SLOT = re.compile(r'\{(\w+)\}')
+
+# Campos que salen de CredencialesSOAP; el resto sale de la consulta
+CREDENTIAL_SLOTS = ('username', 'password')
+
+# service_type de la API -> template (ver SERVICE_TYPE_DESCRIPTIONS en main.py)
+SERVICE_TYPE_TEMPLATES = {
+    1: 'consultar_estado_pedimento',
+    2: 'consultar_partida',
+    3: 'consultar_pedimento_completo',
+    4: 'consultar_remesas',
+    5: 'consultar_acuses',
+}
+
+
+def _escape(value: str) -> bytes:
+    """Escapa &, < y > (los campos van como texto de elemento) y codifica a UTF-8"""
+    if '&' in value or '<' in value or '>' in value:
+        value = escape(value)
+    return value.encode('utf-8')
+
+
+class CompiledTemplate:
+    """
+    Template XML precompilado: segmentos estáticos ya codificados a bytes
+    intercalados con los campos a sustituir.
+
+    Renderizar es escapar cada valor (credenciales y campos de la consulta
+    pueden traer &, < o >) y unir los segmentos en un solo b''.join, sin
+    volver a recorrer el texto del template.
+    """
+
+    def __init__(self, name: str, content: str):
+        self.name = name
+        # split con un grupo alterna texto estático y nombre de campo
+        parts = _SLOT.split(content)
+        self.static: Tuple[bytes, ...] = tuple(part.encode('utf-8') for part in parts[0::2])
+        self.slots: Tuple[str, ...] = tuple(parts[1::2])
+        # Campos de credenciales al inicio del template (el encabezado WS-Security):
+        # en render_batch ese prefijo se arma una vez por importador
+        self.credential_slots = 0
+        while self.credential_slots < len(self.slots) and self.slots[self.credential_slots] in CREDENTIAL_SLOTS:
+            self.credential_slots += 1
+
+    def render(self, **values) -> bytes:
+        """Sustituye todos los campos; falla si falta alguno"""
+        chunks: List[bytes] = [self.static[0]]
+        try:
+            for slot, static in zip(self.slots, self.static[1:]):
+                chunks.append(_escape(str(values[slot])))
+                chunks.append(static)
+        except KeyError as e:
+            raise KeyError(f"Falta el campo {e} para el template {self.name}") from None
+        return b''.join(chunks)
+
+    def credential_prefix(self, credenciales: CredencialesSOAP) -> bytes:
+        """Inicio del envelope hasta el último campo de credenciales, ya renderizado"""
+        chunks: List[bytes] = [self.static[0]]
+        for slot, static in zip(self.slots[:self.credential_slots], self.static[1:]):
+            chunks.append(_escape(str(getattr(credenciales, slot))))
+            chunks.append(static)
+        return b''.join(chunks)
+
+
 class SOAPTemplateManager:
     """Gestor de plantillas SOAP"""
     
     def __init__(self):
         self.templates_dir = os.path.join(os.path.dirname(__file__), 'templates')
+        # Los templates se leen y compilan una sola vez
+        self.templates: Dict[str, CompiledTemplate] = {}
+        for file_name in sorted(os.listdir(self.templates_dir)):
+            if file_name.endswith('.xml'):
+                template_name = file_name[:-len('.xml')]
+                self.templates[template_name] = CompiledTemplate(template_name, self._load_template(template_name))
         
     def _load_template(self, template_name: str) -> str:
         """Carga una plantilla XML desde archivo"""
@@ -15,48 +87,54 @@ class SOAPTemplateManager:
         with open(template_path, 'r', encoding='utf-8') as file:
             return file.read()
     
-    def _render_template(self, template_content: str, **kwargs) -> str:
-        """Renderiza una plantilla con los parámetros dados"""
-        try:
-            # Crear el objeto Template
-            template = Template(template_content)
-            
-            # Hacer la sustitución
-            try:
-                rendered = template.substitute(**kwargs)
-            except Exception:
-                # Si template.substitute() falla, usar reemplazo manual
-                rendered = template_content
-                for key, value in kwargs.items():
-                    placeholder = f"{{{key}}}"
-                    rendered = rendered.replace(placeholder, str(value))
-            
-            # Verificar si se hizo la sustitución
-            cambios_realizados = template_content != rendered
-            
-            if not cambios_realizados:
-                # Fallback: reemplazo manual directo
-                rendered = template_content
-                for key, value in kwargs.items():
-                    placeholder = f"{{{key}}}"
-                    if placeholder in template_content:
-                        rendered = rendered.replace(placeholder, str(value))
-            
-            return rendered
-            
-        except Exception as e:
-            print(f"Error al renderizar template: {e}")
-            raise
+    def render(self, template_name: str, **kwargs) -> bytes:
+        """Renderiza un template precompilado a bytes UTF-8"""
+        return self.templates[template_name].render(**kwargs)
+    
+    def render_batch(
+        self,
+        service_type: Union[int, str],
+        consultas: Iterable[Tuple[CredencialesSOAP, Any]]
+    ) -> List[bytes]:
+        """
+        Genera los envelopes de una página completa de servicios en una pasada
+
+        El encabezado con las credenciales se renderiza una sola vez por
+        importador y se reutiliza en todos sus envelopes; de cada consulta
+        solo se escapan sus propios campos.
+
+        Args:
+            service_type: service_type de la API (1-5) o nombre del template
+            consultas: Pares (credenciales, consulta) del mismo tipo de servicio
+
+        Returns:
+            Lista de envelopes en el mismo orden que consultas
+        """
+        template = self.templates[SERVICE_TYPE_TEMPLATES.get(service_type, service_type)]
+        query_slots = tuple(zip(template.slots[template.credential_slots:],
+                                template.static[template.credential_slots + 1:]))
+        prefixes: Dict[Tuple[str, str], bytes] = {}
+        envelopes: List[bytes] = []
+        for credenciales, consulta in consultas:
+            key = (credenciales.username, credenciales.password)
+            prefix = prefixes.get(key)
+            if prefix is None:
+                prefix = prefixes[key] = template.credential_prefix(credenciales)
+            chunks: List[bytes] = [prefix]
+            for slot, static in query_slots:
+                chunks.append(_escape(str(getattr(consulta, slot))))
+                chunks.append(static)
+            envelopes.append(b''.join(chunks))
+        return envelopes
     
     def generar_consulta_estado_pedimento(
         self, 
         credenciales: CredencialesSOAP,
         consulta: ConsultaEstadoPedimento
-    ) -> str:
+    ) -> bytes:
         """Genera XML para consultar estado de pedimento"""
-        template = self._load_template('consultar_estado_pedimento')
-        return self._render_template(
-            template,
+        return self.render(
+            'consultar_estado_pedimento',
             username=credenciales.username,
             password=credenciales.password,
             numero_operacion=consulta.numero_operacion,
@@ -69,29 +147,25 @@ class SOAPTemplateManager:
         self, 
         credenciales: CredencialesSOAP,
         consulta: ConsultaPedimentoCompleto
-    ) -> str:
+    ) -> bytes:
         """Genera XML para consultar pedimento completo"""
-        template = self._load_template('consultar_pedimento_completo')
-
-        render = self._render_template(
-            template,
+        return self.render(
+            'consultar_pedimento_completo',
             username=credenciales.username,
             password=credenciales.password,
             aduana=consulta.aduana,
             patente=consulta.patente,
             pedimento=consulta.pedimento
         )
-        return render
     
     def generar_consulta_partida(
         self, 
         credenciales: CredencialesSOAP,
         consulta: ConsultaPartida
-    ) -> str:
+    ) -> bytes:
         """Genera XML para consultar partida"""
-        template = self._load_template('consultar_partida')
-        return self._render_template(
-            template,
+        return self.render(
+            'consultar_partida',
             username=credenciales.username,
             password=credenciales.password,
             aduana=consulta.aduana,
@@ -105,11 +179,10 @@ class SOAPTemplateManager:
         self, 
         credenciales: CredencialesSOAP,
         consulta: ConsultaAcuses
-    ) -> str:
+    ) -> bytes:
         """Genera XML para consultar acuses"""
-        template = self._load_template('consultar_acuses')
-        return self._render_template(
-            template,
+        return self.render(
+            'consultar_acuses',
             username=credenciales.username,
             password=credenciales.password,
             id_edocument=consulta.id_edocument
@@ -119,16 +192,16 @@ class SOAPTemplateManager:
         self, 
         credenciales: CredencialesSOAP,
         consulta: ConsultaRemesas
-    ) -> str:
+    ) -> bytes:
         """Genera XML para consultar remesas"""
-        template = self._load_template('consultar_remesas')
-        return self._render_template(
-            template,
+        return self.render(
+            'consultar_remesas',
             username=credenciales.username,
             password=credenciales.password,
             aduana=consulta.aduana,
             patente=consulta.patente,
-            pedimento=consulta.pedimento
+            pedimento=consulta.pedimento,
+            numero_operacion=consulta.numero_operacion
         )
     
     def test_template_rendering(self):
@@ -156,9 +229,9 @@ class SOAPTemplateManager:
             )
             
             print("✅ Template renderizado exitosamente")
-            print(f"Resultado contiene usuario: {'TEST_USER' in result}")
-            print(f"Resultado contiene password: {'TEST_PASSWORD' in result}")
-            print(f"Resultado contiene aduana: {'070' in result}")
+            print(f"Resultado contiene usuario: {b'TEST_USER' in result}")
+            print(f"Resultado contiene password: {b'TEST_PASSWORD' in result}")
+            print(f"Resultado contiene aduana: {b'070' in result}")
             
         except Exception as e:
             print(f"❌ Error en test: {e}")
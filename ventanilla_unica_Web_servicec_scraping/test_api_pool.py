@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el pool de conexiones y reintentos de APIController
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from urllib3.util.retry import Retry
+
+from controllers.RESTController import APIController
+from utils.latency_stats import endpoint_key
+
+
+class BackendStub:
+    """API local con keep-alive que cuenta conexiones y puede fallar con 503"""
+
+    def __init__(self, failures=0):
+        self.connections = 0
+        self.requests = []
+        self.failures = failures
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                with stub.lock:
+                    stub.connections += 1
+
+            def _reply(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with stub.lock:
+                    stub.requests.append((self.command, self.path))
+                    fail = stub.failures > 0
+                    stub.failures -= int(fail)
+                body = json.dumps({'ok': not fail}).encode('utf-8')
+                self.send_response(503 if fail else 200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_PUT = do_POST = _reply
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def controller(self, **kwargs) -> APIController:
+        api_controller = APIController(**kwargs)
+        api_controller.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/api/v1"
+        return api_controller
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_threads_share_pooled_connections():
+    """40 peticiones desde 4 hilos reutilizan a lo más 4 conexiones"""
+    backend = BackendStub()
+    api_controller = backend.controller(pool_maxsize=2)
+    api_controller.size_pool(4)
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(
+                lambda n: api_controller.put_pedimento_service(n, {'estado': 3}), range(40)))
+        assert all(result == {'ok': True} for result in results)
+        assert backend.connections <= 4
+        metrics = api_controller.metrics()
+        assert metrics['pool'] == {'maxsize': 4, 'connections': backend.connections, 'requests': 40}
+        latency = metrics['latency']['customs/procesamientopedimentos/{id}/']
+        assert latency['requests'] == 40 and latency['errors'] == 0
+        assert latency['p50_ms'] <= latency['p95_ms'] <= latency['max_ms']
+    finally:
+        api_controller.close()
+        backend.stop()
+    print("✅ Hilos comparten el pool de conexiones")
+
+
+def test_size_pool_closes_previous_adapter():
+    """Al agrandar el pool el adaptador anterior cierra sus conexiones"""
+    backend = BackendStub()
+    api_controller = backend.controller(pool_maxsize=2)
+    try:
+        assert api_controller.put_pedimento_service(1, {'estado': 3}) == {'ok': True}
+        previous = api_controller._adapter
+        assert len(previous.poolmanager.pools) == 1
+        api_controller.size_pool(4)
+        assert len(previous.poolmanager.pools) == 0
+        assert api_controller.put_pedimento_service(2, {'estado': 3}) == {'ok': True}
+        assert api_controller.metrics()['pool']['maxsize'] == 4
+    finally:
+        api_controller.close()
+        backend.stop()
+    print("✅ size_pool cierra el adaptador anterior")
+
+
+def test_retry_adapter():
+    """Un 503 se reintenta en GET/PUT pero no en POST"""
+    retries = Retry(total=2, backoff_factor=0, status_forcelist=[503],
+                    allowed_methods=frozenset({'GET', 'PUT'}), raise_on_status=False)
+    backend = BackendStub(failures=1)
+    api_controller = backend.controller(retries=retries)
+    try:
+        assert api_controller.get_pedimento_services(page=1) == {'ok': True}
+        assert len(backend.requests) == 2
+
+        backend.failures = 1
+        assert api_controller.post_pedimento_service({'estado': 1}) is None
+        assert len(backend.requests) == 3
+        stats = api_controller.metrics()['latency']['customs/procesamientopedimentos/']
+        assert stats['requests'] == 2 and stats['errors'] == 1
+    finally:
+        api_controller.close()
+        backend.stop()
+    print("✅ Reintentos solo en métodos idempotentes")
+
+
+def test_endpoint_key():
+    assert endpoint_key('customs/procesamientopedimentos/12/') == 'customs/procesamientopedimentos/{id}/'
+    assert endpoint_key('customs/pedimentos/ped-1/') == 'customs/pedimentos/{id}/'
+    assert endpoint_key('vucem/vucem/?usuario=ABC123') == 'vucem/vucem/'
+    print("✅ Ids fuera del nombre del endpoint")
+
+
+if __name__ == "__main__":
+    test_threads_share_pooled_connections()
+    test_size_pool_closes_previous_adapter()
+    test_retry_adapter()
+    test_endpoint_key()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el pipeline asíncrono (process_pedimento_services_async)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import json
+import re
+
+import httpx
+
+from controllers.AsyncRESTController import AsyncAPIController
+from controllers.AsyncSOAPService import AsyncSOAPController
+from controllers.RESTController import APIController
+from controllers.SOAPService import SOAPController
+from main import MainProcess
+from payload_structure.credentials_manager import CredentialsManager
+from utils.rate_limiter import TokenBucket
+from utils.retry_policy import RetryPolicy
+
+SOAP_OK = b'<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/"><S:Body><ok/></S:Body></S:Envelope>'
+SOAP_FAULT = (b'<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/"><S:Body><respuesta>'
+              b'<tieneError>true</tieneError><mensaje>Pedimento no encontrado</mensaje>'
+              b'</respuesta></S:Body></S:Envelope>')
+SOAP_FAULT_PEDIMENTO = '1000003'
+UPLOAD_FAIL_PEDIMENTO = '1000005'
+
+
+class FakeCredentialsAPI:
+    def get_vucem_credentials(self, usuario):
+        return [{
+            'id': f'cred-{usuario}', 'usuario': usuario, 'password': 'secreto', 'patente': '1800',
+            'is_importador': True, 'acusecove': True, 'acuseedocument': False, 'is_active': True,
+            'created_at': '', 'updated_at': '', 'created_by': '', 'updated_by': '', 'organizacion': 'org'
+        }]
+
+
+class FakeBackend:
+    """VUCEM y API del backend en memoria; cuenta las consultas SOAP en vuelo"""
+
+    def __init__(self, services=12):
+        self.services = [{
+            'id': index, 'servicio': 3,
+            'pedimento': {'id': f'ped-{index}', 'contribuyente': f'IMP{index % 3}', 'aduana': '07',
+                          'patente': '1800', 'pedimento': str(1000000 + index)}
+        } for index in range(1, services + 1)]
+        self.estados = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def soap(self, request):
+        content = await request.aread()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.02)
+        finally:
+            self.in_flight -= 1
+        return httpx.Response(200, content=SOAP_FAULT if SOAP_FAULT_PEDIMENTO.encode() in content else SOAP_OK)
+
+    async def api(self, request):
+        path = request.url.path
+        if request.method == 'GET' and path.endswith('customs/procesamientopedimentos/'):
+            return httpx.Response(200, json={'count': len(self.services), 'organizacion': 'org', 'next': None,
+                                             'results': self.services})
+        if path.endswith('record/documents/'):
+            content = await request.aread()
+            if UPLOAD_FAIL_PEDIMENTO.encode() in content:
+                # Página HTML de un proxy caído: tampoco es JSON
+                return httpx.Response(502, content=b'<html>Bad Gateway</html>')
+            return httpx.Response(201, json={'id': 'doc'})
+        match = re.search(r'customs/procesamientopedimentos/(\d+)/$', path)
+        if request.method == 'PUT' and match:
+            self.estados[int(match.group(1))] = json.loads(await request.aread())['estado']
+            return httpx.Response(200, json={'id': int(match.group(1))})
+        return httpx.Response(201, json={})
+
+
+def build_process(backend):
+    async_api_controller = AsyncAPIController(rate_limiter=TokenBucket(0))
+    async_api_controller.base_url = 'http://api.test/api/v1'
+    async_api_controller._client = httpx.AsyncClient(transport=httpx.MockTransport(backend.api))
+    async_soap_controller = AsyncSOAPController(
+        base_url='http://vucem.test',
+        retry_policy=RetryPolicy(max_attempts=1, base_delay=0, max_delay=0),
+        rate_limiter=TokenBucket(0)
+    )
+    async_soap_controller._client = httpx.AsyncClient(transport=httpx.MockTransport(backend.soap))
+    process = MainProcess(
+        api_controller=APIController(rate_limiter=TokenBucket(0)),
+        soap_controller=SOAPController(rate_limiter=TokenBucket(0)),
+        async_api_controller=async_api_controller,
+        async_soap_controller=async_soap_controller
+    )
+    process.credentials_manager = CredentialsManager(FakeCredentialsAPI(), ttl=60)
+    return process
+
+
+def test_concurrency_cap_and_isolated_failures():
+    """No hay más de max_concurrency servicios en vuelo; un fault SOAP o una subida fallida no detienen el resto"""
+    backend = FakeBackend(services=12)
+    process = build_process(backend)
+    results = asyncio.run(process.process_pedimento_services_async(end_page=1, max_concurrency=3))
+
+    assert 1 < backend.max_in_flight <= 3
+    assert results['total_processed'] == 12
+    assert results['total_successful'] == 10 and results['total_failed'] == 2
+    # Fault SOAP: el servicio queda fallido (estado 2)
+    assert backend.estados[3] == 2
+    # Subida fallida: el servicio no se marca como exitoso
+    assert 5 not in backend.estados
+    assert all(backend.estados[index] == 3 for index in range(1, 13) if index not in (3, 5))
+    print(f"✅ {backend.max_in_flight} servicios en vuelo como máximo; fallos aislados")
+
+
+def test_non_json_response_returns_none():
+    """Un cuerpo que no es JSON (HTML de un 502, 204 vacío) se trata como petición fallida"""
+    def handler(request):
+        if request.method == 'DELETE':
+            return httpx.Response(204)
+        return httpx.Response(200, content=b'<html>Mantenimiento</html>')
+
+    async def run():
+        controller = AsyncAPIController(rate_limiter=TokenBucket(0))
+        controller.base_url = 'http://api.test/api/v1'
+        controller._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        response = httpx.Response(200, content=b'<xml/>')
+        results = (await controller.get_pedimento_services(page=1),
+                   await controller._make_request('DELETE', 'customs/pedimentos/1/'),
+                   await controller.post_document(response, 'org', 'ped-1', 'pedimento.xml'))
+        await controller.aclose()
+        return results
+
+    assert asyncio.run(run()) == (None, None, None)
+    print("✅ Respuestas que no son JSON no rompen el event loop")
+
+
+if __name__ == "__main__":
+    test_concurrency_cap_and_isolated_failures()
+    test_non_json_response_returns_none()
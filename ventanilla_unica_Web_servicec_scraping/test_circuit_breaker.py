@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el circuit breaker por endpoint de SOAPController
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import time
+
+import httpx
+
+from controllers.SOAPService import SOAPController
+from main import MainProcess
+from utils.circuit_breaker import CircuitBreaker, CircuitBreakers, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from utils.retry_policy import RetryPolicy, READ_TIMEOUT, CLIENT_ERROR
+
+ENDPOINT = 'ventanilla-ws-pedimentos/ConsultarPedimentoCompletoService?wsdl'
+
+
+class FakeAPIController:
+    """APIController mínimo que registra las actualizaciones de estado"""
+
+    def __init__(self, services):
+        self.services = services
+        self.updates = []
+
+    def get_pedimento_services(self, page, service_type=3):
+        return {'organizacion': 'org', 'results': self.services}
+
+    def get_vucem_credentials(self, importador):
+        return [{
+            'id': '1', 'usuario': importador, 'password': 'secret', 'patente': '1800',
+            'is_importador': True, 'acusecove': True, 'acuseedocument': True, 'is_active': True,
+            'created_at': '', 'updated_at': '', 'created_by': '', 'updated_by': '', 'organizacion': 'org'
+        }]
+
+    def put_pedimento_service(self, service_id, data):
+        self.updates.append((service_id, data))
+        return data
+
+    def post_pedimento_service(self, data):
+        return data
+
+    def post_document(self, **kwargs):
+        return {'id': 'doc'}
+
+
+def test_breaker_opens_and_recovers():
+    """closed -> open tras el umbral -> half-open tras open_seconds -> closed con una prueba exitosa"""
+    breaker = CircuitBreaker(failure_threshold=2, open_seconds=0.05, half_open_probes=1)
+    breaker.record_failure(READ_TIMEOUT)
+    assert breaker.state == CLOSED
+    breaker.record_failure(READ_TIMEOUT)
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # Solo una prueba a la vez
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    print("✅ Transiciones closed/open/half-open")
+
+
+def test_failed_probe_reopens():
+    """Si la prueba en half-open falla el circuito vuelve a abrirse"""
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=0.01)
+    breaker.record_failure(READ_TIMEOUT)
+    time.sleep(0.02)
+    assert breaker.allow_request()
+    breaker.record_failure(READ_TIMEOUT)
+    assert breaker.state == OPEN
+    print("✅ Prueba fallida reabre el circuito")
+
+
+def test_client_errors_do_not_open():
+    """Un 4xx significa que VUCEM respondió; no abre el circuito"""
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=10)
+    breaker.record_failure(CLIENT_ERROR)
+    assert breaker.state == CLOSED
+    print("✅ Los 4xx no abren el circuito")
+
+
+def build_controller(handler):
+    controller = SOAPController(
+        base_url='http://vucem.test',
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0, max_delay=0),
+        breakers=CircuitBreakers(failure_threshold=2, open_seconds=60, half_open_probes=1)
+    )
+    controller._client = httpx.Client(transport=httpx.MockTransport(handler))
+    return controller
+
+
+def test_controller_raises_when_open():
+    """Con el circuito abierto make_request falla al instante sin tocar la red"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    controller = build_controller(handler)
+    assert controller.make_request(ENDPOINT, data='<x/>') is None
+    assert len(calls) == 2
+    try:
+        controller.make_request(ENDPOINT, data='<x/>')
+        assert False, "Se esperaba CircuitOpenError"
+    except CircuitOpenError as e:
+        assert e.endpoint == ENDPOINT
+    assert len(calls) == 2
+    print("✅ make_request rechaza con el circuito abierto")
+
+
+def test_services_stay_pending_during_outage():
+    """Los servicios que encuentran el circuito abierto no se marcan como fallidos"""
+    services = [
+        {'id': service_id, 'pedimento': {'id': f'p{service_id}', 'contribuyente': 'MFN031210AT9',
+                                         'aduana': '07', 'patente': '1800', 'pedimento': str(1000 + service_id)}}
+        for service_id in range(1, 5)
+    ]
+    api_controller = FakeAPIController(services)
+    controller = build_controller(lambda request: httpx.Response(503))
+    main_process = MainProcess(api_controller=api_controller, soap_controller=controller)
+
+    results = main_process.process_pedimento_services_single_page(page=1, service_type=3)
+
+    # El primer servicio agota sus intentos y abre el circuito; el resto queda pendiente
+    assert results['failed'] == 1
+    assert results['skipped'] == 3
+    assert [update[1]['estado'] for update in api_controller.updates] == [2]
+    print("✅ Servicios pendientes durante la caída")
+
+
+if __name__ == "__main__":
+    test_breaker_opens_and_recovers()
+    test_failed_probe_reopens()
+    test_client_errors_do_not_open()
+    test_controller_raises_when_open()
+    test_services_stay_pending_during_outage()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la compresión de las respuestas SOAP y de los XML subidos
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import email
+import gzip
+
+import httpx
+
+from config.settings import SETTINGS
+from controllers.RESTController import APIController
+from controllers.SOAPService import SOAPController
+
+ENDPOINT = 'ventanilla-ws-pedimentos/ConsultarPedimentoCompletoService?wsdl'
+BODY = b'<S:Envelope><ns3:tieneError>false</ns3:tieneError>' + b'<partida/>' * 2000 + b'</S:Envelope>'
+
+
+def test_soap_requests_negotiate_compression():
+    """Toda petición SOAP pide gzip, se descomprime y se cuentan los bytes"""
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get('Accept-Encoding'))
+        return httpx.Response(200, content=gzip.compress(BODY), headers={'Content-Encoding': 'gzip'})
+
+    controller = SOAPController(base_url='http://vucem.test')
+    controller._client = httpx.Client(transport=httpx.MockTransport(handler))
+    response = controller.make_request(ENDPOINT, data='<x/>', headers={'SOAPAction': 'consultar'})
+
+    assert response.content == BODY
+    assert seen == [SETTINGS.SOAP_ACCEPT_ENCODING]
+    transfer = controller.metrics()['transfer'][ENDPOINT]
+    assert transfer['responses'] == transfer['compressed_responses'] == 1
+    assert transfer['decoded_bytes'] == len(BODY)
+    assert transfer['wire_bytes'] == len(gzip.compress(BODY)) < len(BODY)
+    print("✅ Respuestas SOAP comprimidas y contabilizadas")
+
+
+def test_upload_gzip():
+    """Con API_UPLOAD_GZIP el XML se sube como .xml.gz"""
+    uploads = []
+
+    class FakeResponse:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {'id': 'doc'}
+
+    def fake_request(method, url, data=None, headers=None):
+        message = email.message_from_bytes(f"Content-Type: {headers['Content-Type']}\r\n\r\n".encode() + data.read())
+        part = message.get_payload()[-1]
+        uploads.append((part.get_filename(), part.get_payload(decode=True), part.get_content_type()))
+        return FakeResponse()
+
+    api_controller = APIController()
+    api_controller.session.request = fake_request
+    original_gzip, SETTINGS.API_UPLOAD_GZIP = SETTINGS.API_UPLOAD_GZIP, True
+    try:
+        result = api_controller.post_document(httpx.Response(200, content=BODY), 'org', 'ped', 'pedimento.xml')
+    finally:
+        SETTINGS.API_UPLOAD_GZIP = original_gzip
+
+    assert result == {'id': 'doc'}
+    name, content, content_type = uploads[0]
+    assert name == 'pedimento.xml.gz' and content_type == 'application/gzip'
+    assert gzip.decompress(content) == BODY
+    print("✅ Subida de XML comprimido")
+
+
+if __name__ == "__main__":
+    test_soap_requests_negotiate_compression()
+    test_upload_gzip()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el límite adaptativo (AIMD) por endpoint
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+
+from utils.concurrency_limiter import AdaptiveLimiter, EndpointLimiters
+from utils.retry_policy import READ_TIMEOUT, CLIENT_ERROR
+
+
+def build_limiter():
+    return AdaptiveLimiter(initial_limit=2, min_limit=1, max_limit=8,
+                           latency_target=1.0, backoff_ratio=0.5, cooldown=0)
+
+
+def test_limit_grows_while_healthy():
+    """Respuestas rápidas hacen crecer el límite hasta max_limit"""
+    limiter = build_limiter()
+    for _ in range(200):
+        limiter.acquire()
+        limiter.release(latency=0.1)
+    assert limiter.limit == 8
+    print("✅ El límite crece con respuestas sanas")
+
+
+def test_limit_holds_on_slow_or_client_errors():
+    """Latencia alta o errores 4xx no mueven el límite"""
+    limiter = build_limiter()
+    for failure, latency in [(None, 5.0), (CLIENT_ERROR, 0.1)]:
+        limiter.acquire()
+        limiter.release(latency=latency, failure=failure)
+    assert limiter.limit == 2
+    print("✅ El límite se mantiene con respuestas lentas o 4xx")
+
+
+def test_limit_backs_off_on_timeouts():
+    """Un timeout reduce el límite a la mitad, sin bajar de min_limit"""
+    limiter = build_limiter()
+    limiter.acquire()
+    limiter.release(latency=5.0, failure=READ_TIMEOUT)
+    assert limiter.limit == 1
+    limiter.acquire()
+    limiter.release(latency=5.0, failure=READ_TIMEOUT)
+    assert limiter.limit == 1
+    print("✅ Reducción multiplicativa ante timeouts")
+
+
+def test_acquire_blocks_at_limit():
+    """Con el límite ocupado, acquire espera a que se libere un lugar"""
+    limiter = build_limiter()
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+    acquired = threading.Event()
+
+    def worker():
+        limiter.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not acquired.wait(0.1)
+    limiter.release(latency=0.1)
+    assert acquired.wait(1)
+    thread.join()
+    print("✅ acquire bloquea en el límite")
+
+
+def test_limiters_are_per_endpoint():
+    """Cada endpoint tiene su propio límite"""
+    limiters = EndpointLimiters(initial_limit=2, min_limit=1, max_limit=8, latency_target=1.0, backoff_ratio=0.5)
+    limiters.get('a').acquire()
+    limiters.get('a').release(latency=5.0, failure=READ_TIMEOUT)
+    snapshot = limiters.snapshot()
+    assert snapshot['a']['limit'] == 1
+    assert limiters.get('b').limit == 2
+    print("✅ Límites independientes por endpoint")
+
+
+if __name__ == "__main__":
+    test_limit_grows_while_healthy()
+    test_limit_holds_on_slow_or_client_errors()
+    test_limit_backs_off_on_timeouts()
+    test_acquire_blocks_at_limit()
+    test_limiters_are_per_endpoint()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el reparto de carga entre credenciales VUCEM de un importador
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import time
+
+import httpx
+
+from controllers.SOAPService import SOAPController
+from main import MainProcess
+from payload_structure.credential_pool import CredentialPool
+from payload_structure.credentials_manager import CredentialsManager
+from payload_structure.soap_models import CredencialesVUCEM
+from utils.circuit_breaker import CircuitBreakers
+from utils.concurrency_limiter import EndpointLimiters
+from utils.rate_limiter import TokenBucket
+from utils.retry_policy import THROTTLED, RetryPolicy
+
+
+def credential(id, password, is_active=True, acusecove=True):
+    return {
+        'id': id, 'usuario': 'IMP', 'password': password, 'patente': '1800',
+        'is_importador': True, 'acusecove': acusecove, 'acuseedocument': False, 'is_active': is_active,
+        'created_at': '', 'updated_at': '', 'created_by': '', 'updated_by': '', 'organizacion': 'org'
+    }
+
+
+class FakeAPI:
+    def __init__(self, credentials):
+        self.credentials = credentials
+
+    def get_vucem_credentials(self, usuario):
+        return self.credentials
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_loaded_and_capabilities():
+    """Las peticiones se reparten entre las credenciales activas según las que tienen en vuelo"""
+    manager = CredentialsManager(FakeAPI([
+        credential('a', 'pass-a'), credential('inactiva', 'x', is_active=False),
+        credential('b', 'pass-b'), credential('c', 'pass-c', acusecove=False)
+    ]), ttl=60)
+
+    # Nueve peticiones simultáneas: tres por credencial activa
+    leases = [manager.lease('IMP') for _ in range(9)]
+    pool = manager.metrics()['pool']
+    assert {key: state['in_flight'] for key, state in pool.items()} == {'a': 3, 'b': 3, 'c': 3}
+    for lease in leases:
+        lease.release()
+
+    # Secuenciales: round-robin
+    used = []
+    for _ in range(6):
+        with manager.lease('IMP') as lease:
+            used.append(lease.credentials.id)
+    assert used == ['a', 'b', 'c'] * 2
+
+    # Solo las que tienen permiso para acuses COVE
+    with manager.lease('IMP', capability='acusecove') as lease:
+        assert lease.credentials.id in ('a', 'b')
+    assert manager.lease('IMP', capability='acuseedocument') is None
+    assert manager.get_credentials_by_user('IMP').id == 'a'
+    assert [cred.id for cred in manager.get_all_credentials_for_user('IMP')] == ['a', 'b', 'c', 'inactiva']
+    assert all(state['in_flight'] == 0 for state in manager.metrics()['pool'].values())
+    print("✅ Reparto por carga en vuelo y permisos por credencial")
+
+
+def test_throttled_credential_is_benched():
+    """Una credencial limitada (429) queda en pausa; si todas lo están se usa la que sale antes"""
+    clock = FakeClock()
+    pool = CredentialPool(bench_seconds=30, clock=clock)
+    a, b = (CredencialesVUCEM(**credential(id, f'pass-{id}')) for id in ('a', 'b'))
+
+    with pool.acquire([a, b]) as lease:
+        lease.report(THROTTLED)
+    assert [pool.acquire([a, b]).credentials.id for _ in range(3)] == ['b'] * 3
+
+    clock.now = 10
+    pool.acquire([b]).report(THROTTLED)
+    assert pool.acquire([a, b]).credentials.id == 'a'  # a sale de la pausa antes que b
+    clock.now = 31
+    assert not pool.snapshot()['a']['benched'] and pool.snapshot()['b']['benched']
+    assert pool.snapshot()['a']['throttled'] == 1
+    print("✅ Credencial limitada en pausa")
+
+
+def test_soap_429_moves_load_to_other_credential():
+    """Un 429 de VUCEM no se reintenta con la misma credencial: la consulta se regenera con otra"""
+    requests = []
+
+    def handler(request):
+        requests.append(b'pass-a' in request.content)
+        if b'pass-a' in request.content:
+            return httpx.Response(429, content=b'Too Many Requests')
+        return httpx.Response(200, content=b'<ok/>')
+
+    soap_controller = SOAPController(base_url='http://vucem.test',
+                                     retry_policy=RetryPolicy(max_attempts=3, base_delay=0, max_delay=0),
+                                     rate_limiter=TokenBucket(0))
+    soap_controller._client = httpx.Client(transport=httpx.MockTransport(handler))
+    process = MainProcess(soap_controller=soap_controller)
+    process.credentials_manager = CredentialsManager(
+        FakeAPI([credential('a', 'pass-a'), credential('b', 'pass-b')]), ttl=60)
+
+    for pedimento in range(1000001, 1000006):
+        assert process.consultar_estado_pedimento('IMP', '1', '07', '1800', str(pedimento)) is not None
+    # Un solo intento con la credencial limitada, aunque la política permite 3
+    assert requests == [True, False, False, False, False, False]
+    pool = process.credentials_manager.metrics()['pool']
+    assert pool['a']['throttled'] == 1 and pool['a']['benched'] and pool['b']['leases'] == 5
+    assert all(state['in_flight'] == 0 for state in pool.values())
+    print("✅ 429 de VUCEM desvía la consulta a otra credencial")
+
+
+def test_all_credentials_throttled():
+    """Si VUCEM limita todas las credenciales cada una se intenta una sola vez"""
+    requests = []
+
+    def handler(request):
+        requests.append(request.content)
+        return httpx.Response(429, content=b'Too Many Requests')
+
+    soap_controller = SOAPController(base_url='http://vucem.test',
+                                     retry_policy=RetryPolicy(max_attempts=3, base_delay=0, max_delay=0),
+                                     rate_limiter=TokenBucket(0))
+    soap_controller._client = httpx.Client(transport=httpx.MockTransport(handler))
+    process = MainProcess(soap_controller=soap_controller)
+    process.credentials_manager = CredentialsManager(
+        FakeAPI([credential('a', 'pass-a'), credential('b', 'pass-b')]), ttl=60)
+
+    assert process.consultar_estado_pedimento('IMP', '1', '07', '1800', '1000001') is None
+    assert len(requests) == 2
+    assert sum(b'pass-a' in content for content in requests) == 1
+    pool = process.credentials_manager.metrics()['pool']
+    assert all(state['benched'] and state['in_flight'] == 0 for state in pool.values())
+    print("✅ Sin reintentos contra credenciales limitadas")
+
+
+def test_credential_429_leaves_endpoint_limits_alone():
+    """Un 429 de una credencial no reduce el límite adaptativo ni abre el circuito del endpoint"""
+    def handler(request):
+        return httpx.Response(429, content=b'Too Many Requests')
+
+    soap_controller = SOAPController(base_url='http://vucem.test',
+                                     retry_policy=RetryPolicy(max_attempts=3, base_delay=0, max_delay=0),
+                                     limiters=EndpointLimiters(initial_limit=4, min_limit=1, max_limit=8),
+                                     breakers=CircuitBreakers(failure_threshold=1),
+                                     rate_limiter=TokenBucket(0))
+    soap_controller._client = httpx.Client(transport=httpx.MockTransport(handler))
+    pool = CredentialPool(bench_seconds=30)
+    lease = pool.acquire([CredencialesVUCEM(**credential('a', 'pass-a'))])
+
+    assert soap_controller.make_request('consulta', data=b'<consulta/>', on_failure=lease.report) is None
+    assert lease.benched
+    assert soap_controller.limiters.snapshot()['consulta'] == {'limit': 4, 'in_flight': 0}
+    assert soap_controller.breakers.snapshot()['consulta']['state'] == 'closed'
+    assert soap_controller.breakers.snapshot()['consulta']['consecutive_failures'] == 0
+
+    # Sin credencial que pausar el 429 sí cuenta para el endpoint
+    assert soap_controller.make_request('consulta', data=b'<consulta/>', max_retries=1) is None
+    assert soap_controller.limiters.snapshot()['consulta']['limit'] == 2
+    assert soap_controller.breakers.snapshot()['consulta']['state'] == 'open'
+    print("✅ 429 de una credencial sin efecto en el límite ni el circuito del endpoint")
+
+
+def test_coalesced_requests_with_throttled_leader():
+    """Si VUCEM limita la credencial de la petición coalescida, las que esperaban con otra credencial se envían igual"""
+    requests = []
+
+    def envelope(password):
+        return (f'<S:Envelope><S:Header><wsse:Security>{password}</wsse:Security></S:Header>'
+                f'<S:Body><consulta>1000001</consulta></S:Body></S:Envelope>').encode()
+
+    def handler(request):
+        requests.append(request.content)
+        if b'pass-a' in request.content:
+            # La primera petición espera a que las otras dos se unan a ella
+            deadline = time.monotonic() + 2
+            while soap_controller.single_flight.stats()['coalesced'] < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return httpx.Response(429, content=b'Too Many Requests')
+        return httpx.Response(200, content=b'<ok/>')
+
+    soap_controller = SOAPController(base_url='http://vucem.test',
+                                     retry_policy=RetryPolicy(max_attempts=3, base_delay=0, max_delay=0),
+                                     rate_limiter=TokenBucket(0))
+    soap_controller._client = httpx.Client(transport=httpx.MockTransport(handler))
+    pool = CredentialPool(bench_seconds=30)
+    a, b = (CredencialesVUCEM(**credential(id, f'pass-{id}')) for id in ('a', 'b'))
+    leases = {'lider': pool.acquire([a]), 'misma': pool.acquire([a]), 'otra': pool.acquire([b])}
+    responses = {}
+
+    def send(name, password):
+        lease = leases[name]
+        responses[name] = soap_controller.make_request('consulta', data=envelope(password), on_failure=lease.report)
+
+    leader = threading.Thread(target=send, args=('lider', 'pass-a'))
+    leader.start()
+    while not requests:
+        time.sleep(0.01)
+    followers = [threading.Thread(target=send, args=args) for args in (('misma', 'pass-a'), ('otra', 'pass-b'))]
+    for thread in followers:
+        thread.start()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert responses['lider'] is None and responses['misma'] is None
+    assert responses['otra'] is not None and responses['otra'].content == b'<ok/>'
+    # La que comparte credencial recibe el fallo sin volver a VUCEM; la otra envía su propia petición
+    assert [b'pass-a' in content for content in requests] == [True, False]
+    assert leases['lider'].benched and leases['misma'].benched and not leases['otra'].benched
+    print("✅ Peticiones coalescidas con la credencial de la líder limitada")
+
+
+if __name__ == "__main__":
+    test_least_loaded_and_capabilities()
+    test_throttled_credential_is_benched()
+    test_soap_429_moves_load_to_other_credential()
+    test_all_credentials_throttled()
+    test_credential_429_leaves_endpoint_limits_alone()
+    test_coalesced_requests_with_throttled_leader()
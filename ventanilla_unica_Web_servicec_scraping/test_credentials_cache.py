@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el cache con TTL de credenciales VUCEM
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.vucem_stub import StubConfig, VUCEMStub
+from controllers.RESTController import APIController
+from controllers.SOAPService import SOAPController
+from main import MainProcess
+from payload_structure.credentials_manager import CredentialsManager
+from utils.rate_limiter import TokenBucket
+from utils.retry_policy import RetryPolicy
+from utils.ttl_cache import TTLCache
+
+
+def credential(usuario, password='secreto', is_active=True):
+    return {
+        'id': f'cred-{usuario}', 'usuario': usuario, 'password': password, 'patente': '1800',
+        'is_importador': True, 'acusecove': True, 'acuseedocument': False, 'is_active': is_active,
+        'created_at': '', 'updated_at': '', 'created_by': '', 'updated_by': '', 'organizacion': 'org'
+    }
+
+
+class FakeAPI:
+    """API de credenciales en memoria que cuenta las consultas"""
+
+    def __init__(self, responses, delay=0):
+        self.responses = responses
+        self.delay = delay
+        self.calls = []
+        self.bulk = 'ok'
+        self.lock = threading.Lock()
+
+    def get_vucem_credentials(self, usuario):
+        with self.lock:
+            self.calls.append(usuario)
+        time.sleep(self.delay)
+        response = self.responses.get(usuario, [])
+        if isinstance(response, Exception):
+            return None
+        return response
+
+    def get_vucem_credentials_bulk(self, usuarios):
+        with self.lock:
+            self.calls.append(tuple(usuarios))
+        if self.bulk == 'error':
+            return None
+        if self.bulk == 'ignored':
+            # Backend que no conoce usuario__in: devuelve todas las credenciales
+            return [item for response in self.responses.values() if isinstance(response, list) for item in response]
+        return {'next': None, 'results': [item for usuario in usuarios
+                                          for item in self.responses.get(usuario, [])
+                                          if isinstance(self.responses.get(usuario), list)]}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_single_flight_and_negative_cache():
+    """20 hilos por importador hacen una consulta; los importadores sin credenciales no se reconsultan"""
+    api = FakeAPI({'imp1': [credential('imp1')], 'inactivo': [credential('inactivo', is_active=False)]}, delay=0.05)
+    manager = CredentialsManager(api, ttl=60, negative_ttl=60)
+
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        found = list(executor.map(manager.get_soap_credentials, ['imp1'] * 20))
+    assert all(creds.username == 'imp1' for creds in found)
+    assert api.calls.count('imp1') == 1
+
+    for _ in range(5):
+        assert manager.get_credentials_by_user('sin_credenciales') is None
+        assert not manager.get_credentials_by_user('inactivo').is_active
+    assert api.calls.count('sin_credenciales') == 1 and api.calls.count('inactivo') == 1
+
+    # Un error de la API no se guarda: la siguiente consulta vuelve a intentar
+    api.responses['caido'] = ConnectionError()
+    assert manager.get_credentials_by_user('caido') is None
+    assert manager.get_credentials_by_user('caido') is None
+    assert api.calls.count('caido') == 2
+
+    assert [cred.usuario for cred in manager.get_credentials_by_type('cove')] == ['imp1']
+    stats = manager.metrics()
+    assert stats['loads'] == 3 and stats['errors'] == 2 and stats['negative_hits'] == 8
+    assert stats['coalesced'] == 19
+    manager.close()
+    print("✅ Single-flight, cache negativo y errores sin cachear")
+
+
+def test_ttl_and_refresh_ahead():
+    """Pasado refresh_ahead se sirve el valor vigente y se recarga en segundo plano; al vencer se recarga"""
+    clock = FakeClock()
+    passwords = iter(['v1', 'v2', 'v3'])
+    refreshed = threading.Event()
+
+    def loader(key):
+        value = next(passwords)
+        if value == 'v2':
+            refreshed.set()
+        return value
+
+    cache = TTLCache(loader, ttl=10, negative_ttl=2, refresh_ahead=0.8, clock=clock)
+    assert cache.get('imp') == 'v1'
+    clock.now = 5
+    assert cache.get('imp') == 'v1'
+
+    # Contraseña rotada: después del 80% del TTL se refresca sin bloquear la lectura
+    clock.now = 8.5
+    assert cache.get('imp') == 'v1'
+    assert refreshed.wait(2)
+    deadline = time.time() + 2
+    while cache.stats()['refreshes'] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get('imp') == 'v2'
+
+    # Sin lecturas hasta después de vencer: la carga es síncrona
+    clock.now = 30
+    assert cache.get('imp') == 'v3'
+
+    negative = TTLCache(lambda key: None, ttl=10, negative_ttl=2, clock=clock)
+    negative.get('x')
+    clock.now += 1
+    negative.get('x')
+    clock.now += 2
+    negative.get('x')
+    assert negative.stats()['loads'] == 2 and negative.stats()['negative_hits'] == 1
+
+    stats = cache.stats()
+    assert stats['misses'] == 2 and stats['refreshes'] == 1 and stats['hits'] == 3
+    cache.close()
+    print("✅ TTL, refresh-ahead y TTL negativo")
+
+
+def test_refresh_error_keeps_value():
+    """Si el refresco en segundo plano falla se sigue sirviendo el valor hasta que vence"""
+    clock = FakeClock()
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        if len(calls) > 1:
+            raise ConnectionError("API caída")
+        return 'v1'
+
+    cache = TTLCache(loader, ttl=10, refresh_ahead=0.5, clock=clock)
+    cache.get('imp')
+    clock.now = 6
+    assert cache.get('imp') == 'v1'
+    deadline = time.time() + 2
+    while cache.stats()['refresh_errors'] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.stats()['refresh_errors'] == 1
+    assert cache.get('imp') == 'v1'
+    cache.close()
+    print("✅ Un refresco fallido no borra el valor vigente")
+
+
+def test_bulk_prefetch_and_fallback():
+    """Una página se resuelve con una consulta masiva; lo que falta o falla se consulta uno por uno"""
+    api = FakeAPI({'imp1': [credential('imp1')], 'imp2': [credential('imp2')], 'imp3': [credential('imp3')]})
+    manager = CredentialsManager(api, ttl=60, negative_ttl=60)
+    services = [{'pedimento': {'contribuyente': importador}} for importador in ['imp1', 'imp2', 'imp1', 'nuevo', 'imp3']]
+
+    found = manager.prefetch_for_services(services)
+    assert api.calls == [('imp1', 'imp2', 'nuevo', 'imp3'), 'nuevo']
+    assert found['imp2'].usuario == 'imp2' and found['nuevo'] is None
+    # Todo quedó en cache: los hilos de trabajo no consultan la API
+    manager.prefetch_for_services(services)
+    assert manager.get_soap_credentials('imp3').username == 'imp3'
+    assert len(api.calls) == 2
+    assert manager.metrics()['prefetch'] == {'bulk_requests': 1, 'bulk_credentials': 3, 'individual_loads': 1}
+
+    # La consulta masiva falla: consultas individuales
+    api = FakeAPI({'imp1': [credential('imp1')], 'imp2': [credential('imp2')]})
+    api.bulk = 'error'
+    manager = CredentialsManager(api, ttl=60)
+    assert manager.prefetch(['imp1', 'imp2'])['imp1'].usuario == 'imp1'
+    assert sorted(api.calls[1:]) == ['imp1', 'imp2']
+
+    # El backend ignora usuario__in: no se usa su respuesta y no se vuelve a intentar
+    api = FakeAPI({'imp1': [credential('imp1')], 'imp2': [credential('imp2')], 'otro': [credential('otro')]})
+    api.bulk = 'ignored'
+    manager = CredentialsManager(api, ttl=60)
+    assert manager.prefetch(['imp1', 'imp2'])['imp2'].usuario == 'imp2'
+    manager.clear_cache()
+    manager.prefetch(['imp1', 'imp2'])
+    assert sum(isinstance(call, tuple) for call in api.calls) == 1 and len(api.calls) == 5
+    print("✅ Precarga masiva por página con respaldo individual")
+
+
+def test_page_prefetch_against_stub():
+    """Contra el stub las credenciales se piden en la precarga de cada página, no una vez por servicio"""
+    with VUCEMStub(StubConfig(services=30, importers=4)) as stub:
+        api_controller = APIController(rate_limiter=TokenBucket(0))
+        api_controller.base_url = f"{stub.url}/api/v1"
+        soap_controller = SOAPController(
+            base_url=stub.url,
+            retry_policy=RetryPolicy(max_attempts=1, base_delay=0, max_delay=0),
+            rate_limiter=TokenBucket(0)
+        )
+        process = MainProcess(api_controller=api_controller, soap_controller=soap_controller)
+        results = process.process_pedimento_services(service_type=3, max_workers=3)
+        assert results['total_successful'] == 30
+        # Cada importador se pide una sola vez, en la precarga de la primera página en que aparece
+        prefetch = process.credentials_manager.metrics()['prefetch']
+        requests = stub.stats()['backend']['credential_requests']
+        assert requests == prefetch['bulk_requests'] + prefetch['individual_loads'] < 4
+        assert prefetch['bulk_credentials'] + prefetch['individual_loads'] == 4
+        process.shutdown()
+    print(f"✅ {requests} consultas de credenciales para 30 servicios")
+
+
+if __name__ == "__main__":
+    test_single_flight_and_negative_cache()
+    test_ttl_and_refresh_ahead()
+    test_refresh_error_keeps_value()
+    test_bulk_prefetch_and_fallback()
+    test_page_prefetch_against_stub()
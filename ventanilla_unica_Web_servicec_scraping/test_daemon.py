@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el modo continuo (daemon) de MainProcess
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import signal
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.vucem_stub import StubConfig, VUCEMStub
+from config.settings import SETTINGS
+from controllers.RESTController import APIController
+from controllers.SOAPService import SOAPController
+from main import MainProcess
+from utils.rate_limiter import TokenBucket
+from utils.retry_policy import RetryPolicy
+from utils.service_feed import ServiceFeed
+
+
+def build_process(stub):
+    """MainProcess con SOAP y API apuntando al stub, sin rate limit"""
+    api_controller = APIController(rate_limiter=TokenBucket(0))
+    api_controller.base_url = f"{stub.url}/api/v1"
+    soap_controller = SOAPController(
+        base_url=stub.url,
+        retry_policy=RetryPolicy(max_attempts=1, base_delay=0, max_delay=0),
+        rate_limiter=TokenBucket(0)
+    )
+    return MainProcess(api_controller=api_controller, soap_controller=soap_controller)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_json(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def wait_until(condition, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class IdleSettings:
+    """Esperas cortas del modo continuo durante la prueba"""
+
+    def __enter__(self):
+        self.original = (SETTINGS.DAEMON_IDLE_MIN_SECONDS, SETTINGS.DAEMON_IDLE_MAX_SECONDS)
+        SETTINGS.DAEMON_IDLE_MIN_SECONDS, SETTINGS.DAEMON_IDLE_MAX_SECONDS = 0.05, 0.2
+
+    def __exit__(self, *exc):
+        SETTINGS.DAEMON_IDLE_MIN_SECONDS, SETTINGS.DAEMON_IDLE_MAX_SECONDS = self.original
+
+
+def test_daemon_picks_up_new_services():
+    """El daemon procesa el backlog, luego los servicios que llegan, y expone /health y /metrics"""
+    with IdleSettings(), VUCEMStub(StubConfig(services=12, importers=3)) as stub:
+        process = build_process(stub)
+        port = free_port()
+        stop_event = threading.Event()
+        outcome = {}
+        daemon = threading.Thread(target=lambda: outcome.update(process.run_daemon(
+            service_type=3, max_workers=3, health_port=port, stop_event=stop_event)))
+        daemon.start()
+        try:
+            def finished(count):
+                return stub.stats()['backend']['services'].get('servicio8_estado3') == count
+            assert wait_until(lambda: finished(24))
+
+            # Llegan servicios nuevos mientras el daemon espera
+            for _ in range(2):
+                stub.backend.create_service({'estado': 1, 'servicio': 3, 'tipo_procesamiento': 2, 'pedimento': 'ped-1'})
+            assert wait_until(lambda: finished(28))
+
+            status, health = get_json(f"http://127.0.0.1:{port}/health")
+            assert status == 200 and health['status'] == 'ok'
+            status, metrics = get_json(f"http://127.0.0.1:{port}/metrics")
+            assert metrics['services']['successful'] == 14
+            assert metrics['feed']['idle_polls'] >= 1
+            assert 'rate_limit' in metrics['api']
+        finally:
+            stop_event.set()
+            daemon.join(timeout=15)
+        assert not daemon.is_alive()
+        assert outcome['total_successful'] == 14
+        process.shutdown()
+    print("✅ Modo continuo toma servicios nuevos y expone health/metrics")
+
+
+def test_drain_finishes_in_flight_work():
+    """Al cerrar el feed el servicio en curso termina y los encolados se descartan"""
+    listing = [{'id': service_id} for service_id in range(1, 21)]
+    feed = ServiceFeed(lambda page: {'next': None, 'results': listing}, maxsize=5, continuous=True).start()
+    started, finished = [], []
+
+    def consume():
+        for item in feed:
+            started.append(item.service['id'])
+            time.sleep(0.2)
+            finished.append(item.service['id'])
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    assert wait_until(lambda: len(started) == 2)
+    feed.close()
+    consumer.join(timeout=5)
+    assert not consumer.is_alive()
+    assert finished == started and len(started) <= 3
+    print("✅ Drenado ordenado del trabajo en curso")
+
+
+def test_idle_backoff_and_pending_retry():
+    """Sin trabajo nuevo las consultas se espacian; un pendiente se reintenta tras seen_ttl"""
+    def run_feed(seen_ttl):
+        polls, seen = [], []
+
+        def fetch_page(page):
+            polls.append(page)
+            return {'next': None, 'results': [{'id': 1}]}
+
+        feed = ServiceFeed(fetch_page, continuous=True, idle_min_seconds=0.01,
+                           idle_max_seconds=0.08, seen_ttl=seen_ttl).start()
+        consumer = threading.Thread(target=lambda: [seen.append(item) for item in feed])
+        consumer.start()
+        time.sleep(0.6)
+        feed.close()
+        consumer.join(timeout=5)
+        return len(polls), len(seen)
+
+    # 0.01 + 0.02 + 0.04 + 0.08 + 0.08... en 0.6s: unas 10 consultas, no 60
+    polls, seen = run_feed(seen_ttl=60)
+    assert 4 <= polls <= 14 and seen == 1, (polls, seen)
+    _, seen = run_feed(seen_ttl=0.2)
+    assert 2 <= seen <= 4, seen
+    print(f"✅ Backoff sin trabajo ({polls} consultas) y reintento de pendientes")
+
+
+def test_sigterm_stops_daemon():
+    """SIGTERM en el hilo principal detiene el daemon y restaura el handler anterior"""
+    previous = signal.getsignal(signal.SIGTERM)
+    with IdleSettings(), VUCEMStub(StubConfig(services=3, importers=1)) as stub:
+        process = build_process(stub)
+        timer = threading.Timer(1.0, os.kill, (os.getpid(), signal.SIGTERM))
+        timer.start()
+        results = process.run_daemon(service_type=3, max_workers=2, health_port=0)
+        timer.join()
+        assert results['total_successful'] == 3
+        process.shutdown()
+    assert signal.getsignal(signal.SIGTERM) is previous
+    print("✅ SIGTERM detiene el modo continuo")
+
+
+if __name__ == "__main__":
+    test_daemon_picks_up_new_services()
+    test_drain_finishes_in_flight_work()
+    test_idle_backoff_and_pending_retry()
+    test_sigterm_stops_daemon()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el reparto justo de servicios por importador
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import queue
+import threading
+import time
+
+from main import MainProcess
+from payload_structure.credentials_manager import CredentialsManager
+from utils.fair_queue import FairQueue, parse_weights
+from utils.retry_policy import THROTTLED
+from utils.service_feed import FeedItem, ServiceFeed
+
+
+def item(importador, service_id=None, servicio=3):
+    return FeedItem({'id': service_id, 'servicio': servicio, 'pedimento': {'contribuyente': importador}})
+
+
+def drain(fair_queue, count):
+    items = []
+    for _ in range(count):
+        next_item = fair_queue.get(timeout=1)
+        fair_queue.task_done(next_item)
+        items.append(next_item.service['pedimento']['contribuyente'])
+    return items
+
+
+def test_weighted_round_robin():
+    """Con pesos iguales los importadores se turnan; con peso 3 uno recibe tres turnos por cada uno"""
+    fair_queue = FairQueue()
+    for _ in range(6):
+        fair_queue.put(item('GRANDE'))
+    fair_queue.put(item('CHICO'))
+    fair_queue.put(item('CHICO'))
+    # El chico no espera detrás de los seis del grande
+    assert drain(fair_queue, 4) == ['GRANDE', 'CHICO', 'GRANDE', 'CHICO']
+
+    weighted = FairQueue(weights=parse_weights("A=3"))
+    for _ in range(6):
+        weighted.put(item('A'))
+        weighted.put(item('B'))
+    assert drain(weighted, 8) == ['A', 'A', 'A', 'B'] * 2
+
+    stats = weighted.stats()
+    assert stats['A']['dispatched'] == 6 and stats['B']['queued'] == 4 and stats['A']['weight'] == 3
+    try:
+        parse_weights("A=3,B")
+        assert False, "Se esperaba ValueError"
+    except ValueError:
+        pass
+    print("✅ Turnos por importador con pesos")
+
+
+def test_in_flight_cap_and_queue_limits():
+    """El tope en vuelo deja pasar a otros importadores; el tope de encolados rechaza sin esperar"""
+    fair_queue = FairQueue(maxsize=3, caps={'GRANDE': 1}, max_per_key=2)
+    assert fair_queue.put(item('GRANDE')) and fair_queue.put(item('GRANDE'))
+    assert not fair_queue.put(item('GRANDE'))
+    assert fair_queue.put(item('CHICO'))
+    try:
+        fair_queue.put(item('OTRO'), timeout=0.05)
+        assert False, "Se esperaba queue.Full"
+    except queue.Full:
+        pass
+
+    primero = fair_queue.get(timeout=1)
+    assert primero.service['pedimento']['contribuyente'] == 'GRANDE'
+    # GRANDE tiene uno en vuelo: el siguiente es de CHICO aunque GRANDE tenga encolados
+    assert fair_queue.get(timeout=1).service['pedimento']['contribuyente'] == 'CHICO'
+    try:
+        fair_queue.get(timeout=0.05)
+        assert False, "Se esperaba queue.Empty"
+    except queue.Empty:
+        pass
+    fair_queue.task_done(primero)
+    assert fair_queue.get(timeout=1).service['pedimento']['contribuyente'] == 'GRANDE'
+    assert fair_queue.stats()['GRANDE']['deferred'] == 1
+
+    fair_queue.finish()
+    assert fair_queue.get(timeout=1) is None
+    print("✅ Tope en vuelo y de encolados por importador")
+
+
+def test_feed_reaches_small_importer_behind_backlog():
+    """Con la subcola del importador grande llena el productor sigue leyendo y encuentra al chico"""
+    services = [{'id': index, 'pedimento': {'contribuyente': 'GRANDE'}} for index in range(1, 41)]
+    services.append({'id': 41, 'pedimento': {'contribuyente': 'CHICO'}})
+    pending = list(services)
+
+    def fetch_page(page):
+        results = pending[(page - 1) * 10:page * 10]
+        if page > 1 and not results:
+            return None
+        return {'next': page + 1 if page * 10 < len(pending) else None, 'results': results}
+
+    feed = ServiceFeed(fetch_page, scheduler=FairQueue(maxsize=50, max_per_key=3)).start()
+    order = []
+    for next_item in feed:
+        order.append(next_item.service['id'])
+        pending.remove(next_item.service)
+    feed.close()
+
+    assert sorted(order) == list(range(1, 42))
+    # El servicio del importador chico, último en el listado, sale entre los primeros
+    assert order.index(41) <= 3
+    assert feed.stats.deferred > 0
+    print(f"✅ Importador chico atendido en el turno {order.index(41) + 1} de 41")
+
+
+def test_micro_batches():
+    """Un lote junta los encolados del mismo importador y tipo, respeta el tope y espera a lo sumo max_delay"""
+    fair_queue = FairQueue(caps={'TOPE': 2})
+    for service_id, (importador, servicio) in enumerate([('A', 3), ('B', 3), ('A', 8), ('A', 3), ('A', 3),
+                                                         ('TOPE', 3), ('TOPE', 3), ('TOPE', 3)]):
+        fair_queue.put(item(importador, service_id, servicio))
+
+    assert [next_item.service['id'] for next_item in fair_queue.get_batch(5)] == [0, 3, 4]
+    assert [next_item.service['id'] for next_item in fair_queue.get_batch(5)] == [1]
+    assert [next_item.service['id'] for next_item in fair_queue.get_batch(5)] == [5, 6]
+    assert [next_item.service['id'] for next_item in fair_queue.get_batch(5)] == [2]
+
+    # Un servicio suelto sale sin esperar max_delay
+    lone = FairQueue()
+    lone.put(item('SOLO', 1))
+    lone.put(item('OTRO', 2))
+    started = time.monotonic()
+    assert [next_item.service['id'] for next_item in lone.get_batch(4, max_delay=1)] == [1]
+    assert time.monotonic() - started < 0.1
+
+    # Servicios del mismo importador que siguen llegando dentro de max_delay entran
+    # en el lote, que sale en cuanto se llena
+    late = FairQueue()
+    late.put(item('A', 1))
+    late.put(item('A', 2))
+    threading.Timer(0.05, lambda: late.put(item('A', 3))).start()
+    threading.Timer(0.1, lambda: late.put(item('A', 4))).start()
+    started = time.monotonic()
+    assert [next_item.service['id'] for next_item in late.get_batch(4, max_delay=1)] == [1, 2, 3, 4]
+    assert time.monotonic() - started < 0.5
+    late.put(item('A', 5))
+    late.finish()
+    assert len(late.get_batch(3, max_delay=1)) == 1
+    assert late.get_batch(3, max_delay=1) == []
+
+    stats = fair_queue.batch_stats()
+    assert stats['services'] == 7 and stats['batches'] == 4 and abs(stats['grouping_ratio'] - 3 / 7) < 1e-9
+    assert fair_queue.stats()['A']['batches'] == 2
+    print("✅ Micro-lotes por importador y tipo de servicio")
+
+
+def test_idle_importers_are_forgotten():
+    """Un importador sin encolados ni en vuelo no deja estado; con forget_idle tampoco estadísticas"""
+    for forget_idle in (False, True):
+        fair_queue = FairQueue(forget_idle=forget_idle)
+        for pasada in range(3):
+            for importador in ('A', 'B', f'NUEVO{pasada}'):
+                fair_queue.put(item(importador, servicio=pasada))
+            drain(fair_queue, 3)
+
+        assert not fair_queue._queues and not fair_queue._last_finish and not fair_queue._in_flight
+        assert not fair_queue._last_put and not fair_queue._put_gap
+        assert fair_queue.batch_stats()['services'] == 9
+        if forget_idle:
+            assert fair_queue.stats() == {}
+        else:
+            assert len(fair_queue.stats()) == 5 and fair_queue.stats()['A']['dispatched'] == 3
+
+    # Mientras tiene servicios en vuelo la clave se conserva
+    fair_queue = FairQueue(forget_idle=True)
+    fair_queue.put(item('A'))
+    fair_queue.put(item('A'))
+    first = fair_queue.get(timeout=1)
+    fair_queue.clear()
+    assert fair_queue.stats()['A']['in_flight'] == 1
+    fair_queue.task_done(first)
+    assert fair_queue.stats() == {} and not fair_queue._in_flight
+    print("✅ Importadores sin trabajo no acumulan estado")
+
+
+def test_batch_shares_one_credential():
+    """Los servicios de un lote usan la misma credencial; si VUCEM la pone en pausa se pide otra"""
+    credentials = [{
+        'id': id, 'usuario': 'IMP', 'password': f'pass-{id}', 'patente': '1800', 'is_importador': True,
+        'acusecove': True, 'acuseedocument': False, 'is_active': True, 'created_at': '', 'updated_at': '',
+        'created_by': '', 'updated_by': '', 'organizacion': 'org'
+    } for id in ('a', 'b')]
+
+    class FakeAPI:
+        def get_vucem_credentials(self, usuario):
+            return credentials
+
+    process = MainProcess()
+    process.credentials_manager = CredentialsManager(FakeAPI(), ttl=60)
+    used = []
+
+    def process_service(service, organizacion, envelope, results, thread_id, lease=None):
+        used.append(lease.credentials.id if lease else envelope)
+        if service['id'] == 2:
+            lease.report(THROTTLED)
+
+    process._process_service = process_service
+    batch = [item('IMP', service_id) for service_id in range(1, 5)]
+    batch[2].envelope = b'<envelope/>'
+    process._process_batch(batch, {}, 'test')
+
+    assert used == ['a', 'a', b'<envelope/>', 'b']
+    pool = process.credentials_manager.metrics()['pool']
+    assert pool['a']['leases'] == 1 and pool['b']['leases'] == 1
+    assert all(state['in_flight'] == 0 for state in pool.values())
+    print("✅ Una credencial por micro-lote")
+
+
+if __name__ == "__main__":
+    test_weighted_round_robin()
+    test_in_flight_cap_and_queue_limits()
+    test_feed_reaches_small_importer_behind_backlog()
+    test_micro_batches()
+    test_idle_importers_are_forgotten()
+    test_batch_shares_one_credential()
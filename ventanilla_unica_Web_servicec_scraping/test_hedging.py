@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para las peticiones hedged de SOAPController
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import itertools
+import time
+
+import httpx
+
+from controllers.SOAPService import SOAPController
+from controllers.AsyncSOAPService import AsyncSOAPController
+from utils.hedging import RequestHedger
+from utils.rate_limiter import TokenBucket
+from utils.retry_policy import RetryPolicy
+
+ENDPOINT = 'ventanilla-ws-pedimentos/ConsultarPedimentoCompletoService?wsdl'
+
+
+def build_hedger(max_ratio=0.05):
+    hedger = RequestHedger(endpoints=['ConsultarPedimentoCompletoService'], percentile=95,
+                           min_samples=5, max_ratio=max_ratio, max_workers=4)
+    for _ in range(10):
+        hedger.record_latency(ENDPOINT, 0.01)
+    return hedger
+
+
+def test_hedge_delay_needs_samples():
+    """Sin muestras suficientes no se hace hedging"""
+    hedger = RequestHedger(endpoints=['X'], percentile=95, min_samples=5, max_ratio=0.05)
+    assert hedger.hedge_delay(ENDPOINT) is None
+    for latency in [0.1, 0.2, 0.3, 0.4, 1.0]:
+        hedger.record_latency(ENDPOINT, latency)
+    assert hedger.hedge_delay(ENDPOINT) == 1.0
+    print("✅ Umbral de hedging por percentil")
+
+
+def test_slow_request_is_hedged():
+    """La primera petición se cuelga; el duplicado responde y gana"""
+    counter = itertools.count()
+
+    def handler(request):
+        if next(counter) == 0:
+            time.sleep(0.5)
+            return httpx.Response(200, content=b'<lenta/>')
+        return httpx.Response(200, content=b'<rapida/>')
+
+    hedger = build_hedger()
+    controller = SOAPController(base_url='http://vucem.test', hedger=hedger, rate_limiter=TokenBucket(0),
+                                retry_policy=RetryPolicy(max_attempts=1, base_delay=0, max_delay=0))
+    controller._client = httpx.Client(transport=httpx.MockTransport(handler))
+
+    start = time.perf_counter()
+    response = controller.make_request(ENDPOINT, data='<x/>')
+    assert time.perf_counter() - start < 0.4
+    assert response.content == b'<rapida/>'
+    assert hedger.stats()[ENDPOINT]['hedge_wins'] == 1
+    controller.close()
+    print("✅ Petición lenta resuelta por el duplicado")
+
+
+def test_hedge_rate_is_capped():
+    """Agotado el presupuesto se espera a la petición original sin duplicar"""
+    def handler(request):
+        time.sleep(0.05)
+        return httpx.Response(200, content=b'<ok/>')
+
+    hedger = build_hedger(max_ratio=0)
+    controller = SOAPController(base_url='http://vucem.test', hedger=hedger, rate_limiter=TokenBucket(0))
+    controller._client = httpx.Client(transport=httpx.MockTransport(handler))
+    for _ in range(5):
+        controller.make_request(ENDPOINT, data='<x/>')
+    # Solo la reserva inicial (1) permite un duplicado
+    assert hedger.stats()[ENDPOINT]['hedged'] == 1
+    controller.close()
+    print("✅ Tasa de duplicados acotada")
+
+
+def test_denied_hedge_keeps_rate_limit_tokens():
+    """Un duplicado que el presupuesto no deja salir no gasta fichas del rate limit, y viceversa"""
+    def send():
+        time.sleep(0.05)
+        return 'ok'
+
+    bucket = TokenBucket(10, burst=5, clock=lambda: 0.0)
+    hedger = build_hedger(max_ratio=0)
+    assert hedger.budget.try_spend()  # Se agota la reserva
+    assert hedger.call(ENDPOINT, send, rate_limiter=bucket) == 'ok'
+    assert bucket._tokens == 5 and bucket.stats()['acquired'] == 0
+    assert hedger.stats()[ENDPOINT]['hedged'] == 0
+
+    # Con presupuesto pero sin fichas la ficha del presupuesto se devuelve
+    empty = TokenBucket(10, burst=1, clock=lambda: 0.0)
+    assert empty.try_acquire()
+    hedger = build_hedger(max_ratio=0)
+    assert hedger.call(ENDPOINT, send, rate_limiter=empty) == 'ok'
+    assert hedger.budget.balance == 1 and hedger.stats()[ENDPOINT]['hedged'] == 0
+    hedger.shutdown()
+    print("✅ Duplicado denegado sin gastar fichas")
+
+
+def test_async_slow_request_is_hedged():
+    """Mismo comportamiento en AsyncSOAPController"""
+    counter = itertools.count()
+
+    async def handler(request):
+        if next(counter) == 0:
+            await asyncio.sleep(0.5)
+            return httpx.Response(200, content=b'<lenta/>')
+        return httpx.Response(200, content=b'<rapida/>')
+
+    async def run():
+        hedger = build_hedger()
+        controller = AsyncSOAPController(base_url='http://vucem.test', hedger=hedger, rate_limiter=TokenBucket(0))
+        controller._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        response = await controller.make_request(ENDPOINT, data='<x/>')
+        await controller.aclose()
+        return response, hedger
+
+    response, hedger = asyncio.run(run())
+    assert response.content == b'<rapida/>'
+    assert hedger.stats()[ENDPOINT]['hedge_wins'] == 1
+    print("✅ Hedging asíncrono")
+
+
+if __name__ == "__main__":
+    test_hedge_delay_needs_samples()
+    test_slow_request_is_hedged()
+    test_hedge_rate_is_capped()
+    test_denied_hedge_keeps_rate_limit_tokens()
+    test_async_slow_request_is_hedged()
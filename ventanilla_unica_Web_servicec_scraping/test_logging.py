@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el logging encolado y con secretos tapados
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import io
+import logging
+
+from config.settings import SETTINGS
+from utils.debug_logger import get_logger, redact, setup_logging, shutdown_logging
+
+
+class Explosive:
+    """Falla si alguien intenta convertirlo a texto"""
+
+    def __str__(self):
+        raise AssertionError("Se formateó un mensaje de un nivel deshabilitado")
+
+
+def test_redact():
+    """Token de la API y contraseñas de VUCEM no llegan al log"""
+    assert redact("Authorization: Token abc123") == "Authorization: Token ***"
+    assert redact("{'Authorization': 'Token abc123'}") == "{'Authorization': 'Token ***'}"
+    assert redact('<wsse:Password Type="PasswordText">s3creta</wsse:Password>') == \
+        '<wsse:Password Type="PasswordText">***</wsse:Password>'
+    assert redact("{'usuario': 'IMP', 'password': 's3creta'}") == "{'usuario': 'IMP', 'password': '***'}"
+    if SETTINGS.API_TOKEN:
+        assert SETTINGS.API_TOKEN not in redact(f"token={SETTINGS.API_TOKEN}")
+    print("✅ Secretos tapados")
+
+
+def test_queued_and_lazy():
+    """Los registros pasan por la cola; los niveles deshabilitados no se formatean"""
+    stream = io.StringIO()
+    setup_logging(level='INFO', log_file='', stream=stream)
+    try:
+        logger = get_logger('controllers.prueba')
+        logger.debug("Cuerpo: %s", Explosive())
+        logger.info("Petición con %s", "Authorization: Token abc123")
+        logger.warning('Envelope <Password>s3creta</Password>')
+        get_logger('httpx').info("Ruido de librería")
+    finally:
+        shutdown_logging()
+    output = stream.getvalue()
+    assert "Cuerpo" not in output
+    assert "INFO [MainThread] controllers.prueba: Petición con Authorization: Token ***" in output
+    assert "<Password>***</Password>" in output and "s3creta" not in output
+    assert "Ruido de librería" not in output
+    assert not logging.getLogger().handlers or all(
+        not isinstance(handler, logging.handlers.QueueHandler) for handler in logging.getLogger().handlers)
+    print("✅ Logging encolado, diferido y con secretos tapados")
+
+
+if __name__ == "__main__":
+    test_redact()
+    test_queued_and_lazy()
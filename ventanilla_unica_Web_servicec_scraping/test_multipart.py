@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la subida de documentos sin archivo temporal (utils/multipart.py)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import email
+import gzip
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from config.settings import SETTINGS
+from controllers.RESTController import APIController
+from utils.multipart import MultipartBody
+
+XML = b'<S:Envelope>' + b'<ns2:partida/>' * 50000 + b'</S:Envelope>'
+
+
+def parse(content_type, body):
+    """Partes del multipart como {nombre: (filename, contenido)}"""
+    message = email.message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    return {
+        part.get_param('name', header='content-disposition'): (part.get_filename(), part.get_payload(decode=True))
+        for part in message.get_payload()
+    }
+
+
+def test_body_is_valid_multipart():
+    """Content-Length exacto, partes correctas, vistas sin copia y seek(0) para reintentos"""
+    body = MultipartBody({'pedimento': 'ped-1', 'size': len(XML)}, 'archivo', 'p.xml', XML, 'application/xml')
+    chunks = []
+    while True:
+        chunk = body.read(8192)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    raw = b''.join(chunks)
+    assert len(raw) == len(body) == int(body.headers()['Content-Length'])
+    # Los bloques del XML son vistas sobre el buffer de la respuesta
+    assert any(isinstance(chunk, memoryview) and chunk.obj is XML for chunk in chunks)
+    assert parse(body.content_type, raw) == {
+        'pedimento': (None, b'ped-1'), 'size': (None, str(len(XML)).encode()), 'archivo': ('p.xml', XML)
+    }
+    body.seek(0)
+    assert body.tell() == 0 and body.read() == raw
+    print("✅ Cuerpo multipart válido y sin copias")
+
+
+class UploadServer:
+    """Backend de documentos mínimo que guarda la última subida"""
+
+    def __init__(self):
+        received = self.received = {}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received['content_type'] = self.headers['Content-Type']
+                received['body'] = self.rfile.read(int(self.headers['Content-Length']))
+                self.send_response(201)
+                self.send_header('Content-Length', '13')
+                self.end_headers()
+                self.wfile.write(b'{"id": "doc"}')
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_post_document_without_temp_file():
+    """post_document sube el XML con requests sin tocar el disco"""
+    server = UploadServer()
+    original = tempfile.NamedTemporaryFile
+    tempfile.NamedTemporaryFile = None  # Cualquier uso de archivo temporal falla
+    try:
+        api_controller = APIController()
+        api_controller.base_url = server.url
+        result = api_controller.post_document(httpx.Response(200, content=XML), 'org', 'ped-1', 'pedimento.xml')
+    finally:
+        tempfile.NamedTemporaryFile = original
+        server.close()
+
+    assert result == {'id': 'doc'}
+    parts = parse(server.received['content_type'], server.received['body'])
+    assert parts['archivo'] == ('pedimento.xml', XML)
+    assert parts['size'] == (None, str(len(XML)).encode())
+    assert parts['extension'] == (None, b'xml')
+    print("✅ Documento subido sin archivo temporal")
+
+
+def test_post_document_gzip():
+    """Con API_UPLOAD_GZIP el archivo, la extensión y el Content-Type declaran gzip"""
+    server = UploadServer()
+    original = SETTINGS.API_UPLOAD_GZIP
+    SETTINGS.API_UPLOAD_GZIP = True
+    try:
+        api_controller = APIController()
+        api_controller.base_url = server.url
+        assert api_controller.post_document(httpx.Response(200, content=XML), 'org', 'ped-1', 'pedimento.xml')
+    finally:
+        SETTINGS.API_UPLOAD_GZIP = original
+        server.close()
+
+    parts = parse(server.received['content_type'], server.received['body'])
+    file_name, content = parts['archivo']
+    assert file_name == 'pedimento.xml.gz' and gzip.decompress(content) == XML
+    assert parts['extension'] == (None, b'gz')
+    assert parts['size'] == (None, str(len(content)).encode())
+    assert b'Content-Type: application/gzip' in server.received['body']
+    print(f"✅ XML subido comprimido ({len(content)} de {len(XML)} bytes)")
+
+
+if __name__ == "__main__":
+    test_body_is_valid_multipart()
+    test_post_document_without_temp_file()
+    test_post_document_gzip()
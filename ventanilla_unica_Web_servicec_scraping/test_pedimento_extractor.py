@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la extracción de campos del pedimento completo
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import xml.etree.ElementTree as ET
+
+import httpx
+
+from benchmarks.vucem_stub import load_pedimento_completo
+from config.settings import SETTINGS
+from controllers.SOAPService import SOAPController
+from main import MainProcess
+from utils.pedimento_extractor import PEDIMENTO_COMPLETO_NS, FieldExtractor, parse_fields
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      'benchmarks', 'samples', 'consultar_pedimento_completo_respuesta.xml')
+
+
+def test_matches_document_scraper():
+    """Los campos por defecto coinciden con los find() del scraper de documentos"""
+    with open(SAMPLE, 'rb') as file:
+        content = file.read()
+    root = ET.fromstring(content)
+    namespaces = {'ns2': PEDIMENTO_COMPLETO_NS}
+    expected = {
+        'numero_operacion': root.find('.//ns2:numeroOperacion', namespaces).text,
+        'pedimento': root.find('.//ns2:pedimento/ns2:pedimento', namespaces).text,
+        'curp_apoderado': root.find('.//ns2:curpApoderadomandatario', namespaces).text,
+        'agente_aduanal': root.find('.//ns2:rfcAgenteAduanalSocFactura', namespaces).text,
+    }
+    extractor = FieldExtractor(parse_fields(SETTINGS.PEDIMENTO_COMPLETO_FIELDS))
+    assert extractor.extract(content) == expected
+    assert extractor.extract(load_pedimento_completo(2048))['curp_apoderado'] == expected['curp_apoderado']
+    print("✅ Mismos campos que extract_xml_data")
+
+
+def test_missing_fields_and_bad_spec():
+    """Campos ausentes quedan en None; XML truncado devuelve lo leído; spec inválida es error"""
+    extractor = FieldExtractor({'operacion': 'numeroOperacion', 'clave': 'encabezado/claveDocumento/clave',
+                                'falta': 'noExiste'})
+    with open(SAMPLE, 'rb') as file:
+        content = file.read()
+    assert extractor.extract(content) == {'operacion': '21196267099', 'clave': 'V1', 'falta': None}
+    assert extractor.extract(content[:1600])['operacion'] == '21196267099'
+    try:
+        parse_fields('numero_operacion')
+        assert False, "Se esperaba ValueError"
+    except ValueError:
+        pass
+    print("✅ Campos ausentes, XML truncado y spec inválida")
+
+
+def test_fields_attached_to_response():
+    """get_pedimento_completo deja los campos en la respuesta y _campos_pedimento arma el PUT"""
+    with open(SAMPLE, 'rb') as file:
+        content = file.read()
+    soap_controller = SOAPController(base_url='http://vucem.test')
+    soap_controller._client = httpx.Client(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, content=content)))
+    process = MainProcess(soap_controller=soap_controller)
+    response = process.get_pedimento_completo('IMP', '07', '1800', '1005032', envelope=b'<x/>')
+    assert response.extensions['campos_pedimento']['numero_operacion'] == '21196267099'
+    assert process._campos_pedimento(response, '1005032')['agente_aduanal'] == 'WAA021220796'
+    assert process._campos_pedimento(httpx.Response(200), '1005032') is None
+    print("✅ Campos adjuntos a la respuesta de pedimento completo")
+
+
+if __name__ == "__main__":
+    test_matches_document_scraper()
+    test_missing_fields_and_bad_spec()
+    test_fields_attached_to_response()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el rate limiter global (token bucket)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from controllers.AsyncRESTController import AsyncAPIController
+from controllers.AsyncSOAPService import AsyncSOAPController
+from controllers.RESTController import APIController
+from controllers.SOAPService import SOAPController
+from utils.hedging import RequestHedger
+from utils.rate_limiter import API, VUCEM, TokenBucket, get_rate_limiter
+
+
+def timed_threads(bucket, workers, requests):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda _: bucket.acquire(), range(requests)))
+    return time.perf_counter() - started
+
+
+def test_rate_independent_of_workers():
+    """40 peticiones a 50 req/s tardan ~0.8s con 2 o con 8 hilos"""
+    for workers in (2, 8):
+        bucket = TokenBucket(rate=50, burst=1)
+        elapsed = timed_threads(bucket, workers, 40)
+        assert 0.7 <= elapsed < 1.2, (workers, elapsed)
+        stats = bucket.stats()
+        assert stats['acquired'] == 40 and stats['delayed'] == 39
+    print("✅ La tasa total no depende del número de hilos")
+
+
+def test_burst_async_and_try_acquire():
+    """La ráfaga sale sin esperar; acquire_async espera en el event loop; rate <= 0 no limita"""
+    bucket = TokenBucket(rate=100, burst=5)
+    assert all(bucket.try_acquire() for _ in range(5))
+    assert not bucket.try_acquire()
+
+    async def run():
+        started = time.perf_counter()
+        await asyncio.gather(*(bucket.acquire_async() for _ in range(20)))
+        return time.perf_counter() - started
+    elapsed = asyncio.run(run())
+    assert 0.15 <= elapsed < 0.5, elapsed
+
+    unlimited = TokenBucket(rate=0)
+    assert unlimited.unlimited and unlimited.acquire() == 0 and unlimited.try_acquire()
+    print("✅ Ráfaga, acquire_async y límite desactivado")
+
+
+def test_shared_buckets():
+    """Todos los controladores de un mismo destino comparten el bucket del proceso"""
+    assert APIController().rate_limiter is AsyncAPIController().rate_limiter is get_rate_limiter(API)
+    soap_controller = SOAPController(base_url='http://vucem.test')
+    assert soap_controller.rate_limiter is AsyncSOAPController().rate_limiter is get_rate_limiter(VUCEM)
+    assert get_rate_limiter(API) is not get_rate_limiter(VUCEM)
+    assert 'rate_limit' in soap_controller.metrics()
+    try:
+        get_rate_limiter('otro')
+        assert False, "Se esperaba ValueError"
+    except ValueError:
+        pass
+
+    # Un duplicado (hedging) solo sale si hay ficha libre en ese momento
+    hedger = RequestHedger(endpoints=['Servicio'], max_ratio=1)
+    bucket = TokenBucket(rate=1, burst=1)
+    assert hedger._admit(bucket)
+    assert not hedger._admit(bucket)
+    print("✅ Buckets compartidos por destino")
+
+
+if __name__ == "__main__":
+    test_rate_independent_of_workers()
+    test_burst_async_and_try_acquire()
+    test_shared_buckets()
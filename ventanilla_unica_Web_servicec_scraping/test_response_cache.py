@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el cache en disco de respuestas SOAP
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+import time
+
+import httpx
+
+from controllers.SOAPService import SOAPController
+from main import MainProcess
+from payload_structure.credential_pool import CredentialPool
+from payload_structure.soap_models import CredencialesVUCEM
+from utils.response_cache import SOAPResponseCache
+
+BODY = b'<S:Envelope><ns3:tieneError>false</ns3:tieneError>' + b'<partida/>' * 500 + b'</S:Envelope>'
+
+
+def test_put_get_roundtrip():
+    """Lo guardado se recupera igual y se comprime en disco"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = SOAPResponseCache(cache_dir=cache_dir, ttl_seconds=60, max_bytes=10 ** 6)
+        key = SOAPResponseCache.make_key('pedimento_completo', '07', '1800', '1005033')
+        assert cache.get(key) is None
+        cache.put(key, BODY)
+        assert cache.get(key) == BODY
+        stats = cache.stats()
+        assert stats['hits'] == 1 and stats['misses'] == 1
+        assert stats['bytes'] < len(BODY)
+        # Un cache nuevo sobre el mismo directorio ve la entrada
+        assert SOAPResponseCache(cache_dir=cache_dir, ttl_seconds=60, max_bytes=10 ** 6).get(key) == BODY
+    print("✅ Guardado y lectura del cache")
+
+
+def test_entries_expire():
+    """Pasado el TTL la entrada deja de devolverse"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = SOAPResponseCache(cache_dir=cache_dir, ttl_seconds=0.05, max_bytes=10 ** 6)
+        key = SOAPResponseCache.make_key('remesas', '07', '1800', '1')
+        cache.put(key, BODY)
+        time.sleep(0.1)
+        assert cache.get(key) is None
+        assert cache.stats()['expired'] == 1
+    print("✅ Expiración por TTL")
+
+
+def test_lru_eviction():
+    """Al superar max_bytes se desaloja la entrada usada hace más tiempo"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        bodies = [os.urandom(1000) for _ in range(3)]  # Aleatorio: gzip no lo reduce
+        cache = SOAPResponseCache(cache_dir=cache_dir, ttl_seconds=60, max_bytes=2500)
+        keys = [SOAPResponseCache.make_key('partida', '07', '1800', '1', partida) for partida in range(3)]
+        cache.put(keys[0], bodies[0])
+        cache.put(keys[1], bodies[1])
+        cache.get(keys[0])  # keys[1] queda como la menos usada
+        cache.put(keys[2], bodies[2])
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) == bodies[0]
+        assert cache.get(keys[2]) == bodies[2]
+        assert cache.stats()['evictions'] == 1
+    print("✅ Desalojo LRU por tamaño")
+
+
+def test_failed_write_leaves_no_temp_file():
+    """Una escritura fallida borra su temporal y los temporales viejos se limpian al arrancar"""
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = SOAPResponseCache(cache_dir=cache_dir, ttl_seconds=60, max_bytes=10 ** 6)
+        key = SOAPResponseCache.make_key('pedimento_completo', '07', '1800', '1')
+        original = os.replace
+
+        def disk_full(*args):
+            raise OSError(28, "No space left on device")
+
+        os.replace = disk_full
+        try:
+            cache.put(key, BODY)
+            assert False, "Se esperaba OSError"
+        except OSError:
+            pass
+        finally:
+            os.replace = original
+        assert [name for _, _, files in os.walk(cache_dir) for name in files] == []
+        assert cache.get(key) is None and cache.stats()['bytes'] == 0
+
+        # Temporales de un proceso que murió a mitad de put(): el viejo se borra, el reciente no
+        stale = os.path.join(cache_dir, key[:2], 'abc.tmp')
+        recent = os.path.join(cache_dir, key[:2], 'def.tmp')
+        for path in (stale, recent):
+            with open(path, 'wb') as file:
+                file.write(b'x' * 100)
+        os.utime(stale, (time.time() - 7200, time.time() - 7200))
+        SOAPResponseCache(cache_dir=cache_dir, ttl_seconds=60, max_bytes=10 ** 6)
+        assert not os.path.exists(stale) and os.path.exists(recent)
+    print("✅ Sin temporales huérfanos en el cache")
+
+
+def test_pedimento_completo_uses_cache():
+    """La segunda consulta del mismo pedimento no llega a VUCEM"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, content=BODY)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        controller = SOAPController(base_url='http://vucem.test')
+        controller._client = httpx.Client(transport=httpx.MockTransport(handler))
+        main_process = MainProcess(
+            soap_controller=controller,
+            response_cache=SOAPResponseCache(cache_dir=cache_dir, ttl_seconds=60, max_bytes=10 ** 6)
+        )
+        credenciales = CredencialesVUCEM('1', 'user', 'pass', '1800', True, True, True, True, '', '', '', '', 'org')
+        main_process.credentials_manager.lease = lambda importador, capability=None: CredentialPool(0).acquire([credenciales])
+
+        first = main_process.get_pedimento_completo('MFN031210AT9', '07', '1800', '1005033')
+        second = main_process.get_pedimento_completo('MFN031210AT9', '07', '1800', '1005033')
+        assert first.content == second.content == BODY
+        assert len(calls) == 1
+    print("✅ get_pedimento_completo consulta el cache")
+
+
+if __name__ == "__main__":
+    test_put_get_roundtrip()
+    test_entries_expire()
+    test_lru_eviction()
+    test_failed_write_leaves_no_temp_file()
+    test_pedimento_completo_uses_cache()
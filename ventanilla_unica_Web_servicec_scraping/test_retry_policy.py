@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la política de reintentos de SOAPController
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from controllers.SOAPService import SOAPController
+from utils.retry_policy import RetryPolicy, RetryBudget, SERVER_ERROR, CLIENT_ERROR, SOAP_FAULT
+
+ENDPOINT = 'ventanilla-ws-pedimentos/ConsultarPedimentoCompletoService?wsdl'
+
+
+def build_controller(handler, budget=None):
+    """SOAPController con transporte simulado y sin esperas entre intentos"""
+    policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0, budget=budget)
+    controller = SOAPController(base_url='http://vucem.test', retry_policy=policy)
+    controller._client = httpx.Client(transport=httpx.MockTransport(handler))
+    return controller
+
+
+def test_transient_errors_are_retried():
+    """Un 503 se reintenta hasta agotar los intentos"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    controller = build_controller(handler)
+    assert controller.make_request(ENDPOINT, data='<x/>') is None
+    assert len(calls) == 3
+    stats = controller.retry_stats()[ENDPOINT]
+    assert stats['retries'] == 2
+    assert stats['failures'] == {SERVER_ERROR: 3}
+    print("✅ 503 reintentado 3 veces")
+
+
+def test_permanent_errors_are_not_retried():
+    """Un 400 o un SOAP Fault de negocio no se reintentan"""
+    for status, body, failure in [(400, b'', CLIENT_ERROR),
+                                  (500, b'<ns3:tieneError>true</ns3:tieneError>', SOAP_FAULT)]:
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(status, content=body)
+
+        controller = build_controller(handler)
+        assert controller.make_request(ENDPOINT, data='<x/>') is None
+        assert len(calls) == 1
+        assert controller.retry_stats()[ENDPOINT]['failures'] == {failure: 1}
+    print("✅ 400 y SOAP Fault sin reintentos")
+
+
+def test_recovers_after_transient_error():
+    """Si el segundo intento responde bien se devuelve la respuesta"""
+    responses = iter([httpx.Response(502), httpx.Response(200, content=b'<ok/>')])
+    controller = build_controller(lambda request: next(responses))
+    response = controller.make_request(ENDPOINT, data='<x/>')
+    assert response is not None and response.content == b'<ok/>'
+    print("✅ Recuperación tras error transitorio")
+
+
+def test_retry_budget_limits_retries():
+    """Sin saldo en el presupuesto global no se reintenta"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    controller = build_controller(handler, budget=RetryBudget(ratio=0, reserve=1))
+    controller.make_request(ENDPOINT, data='<x/>')
+    controller.make_request(ENDPOINT, data='<x/>')
+    # Primera petición: 1 reintento (consume la reserva). Segunda: ninguno.
+    assert len(calls) == 3
+    assert controller.retry_stats()[ENDPOINT]['budget_exhausted'] == 2
+    print("✅ Presupuesto de reintentos respetado")
+
+
+def test_backoff_is_capped():
+    """El backoff crece exponencialmente pero nunca pasa de max_delay"""
+    policy = RetryPolicy(max_attempts=10, base_delay=0.5, max_delay=2)
+    for attempt in range(1, 10):
+        assert 0 <= policy.backoff(attempt) <= min(2, 0.5 * 2 ** (attempt - 1))
+    print("✅ Backoff acotado")
+
+
+if __name__ == "__main__":
+    test_transient_errors_are_retried()
+    test_permanent_errors_are_not_retried()
+    test_recovers_after_transient_error()
+    test_retry_budget_limits_retries()
+    test_backoff_is_capped()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el feed productor/consumidor de servicios pendientes
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.vucem_stub import StubConfig, VUCEMStub
+from config.settings import SETTINGS
+from controllers.RESTController import APIController
+from controllers.SOAPService import SOAPController
+from main import MainProcess
+from utils.retry_policy import RetryPolicy
+from utils.service_feed import ServiceFeed
+
+
+class ShrinkingListing:
+    """Listado estado=1 paginado por offset que se encoge al procesar servicios"""
+
+    def __init__(self, services, page_size=10):
+        self.pending = list(range(1, services + 1))
+        self.page_size = page_size
+        self.fetched_pages = []
+        self.lock = threading.Lock()
+
+    def fetch_page(self, page):
+        with self.lock:
+            self.fetched_pages.append(page)
+            start = (page - 1) * self.page_size
+            if page > 1 and start >= len(self.pending):
+                return None
+            return {
+                'next': page + 1 if start + self.page_size < len(self.pending) else None,
+                'organizacion': 'org',
+                'results': [{'id': service_id} for service_id in self.pending[start:start + self.page_size]]
+            }
+
+    def finish(self, service_id):
+        with self.lock:
+            self.pending.remove(service_id)
+
+
+def test_drains_shrinking_backlog():
+    """Todos los servicios se procesan una vez aunque las páginas se desplacen; los pendientes no se repiten"""
+    listing = ShrinkingListing(95)
+    processed = []
+    lock = threading.Lock()
+
+    def consume(feed):
+        for item in feed:
+            time.sleep(0.001)
+            with lock:
+                processed.append(item.service['id'])
+            # Uno de cada diez queda pendiente (p. ej. circuito abierto)
+            if item.service['id'] % 10:
+                listing.finish(item.service['id'])
+
+    feed = ServiceFeed(listing.fetch_page, maxsize=5).start()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(consume, [feed] * 4))
+    feed.close()
+
+    assert sorted(processed) == list(range(1, 96))
+    assert feed.stats.services == 95 and feed.stats.sweeps >= 2
+    assert listing.pending == list(range(10, 91, 10))
+    print(f"✅ Backlog completo en {feed.stats.sweeps} pasadas y {feed.stats.pages} páginas")
+
+
+def test_bounded_prefetch_and_close():
+    """El productor no se adelanta más que la cola y close() lo detiene sin consumidores"""
+    listing = ShrinkingListing(100)
+    feed = ServiceFeed(listing.fetch_page, maxsize=5).start()
+    time.sleep(0.2)
+    assert listing.fetched_pages == [1]
+    started = time.time()
+    feed.close()
+    assert time.time() - started < 2
+    # La cola llena más, a lo sumo, el put que estaba esperando al cerrar
+    assert feed.stats.services <= 6
+
+    limited = ServiceFeed(ShrinkingListing(100).fetch_page, prepare_page=lambda services: {
+        service['id']: b'<envelope/>' for service in services}, start_page=2, end_page=3).start()
+    items = list(limited)
+    limited.close()
+    assert [item.service['id'] for item in items] == list(range(11, 31))
+    assert {item.page for item in items} == {2, 3} and items[0].envelope == b'<envelope/>'
+    print("✅ Prefetch acotado, cierre y rango de páginas")
+
+
+def test_process_whole_backlog_against_stub():
+    """process_pedimento_services sin end_page vacía el backlog del backend simulado"""
+    original_delay = SETTINGS.REQUEST_DELAY_SECONDS
+    SETTINGS.REQUEST_DELAY_SECONDS = 0
+    try:
+        with VUCEMStub(StubConfig(services=35, importers=3)) as stub:
+            api_controller = APIController()
+            api_controller.base_url = f"{stub.url}/api/v1"
+            soap_controller = SOAPController(
+                base_url=stub.url,
+                retry_policy=RetryPolicy(max_attempts=1, base_delay=0, max_delay=0)
+            )
+            process = MainProcess(api_controller=api_controller, soap_controller=soap_controller)
+            results = process.process_pedimento_services(service_type=3, max_workers=4)
+            assert results['total_successful'] == 35
+            assert stub.stats()['backend']['services'] == {'servicio8_estado3': 70}
+            assert results['pages_processed'] >= 4
+            process.shutdown()
+    finally:
+        SETTINGS.REQUEST_DELAY_SECONDS = original_delay
+    print("✅ Backlog completo contra el stub")
+
+
+if __name__ == "__main__":
+    test_drains_shrinking_backlog()
+    test_bounded_prefetch_and_close()
+    test_process_whole_backlog_against_stub()
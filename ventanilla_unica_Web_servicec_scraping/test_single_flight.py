@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para la coalescencia de peticiones SOAP idénticas
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import threading
+import time
+
+import httpx
+
+from controllers.SOAPService import SOAPController
+from payload_structure.soap_models import CredencialesSOAP, ConsultaPedimentoCompleto
+from payload_structure.template_manager import SOAPTemplateManager
+from utils.single_flight import SingleFlight, soap_request_key
+
+ENDPOINT = 'ventanilla-ws-pedimentos/ConsultarPedimentoCompletoService?wsdl'
+
+
+def render(username, pedimento='1005033'):
+    return SOAPTemplateManager().generar_consulta_pedimento_completo(
+        credenciales=CredencialesSOAP(username=username, password=f'{username}-pass'),
+        consulta=ConsultaPedimentoCompleto(aduana='07', patente='1800', pedimento=pedimento)
+    )
+
+
+def test_key_ignores_credentials():
+    """La clave depende de la consulta, no de usuario/contraseña"""
+    key_a = soap_request_key(ENDPOINT, render('USUARIO_A'))
+    key_b = soap_request_key(ENDPOINT, render('USUARIO_B'))
+    key_c = soap_request_key(ENDPOINT, render('USUARIO_A', pedimento='9999999'))
+    assert key_a == key_b
+    assert key_a != key_c
+    print("✅ Clave de coalescencia sin credenciales")
+
+
+def test_errors_are_shared():
+    """Una excepción del líder llega también a los que esperaban"""
+    single_flight = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("VUCEM caído")
+
+    def follower():
+        started.wait()
+        try:
+            single_flight.do('k', failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    try:
+        single_flight.do('k', failing)
+    except RuntimeError as e:
+        errors.append(e)
+    thread.join()
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert single_flight.stats() == {'calls': 1, 'coalesced': 1}
+    print("✅ Errores compartidos entre llamadas coalescidas")
+
+
+def test_concurrent_duplicates_share_one_request():
+    """Varios hilos con la misma consulta hacen una sola petición a VUCEM"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        time.sleep(0.2)
+        return httpx.Response(200, content=b'<ok/>')
+
+    controller = SOAPController(base_url='http://vucem.test')
+    controller._client = httpx.Client(transport=httpx.MockTransport(handler))
+    responses = []
+
+    def worker(username):
+        responses.append(controller.make_request(ENDPOINT, data=render(username)))
+
+    threads = [threading.Thread(target=worker, args=(f'USUARIO_{i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(responses) == 4 and all(response is responses[0] for response in responses)
+    assert controller.metrics()['coalescing']['coalesced'] == 3
+
+    # Sin llamada en vuelo, la siguiente petición vuelve a la red
+    controller.make_request(ENDPOINT, data=render('USUARIO_0'))
+    assert len(calls) == 2
+    print("✅ Duplicados concurrentes coalescidos")
+
+
+if __name__ == "__main__":
+    test_key_ignores_credentials()
+    test_errors_are_shared()
+    test_concurrent_duplicates_share_one_request()
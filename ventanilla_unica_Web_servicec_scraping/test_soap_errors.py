@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el detector incremental de errores SOAP
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from benchmarks.vucem_stub import load_pedimento_completo, soap_fault, soap_respuesta
+from utils.retry_policy import CLIENT_ERROR, SERVER_ERROR, SOAP_FAULT, classify_response
+from utils.soap_errors import SOAPError, detect_soap_error
+
+NAMESPACE = 'http://www.ventanillaunica.gob.mx/pedimentos/ws/oxml/consultarpedimentocompleto'
+
+
+def test_detects_error_and_extracts_message():
+    """tieneError=true devuelve el mensaje; false y respuestas grandes sin error devuelven None"""
+    error = detect_soap_error(soap_respuesta('consultarPedimentoCompletoPeticion', NAMESPACE,
+                                             mensaje='No existe el pedimento'))
+    assert error == SOAPError(mensaje='No existe el pedimento')
+    assert detect_soap_error(soap_respuesta('consultarPedimentoCompletoPeticion', NAMESPACE)) is None
+    assert detect_soap_error(load_pedimento_completo(1024)) is None
+    # Con otro prefijo para el namespace y como str
+    assert detect_soap_error('<r xmlns:x="urn:r"><x:tieneError> TRUE </x:tieneError>'
+                             '<x:error><x:codigo>E12</x:codigo><x:mensaje>Sin permiso</x:mensaje></x:error>'
+                             '</r>') == SOAPError(mensaje='Sin permiso', codigo='E12')
+    print("✅ Detección de tieneError con mensaje y código")
+
+
+def test_not_fooled_by_data():
+    """El texto 'tieneError' dentro de los datos no se toma como error"""
+    xml = (b'<r xmlns:ns3="urn:r"><ns3:observaciones>tieneError="true" '
+           b'&lt;ns3:tieneError&gt;true&lt;/ns3:tieneError&gt;</ns3:observaciones>'
+           b'<ns3:tieneError>false</ns3:tieneError></r>')
+    assert detect_soap_error(xml) is None
+    print("✅ El contenido de los datos no genera falsos positivos")
+
+
+def test_stops_reading_after_indicator():
+    """Lo que sigue a tieneError no se lee: basura al final no importa"""
+    xml = soap_respuesta('consultarPedimentoCompletoPeticion', NAMESPACE)
+    assert detect_soap_error(xml.replace(b'</S:Envelope>', b'<<<' * 10000), chunk_size=256) is None
+    print("✅ Lectura detenida al encontrar el indicador")
+
+
+def test_soap_fault_classification():
+    """El faultcode decide si un 500 es reintentable"""
+    assert detect_soap_error(soap_fault('Servicio no disponible')) == SOAPError(
+        mensaje='Servicio no disponible', codigo='S:Server', fault=True)
+    client_fault = soap_fault('Petición inválida').replace(b'S:Server', b'S:Client')
+    negocio = soap_respuesta('consultarPedimentoCompletoPeticion', NAMESPACE, mensaje='No existe')
+    assert classify_response(httpx.Response(500, content=soap_fault('caído'))) == SERVER_ERROR
+    assert classify_response(httpx.Response(500, content=client_fault)) == CLIENT_ERROR
+    assert classify_response(httpx.Response(500, content=negocio)) == SOAP_FAULT
+    assert classify_response(httpx.Response(500, content=b'Internal Server Error')) == SERVER_ERROR
+    print("✅ Clasificación de SOAP Faults por faultcode")
+
+
+if __name__ == "__main__":
+    test_detects_error_and_extracts_message()
+    test_not_fooled_by_data()
+    test_stops_reading_after_indicator()
+    test_soap_fault_classification()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para los templates SOAP precompilados
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import xml.etree.ElementTree as ET
+
+from payload_structure.soap_models import (
+    CredencialesSOAP, ConsultaAcuses, ConsultaEstadoPedimento, ConsultaPartida,
+    ConsultaPedimentoCompleto, ConsultaRemesas
+)
+from payload_structure.template_manager import CompiledTemplate, SOAPTemplateManager
+
+CREDENCIALES = CredencialesSOAP(username='MFN031210AT9', password='p&ss<word>')
+
+
+def test_all_templates_render_to_xml():
+    """Los cinco generar_consulta_* devuelven bytes XML válidos sin marcadores pendientes"""
+    manager = SOAPTemplateManager()
+    envelopes = [
+        manager.generar_consulta_estado_pedimento(CREDENCIALES, ConsultaEstadoPedimento('07', '1800', '1005033', '21196267099')),
+        manager.generar_consulta_pedimento_completo(CREDENCIALES, ConsultaPedimentoCompleto('07', '1800', '1005033')),
+        manager.generar_consulta_partida(CREDENCIALES, ConsultaPartida('07', '1800', '1005033', '21196267099', '16')),
+        manager.generar_consulta_remesas(CREDENCIALES, ConsultaRemesas('07', '1800', '1005033', '21196267099')),
+        manager.generar_consulta_acuses(CREDENCIALES, ConsultaAcuses('COVE2474LMA64')),
+    ]
+    for envelope in envelopes:
+        assert isinstance(envelope, bytes)
+        assert b'{' not in envelope
+        password = ET.fromstring(envelope).find('.//{*}Password')
+        assert password.text.strip() == 'p&ss<word>'
+    print("✅ Los cinco templates generan XML válido")
+
+
+def test_compiled_template_segments():
+    """El template se divide en segmentos estáticos y campos; faltar uno es error"""
+    template = CompiledTemplate('prueba', '<a>{uno}</a><b>{dos}</b>')
+    assert template.slots == ('uno', 'dos')
+    assert template.static == (b'<a>', b'</a><b>', b'</b>')
+    assert template.render(uno='1', dos='ñ&') == '<a>1</a><b>ñ&amp;</b>'.encode('utf-8')
+    try:
+        template.render(uno='1')
+        assert False, "Se esperaba KeyError"
+    except KeyError as e:
+        assert 'dos' in str(e)
+    print("✅ Segmentos y campos del template compilado")
+
+
+def test_render_batch_matches_individual_renders():
+    """render_batch da los mismos envelopes y arma el encabezado una vez por importador"""
+    manager = SOAPTemplateManager()
+    template = manager.templates['consultar_pedimento_completo']
+    importadores = [CredencialesSOAP(f'IMP{n}', f'pass&{n}') for n in range(3)]
+    consultas = [(importadores[n % 3], ConsultaPedimentoCompleto('07', '1800', str(1005000 + n))) for n in range(12)]
+
+    prefixes = []
+    original = template.credential_prefix
+    template.credential_prefix = lambda credenciales: prefixes.append(credenciales) or original(credenciales)
+    try:
+        envelopes = manager.render_batch(3, consultas)
+    finally:
+        del template.credential_prefix
+
+    assert envelopes == [manager.generar_consulta_pedimento_completo(c, q) for c, q in consultas]
+    assert len(prefixes) == 3
+    assert manager.render_batch('consultar_acuses', [(importadores[0], ConsultaAcuses('COVE1'))]) == [
+        manager.generar_consulta_acuses(importadores[0], ConsultaAcuses('COVE1'))
+    ]
+    print("✅ render_batch equivale a renderizar uno por uno")
+
+
+if __name__ == "__main__":
+    test_all_templates_render_to_xml()
+    test_compiled_template_segments()
+    test_render_batch_matches_individual_renders()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para el stub local de VUCEM (benchmarks/vucem_stub.py)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+
+from benchmarks.vucem_stub import StubConfig, VUCEMStub
+from config.settings import SETTINGS
+from controllers.RESTController import APIController
+from controllers.SOAPService import SOAPController
+from main import MainProcess
+from utils.retry_policy import RetryPolicy
+
+
+def build_process(stub):
+    """MainProcess con SOAP y API apuntando al stub"""
+    api_controller = APIController()
+    api_controller.base_url = f"{stub.url}/api/v1"
+    soap_controller = SOAPController(
+        base_url=stub.url,
+        retry_policy=RetryPolicy(max_attempts=1, base_delay=0, max_delay=0)
+    )
+    return MainProcess(api_controller=api_controller, soap_controller=soap_controller)
+
+
+def test_serves_all_services():
+    """Las consultas de MainProcess obtienen respuesta del stub"""
+    with VUCEMStub(StubConfig(services=3)) as stub:
+        process = build_process(stub)
+        importador = stub.backend.importers[0]
+
+        completo = process.get_pedimento_completo(importador, '07', '1800', '1005033')
+        assert b'<ns2:pedimento>1005033</ns2:pedimento>' in completo.content
+        assert process.consultar_partidas(importador, '07', '1800', '1005033', '21196267099', '1')
+        assert process.consultar_estado_pedimento(importador, '21196267099', '07', '1800', '1005033')
+        assert process.get_acuses(importador, 'COVE2474LMA64')
+
+        stats = stub.stats()
+        # consultar_remesas no se incluye: MainProcess aún no recibe numero_operacion para remesas
+        for template in ('consultar_pedimento_completo', 'consultar_partida',
+                         'consultar_estado_pedimento', 'consultar_acuses'):
+            assert stats[f'{template}_ok'] == 1, template
+        assert 'soap_malformed' not in stats
+        process.shutdown()
+    print("✅ El stub atiende los servicios consultados por MainProcess")
+
+
+def test_injects_soap_errors_and_response_size():
+    """tieneError=true se descarta y response_kb infla la respuesta (comprimida en red)"""
+    with VUCEMStub(StubConfig(soap_error_rate=1)) as stub:
+        process = build_process(stub)
+        assert process.get_pedimento_completo(stub.backend.importers[0], '07', '1800', '1') is None
+        process.shutdown()
+
+    with VUCEMStub(StubConfig(response_kb=256)) as stub:
+        process = build_process(stub)
+        response = process.get_pedimento_completo(stub.backend.importers[0], '07', '1800', '1')
+        assert len(response.content) >= 256 * 1024
+        assert response.headers['Content-Encoding'] == 'gzip'
+        process.shutdown()
+    print("✅ Inyección de tieneError y tamaño de respuesta")
+
+
+def test_outcomes_are_repeatable():
+    """Con la misma semilla la n-ésima petición de una consulta tiene el mismo resultado"""
+    def outcomes():
+        with VUCEMStub(StubConfig(error_rate=0.5, seed=7, api=False)) as stub:
+            with httpx.Client() as client:
+                envelope = process_template()
+                return [client.post(f"{stub.url}/ventanilla-ws-pedimentos/ConsultarPedimentoCompletoService",
+                                    content=envelope).status_code for _ in range(20)]
+
+    def process_template():
+        from payload_structure.template_manager import SOAPTemplateManager
+        from payload_structure.soap_models import CredencialesSOAP, ConsultaPedimentoCompleto
+        return SOAPTemplateManager().generar_consulta_pedimento_completo(
+            CredencialesSOAP('user', 'pass'), ConsultaPedimentoCompleto('07', '1800', '1005033'))
+
+    first = outcomes()
+    assert first == outcomes()
+    assert 200 in first and 500 in first
+    print("✅ Resultados repetibles con la misma semilla")
+
+
+def test_full_page_against_stub():
+    """Una página completa: pedimento completo, documento, campos del pedimento y estados en el backend simulado"""
+    original_delay = SETTINGS.REQUEST_DELAY_SECONDS
+    SETTINGS.REQUEST_DELAY_SECONDS = 0
+    try:
+        with VUCEMStub(StubConfig(services=10, importers=3)) as stub:
+            process = build_process(stub)
+            results = process.process_pedimento_services_single_page(page=1, service_type=3)
+            assert results['successful'] == 10
+            backend = stub.stats()['backend']
+            assert backend['documents'] == 10
+            # El PUT de éxito también cambia servicio a 8 (ver process_pedimento_services_single_page);
+            # con los campos del pedimento ya escritos el servicio 8 nuevo nace terminado
+            assert backend['pedimentos'] == 10
+            assert backend['services'] == {'servicio8_estado3': 20}
+            campos = stub.backend.pedimentos['ped-1']
+            assert campos['pedimento'] == '1000001'
+            assert campos['curp_apoderado'] == 'ROAA690622HCHDLD06'
+            process.shutdown()
+    finally:
+        SETTINGS.REQUEST_DELAY_SECONDS = original_delay
+    print("✅ Página completa contra el stub")
+
+
+if __name__ == "__main__":
+    test_serves_all_services()
+    test_injects_soap_errors_and_response_size()
+    test_outcomes_are_repeatable()
+    test_full_page_against_stub()
@@ -0,0 +1,155 @@
+"""
+Circuit breaker por endpoint de VUCEM.
+
+Cuando VUCEM está caído, seguir mandando peticiones solo consume reintentos y
+marca como fallidos servicios que habrá que reprocesar. Tras varios fallos de
+disponibilidad seguidos el circuito se abre y las peticiones se rechazan al
+instante con CircuitOpenError; pasado open_seconds se deja pasar un número
+limitado de peticiones de prueba (half-open) que deciden si se cierra o se
+vuelve a abrir.
+"""
+
+import threading
+import time
+from typing import Dict
+
+from config.settings import SETTINGS
+from utils.retry_policy import CONNECT_TIMEOUT, READ_TIMEOUT, CONNECTION_ERROR, THROTTLED, SERVER_ERROR
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Fallos que indican que el endpoint no está disponible. Los 4xx y los
+# SOAP Fault de negocio significan que VUCEM sí respondió.
+OUTAGE_FAILURES = frozenset({CONNECT_TIMEOUT, READ_TIMEOUT, CONNECTION_ERROR, THROTTLED, SERVER_ERROR})
+
+
+class CircuitOpenError(Exception):
+    """La petición no se hizo porque el circuito del endpoint está abierto"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"Circuito abierto para {endpoint}, reintentar en {retry_after:.1f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Circuit breaker closed/open/half-open para un endpoint"""
+
+    def __init__(self, failure_threshold: int, open_seconds: float, half_open_probes: int = 1):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probes_in_flight = 0
+
+    def retry_after(self) -> float:
+        """Segundos que faltan para que el circuito acepte peticiones de prueba"""
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def allow_request(self) -> bool:
+        """Indica si la petición puede hacerse; en half-open reserva una prueba"""
+        with self._lock:
+            self._refresh_state()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._probes_in_flight = 0
+
+    def record_neutral(self):
+        """
+        Resultado que no cuenta ni como éxito ni como fallo del endpoint (p. ej.
+        un 429 de una sola credencial); solo devuelve la prueba de half-open
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_in_flight > 0:
+                self._probes_in_flight -= 1
+
+    def record_failure(self, failure: str):
+        """
+        Registra el resultado de una petición fallida
+
+        Args:
+            failure: Tipo de fallo (ver utils.retry_policy)
+        """
+        if failure not in OUTAGE_FAILURES:
+            # VUCEM respondió: para el circuito cuenta como disponible
+            self.record_success()
+            return
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._refresh_state()
+            return {
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'rejected': self._rejected,
+            }
+
+
+class CircuitBreakers:
+    """Registro de CircuitBreaker por endpoint, creados bajo demanda"""
+
+    def __init__(self, failure_threshold: int = None, open_seconds: float = None, half_open_probes: int = None):
+        self.failure_threshold = failure_threshold or SETTINGS.SOAP_BREAKER_FAILURE_THRESHOLD
+        self.open_seconds = open_seconds or SETTINGS.SOAP_BREAKER_OPEN_SECONDS
+        self.half_open_probes = half_open_probes or SETTINGS.SOAP_BREAKER_HALF_OPEN_PROBES
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(endpoint)
+                if breaker is None:
+                    breaker = self._breakers[endpoint] = CircuitBreaker(
+                        failure_threshold=self.failure_threshold,
+                        open_seconds=self.open_seconds,
+                        half_open_probes=self.half_open_probes
+                    )
+        return breaker
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Estado del circuito por endpoint"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {endpoint: breaker.snapshot() for endpoint, breaker in breakers.items()}
@@ -0,0 +1,123 @@
+"""
+Límite adaptativo (AIMD) de peticiones en vuelo por endpoint de VUCEM.
+
+Cada servicio de VUCEM se degrada a distinta carga, así que en lugar de
+ajustar DEFAULT_MAX_WORKERS a mano cada endpoint tiene su propio límite:
+crece de forma aditiva mientras las respuestas llegan a tiempo y se reduce
+de forma multiplicativa ante timeouts, 429 o 5xx.
+"""
+
+import threading
+import time
+from typing import Dict
+
+from config.settings import SETTINGS
+from utils.retry_policy import CONNECT_TIMEOUT, READ_TIMEOUT, THROTTLED, SERVER_ERROR
+
+# Fallos que indican que el endpoint está saturado
+CONGESTION_FAILURES = frozenset({CONNECT_TIMEOUT, READ_TIMEOUT, THROTTLED, SERVER_ERROR})
+
+
+class AdaptiveLimiter:
+    """
+    Límite AIMD de peticiones concurrentes para un endpoint.
+
+    - Éxito con latencia <= latency_target: limit += 1 / limit (≈ +1 por ventana)
+    - Fallo de congestión: limit *= backoff_ratio, como mucho una vez por
+      `cooldown` segundos para no colapsar por una ráfaga de fallos simultáneos
+    - Cualquier otro resultado deja el límite igual
+    """
+
+    def __init__(self, initial_limit: int, min_limit: int, max_limit: int,
+                 latency_target: float, backoff_ratio: float = 0.5, cooldown: float = 1.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff_ratio = backoff_ratio
+        self.cooldown = cooldown
+        self._limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def try_acquire(self) -> bool:
+        """Toma un lugar si hay disponible, sin bloquear"""
+        with self._condition:
+            if self._in_flight < int(self._limit):
+                self._in_flight += 1
+                return True
+            return False
+
+    def acquire(self):
+        """Bloquea hasta que haya un lugar disponible"""
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, latency: float, failure: str = None, adjust: bool = True):
+        """
+        Libera el lugar y ajusta el límite según el resultado
+
+        Args:
+            latency: Duración de la petición en segundos
+            failure: Tipo de fallo (ver utils.retry_policy) o None si fue exitosa
+            adjust: False libera el lugar sin tocar el límite, para resultados
+                que no dicen nada de la carga del endpoint (p. ej. un 429 de
+                una sola credencial)
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if adjust and failure in CONGESTION_FAILURES:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.cooldown:
+                    self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+                    self._last_decrease = now
+            elif adjust and failure is None and latency <= self.latency_target:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+
+class EndpointLimiters:
+    """Registro de AdaptiveLimiter por endpoint, creados bajo demanda"""
+
+    def __init__(self, initial_limit: int = None, min_limit: int = None, max_limit: int = None,
+                 latency_target: float = None, backoff_ratio: float = None):
+        self.initial_limit = initial_limit or SETTINGS.SOAP_LIMIT_INITIAL
+        self.min_limit = min_limit or SETTINGS.SOAP_LIMIT_MIN
+        self.max_limit = max_limit or SETTINGS.SOAP_LIMIT_MAX
+        self.latency_target = latency_target or SETTINGS.SOAP_LIMIT_LATENCY_TARGET_SECONDS
+        self.backoff_ratio = backoff_ratio or SETTINGS.SOAP_LIMIT_BACKOFF_RATIO
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str) -> AdaptiveLimiter:
+        limiter = self._limiters.get(endpoint)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(endpoint)
+                if limiter is None:
+                    limiter = self._limiters[endpoint] = AdaptiveLimiter(
+                        initial_limit=self.initial_limit,
+                        min_limit=self.min_limit,
+                        max_limit=self.max_limit,
+                        latency_target=self.latency_target,
+                        backoff_ratio=self.backoff_ratio
+                    )
+        return limiter
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Límite actual y peticiones en vuelo por endpoint"""
+        with self._lock:
+            return {
+                endpoint: {'limit': limiter.limit, 'in_flight': limiter.in_flight}
+                for endpoint, limiter in self._limiters.items()
+            }
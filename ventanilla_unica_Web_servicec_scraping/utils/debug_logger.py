@@ -0,0 +1,129 @@
+"""
+Logging del scraper.
+
+setup_logging() configura una sola vez los loggers del proyecto con
+SCRIPT_LOG_LEVEL y SCRIPT_LOG_FILE. Los hilos de trabajo solo encolan el
+registro (QueueHandler); escribir a consola y archivo, y tapar secretos
+(token de la API, contraseñas de VUCEM), lo hace el hilo del QueueListener.
+
+Los módulos usan `logger = get_logger(__name__)` y formato diferido:
+`logger.debug("Respuesta %s: %s bytes", endpoint, len(content))`, así un
+mensaje debajo del nivel configurado no se formatea.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+
+from config.settings import SETTINGS
+
+# Paquetes del proyecto a los que aplica SCRIPT_LOG_LEVEL; las librerías
+# (httpx, urllib3, ...) quedan en WARNING
+PROJECT_LOGGERS = ('__main__', 'main', 'controllers', 'payload_structure', 'utils', 'benchmarks')
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s'
+
+_REDACTIONS = (
+    # Authorization: Token <...> (headers, dicts impresos, URLs)
+    (re.compile(r'(Token\s+)[^\s\'",}]+', re.I), r'\1***'),
+    # <Password>...</Password> / <wsse:Password Type="...">...</wsse:Password>
+    (re.compile(r'(<(?:\w+:)?Password\b[^>]*>)[^<]*(</)', re.I), r'\1***\2'),
+    # 'password': '...' / "password": "..." / password=...
+    (re.compile(r'''(['"]?password['"]?\s*[:=]\s*['"]?)[^'"\s,}&]+''', re.I), r'\1***'),
+)
+
+_listener = None
+_queue_handler = None
+_lock = threading.Lock()
+
+
+def redact(text: str) -> str:
+    """Tapa tokens y contraseñas en un mensaje ya formateado"""
+    if SETTINGS.API_TOKEN:
+        text = text.replace(SETTINGS.API_TOKEN, '***')
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class RedactingFilter(logging.Filter):
+    """Aplica redact() al mensaje y al traceback de cada registro"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.msg = redact(record.getMessage())
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        if record.exc_text:
+            record.exc_text = redact(record.exc_text)
+        return True
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def setup_logging(level: str = None, log_file: str = None, stream=None) -> logging.handlers.QueueListener:
+    """
+    Configura el logging del proyecto (idempotente)
+
+    Args:
+        level: Nivel para los loggers del proyecto (default SCRIPT_LOG_LEVEL)
+        log_file: Archivo de log rotativo; '' para solo consola (default SCRIPT_LOG_FILE)
+        stream: Flujo de consola (default sys.stdout)
+
+    Returns:
+        El QueueListener que escribe los registros
+    """
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        level = (level or SETTINGS.SCRIPT_LOG_LEVEL).upper()
+        log_file = SETTINGS.SCRIPT_LOG_FILE if log_file is None else log_file
+        formatter = logging.Formatter(LOG_FORMAT)
+        redacting = RedactingFilter()
+
+        handlers = [logging.StreamHandler(stream or sys.stdout)]
+        if log_file:
+            os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+            handlers.append(logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=10 * 1024 * 1024, backupCount=5, encoding='utf-8'))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+            handler.addFilter(redacting)
+
+        # Los hilos de trabajo solo formatean el mensaje (si su nivel está
+        # activo) y lo encolan; el I/O ocurre en el hilo del listener
+        records = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(records)
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.setLevel(logging.WARNING)
+        for name in PROJECT_LOGGERS:
+            logging.getLogger(name).setLevel(level)
+
+        _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """Vacía la cola y detiene el hilo del listener"""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
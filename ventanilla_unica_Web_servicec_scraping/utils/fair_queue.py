@@ -0,0 +1,380 @@
+"""
+Cola acotada con reparto justo por importador (weighted fair queuing).
+
+El listado de servicios pendientes llega en el orden de la API, así que un
+importador con miles de pedimentos ocupaba todos los hilos y la cuota de
+VUCEM mientras los importadores chicos esperaban. Cada importador tiene su
+propia subcola y cada servicio recibe al encolarse una marca de fin virtual
+
+    fin = max(tiempo_virtual, fin_anterior_del_importador) + 1 / peso
+
+y los consumidores toman siempre el servicio con la menor marca. Con pesos
+iguales los importadores se atienden por turnos; uno con peso 3 recibe tres
+turnos por cada uno de los demás, y un importador que llega tarde no espera
+detrás de todo el backlog del grande.
+
+Además:
+- Tope de servicios en vuelo por importador (caps): sus servicios se
+  quedan en la subcola y los consumidores toman los de otros importadores.
+- Tope de servicios encolados por importador (max_per_key): put() devuelve
+  False en vez de esperar, para que el productor siga leyendo páginas y
+  encuentre servicios de otros importadores; los rechazados se vuelven a
+  leer en la siguiente pasada.
+
+Micro-lotes: get_batch() entrega, además del elegido, los siguientes
+servicios encolados del mismo importador y tipo de servicio (hasta
+max_items), para que un hilo los procese seguidos con la misma credencial
+y la conexión ya abierta. Solo se espera hasta max_delay a que lleguen más
+si el grupo los está recibiendo (un put desde que empezó el lote, o sus
+dos últimos put separados por menos de max_delay): un importador con un
+servicio suelto no paga la espera. Cada
+servicio del lote cuenta en el reparto como si se hubiera tomado por
+separado; batch_stats() reporta la proporción de servicios agrupados.
+
+Los consumidores deben llamar task_done(item) al terminar cada servicio
+(ServiceFeed lo hace al iterar). Cuando una clave se queda sin encolados ni
+en vuelo se borra su estado de reparto; con forget_idle también sus
+estadísticas, para que en modo continuo no se acumulen los importadores que
+ya no tienen trabajo (batch_stats() conserva los totales).
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from config.settings import SETTINGS
+
+# _select() sin clave elegible; None es una clave válida (servicio sin importador)
+_NO_KEY = object()
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """
+    Convierte "RFC1=3,RFC2=0.5" en {'RFC1': 3.0, 'RFC2': 0.5}
+
+    Raises:
+        ValueError: Si una entrada no tiene la forma clave=número
+    """
+    weights = {}
+    for entry in filter(None, (part.strip() for part in (spec or '').split(','))):
+        key, sep, value = entry.partition('=')
+        if not sep or not key.strip():
+            raise ValueError(f"Entrada inválida '{entry}': se esperaba IMPORTADOR=valor")
+        weights[key.strip()] = float(value)
+    return weights
+
+
+def importer_of(item) -> Optional[str]:
+    """Importador (contribuyente del pedimento) de un FeedItem"""
+    return ((getattr(item, 'service', None) or {}).get('pedimento') or {}).get('contribuyente')
+
+
+def service_type_of(item) -> Optional[int]:
+    """Tipo de servicio (servicio) de un FeedItem"""
+    return (getattr(item, 'service', None) or {}).get('servicio')
+
+
+class FairQueue:
+    """Cola thread-safe con subcolas por clave, WFQ y topes por clave"""
+
+    def __init__(self, maxsize: int = 0, key: Callable[[Any], Hashable] = importer_of,
+                 weights: Dict[Hashable, float] = None, default_weight: float = 1.0,
+                 caps: Dict[Hashable, int] = None, default_cap: int = 0, max_per_key: int = 0,
+                 group: Callable[[Any], Hashable] = service_type_of, forget_idle: bool = False):
+        """
+        Args:
+            maxsize: Total de elementos encolados (0 = sin límite)
+            key: Función elemento -> clave de reparto (importador)
+            weights: Peso por clave; las demás usan default_weight
+            caps: Máximo en vuelo por clave; las demás usan default_cap (0 = sin tope)
+            max_per_key: Máximo encolado por clave (0 = sin tope)
+            group: Función elemento -> grupo dentro de la clave; un micro-lote
+                   solo junta elementos de la misma clave y grupo
+            forget_idle: Borra las estadísticas de una clave cuando se queda sin
+                   encolados ni en vuelo; stats() solo reporta las activas
+        """
+        self.maxsize = maxsize
+        self.max_per_key = max_per_key
+        self._key = key
+        self._group = group
+        self._weights = weights or {}
+        self._default_weight = default_weight
+        self._caps = caps or {}
+        self._default_cap = default_cap
+        self.forget_idle = forget_idle
+        self._queues: Dict[Hashable, deque] = {}
+        self._last_finish: Dict[Hashable, float] = {}
+        # (clave, grupo) -> momento del último put y separación con el anterior
+        self._last_put: Dict[tuple, float] = {}
+        self._put_gap: Dict[tuple, Optional[float]] = {}
+        self._in_flight: Dict[Hashable, int] = {}
+        self._stats: Dict[Hashable, Dict[str, float]] = {}
+        # Totales de todas las claves, incluidas las ya olvidadas
+        self._totals = {'dispatched': 0, 'batches': 0}
+        self._virtual = 0.0
+        self._size = 0
+        self._finished = False
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_settings(cls, maxsize: int, forget_idle: bool = False) -> 'FairQueue':
+        """Cola por importador configurada con las variables SCHEDULER_*"""
+        return cls(
+            maxsize=maxsize,
+            weights=parse_weights(SETTINGS.SCHEDULER_IMPORTER_WEIGHTS),
+            caps={key: int(cap) for key, cap in parse_weights(SETTINGS.SCHEDULER_IMPORTER_CAPS).items()},
+            default_cap=SETTINGS.SCHEDULER_DEFAULT_IMPORTER_CAP,
+            max_per_key=SETTINGS.SCHEDULER_MAX_QUEUED_PER_IMPORTER,
+            forget_idle=forget_idle
+        )
+
+    def weight(self, key: Hashable) -> float:
+        return max(self._weights.get(key, self._default_weight), 1e-6)
+
+    def cap(self, key: Hashable) -> int:
+        return self._caps.get(key, self._default_cap)
+
+    def _key_stats(self, key: Hashable) -> Dict[str, float]:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = {'dispatched': 0, 'batches': 0, 'deferred': 0, 'waited_seconds': 0.0}
+        return stats
+
+    def put(self, item, timeout: float = None) -> bool:
+        """
+        Encola item en la subcola de su clave
+
+        Returns:
+            False (sin esperar) si la subcola de la clave está en max_per_key
+
+        Raises:
+            queue.Full: Si la cola total sigue llena pasado timeout
+        """
+        key = self._key(item)
+        with self._cond:
+            subqueue = self._queues.get(key)
+            if self.max_per_key and subqueue is not None and len(subqueue) >= self.max_per_key:
+                self._key_stats(key)['deferred'] += 1
+                return False
+            if self.maxsize and not self._cond.wait_for(lambda: self._size < self.maxsize, timeout):
+                raise queue.Full
+            # Mientras se esperaba lugar la subcola pudo vaciarse y borrarse
+            subqueue = self._queues.get(key)
+            if subqueue is None:
+                subqueue = self._queues[key] = deque()
+            finish = max(self._virtual, self._last_finish.get(key, 0.0)) + 1 / self.weight(key)
+            self._last_finish[key] = finish
+            now = time.monotonic()
+            group_key = (key, self._group(item))
+            last_put = self._last_put.get(group_key)
+            self._put_gap[group_key] = now - last_put if last_put is not None else None
+            self._last_put[group_key] = now
+            subqueue.append((finish, now, item))
+            self._size += 1
+            self._key_stats(key)
+            self._cond.notify_all()
+            return True
+
+    def _select(self):
+        """Clave con la menor marca de fin entre las que no llegaron a su tope en vuelo (_NO_KEY si ninguna)"""
+        best_key, best_finish = _NO_KEY, None
+        for key, subqueue in self._queues.items():
+            if not subqueue:
+                continue
+            cap = self.cap(key)
+            if cap and self._in_flight.get(key, 0) >= cap:
+                continue
+            if best_finish is None or subqueue[0][0] < best_finish:
+                best_key, best_finish = key, subqueue[0][0]
+        return best_key
+
+    def get(self, timeout: float = None):
+        """
+        Siguiente elemento según el reparto justo
+
+        Returns:
+            El elemento, o None si finish() se llamó y no queda nada
+
+        Raises:
+            queue.Empty: Si pasado timeout no hay elemento disponible
+        """
+        batch = self.get_batch(1, timeout=timeout)
+        return batch[0] if batch else None
+
+    def get_batch(self, max_items: int, max_delay: float = 0.0, timeout: float = None) -> List:
+        """
+        Siguiente elemento según el reparto justo y, detrás de él, los encolados
+        de la misma clave y grupo
+
+        Args:
+            max_items: Tamaño máximo del micro-lote
+            max_delay: Segundos que se espera a que lleguen más elementos del
+                       grupo si el lote no se llenó con los encolados y el
+                       grupo los está recibiendo (ver _more_expected)
+            timeout: Espera máxima por el primer elemento
+
+        Returns:
+            Lista de elementos; vacía si finish() se llamó y no queda nada
+
+        Raises:
+            queue.Empty: Si pasado timeout no hay elemento disponible
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                key = self._select()
+                if key is not _NO_KEY:
+                    break
+                if self._finished and self._size == 0:
+                    return []
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._cond.wait(remaining)
+            batch = [self._pop(key, 0)]
+            group = self._group(batch[0])
+            batch_started = time.monotonic()
+            batch_deadline = batch_started + max_delay
+            while len(batch) < max_items:
+                batch.extend(self._take_group(key, group, max_items - len(batch)))
+                remaining = batch_deadline - time.monotonic()
+                if len(batch) >= max_items or self._finished or remaining <= 0:
+                    break
+                if not self._more_expected((key, group), max_delay, batch_started):
+                    break
+                self._cond.wait(remaining)
+            self._key_stats(key)['batches'] += 1
+            self._totals['batches'] += 1
+            self._cond.notify_all()
+            return batch
+
+    def _more_expected(self, group_key: tuple, max_delay: float, since: float) -> bool:
+        """
+        Si vale la pena esperar más elementos del grupo: llegó uno desde since,
+        o el grupo viene llegando en ráfaga (sus dos últimos put separados por
+        menos de max_delay, el último hace menos de max_delay)
+        """
+        last_put = self._last_put.get(group_key)
+        if last_put is None:
+            return False
+        if last_put >= since:
+            return True
+        gap = self._put_gap.get(group_key)
+        return gap is not None and gap <= max_delay and since - last_put <= max_delay
+
+    def _take_group(self, key: Hashable, group: Hashable, limit: int) -> List:
+        """Saca hasta limit elementos encolados de key en el grupo dado, respetando el tope en vuelo"""
+        cap = self.cap(key)
+        if cap:
+            limit = min(limit, cap - self._in_flight.get(key, 0))
+        taken = []
+        index = 0
+        subqueue = self._queues.get(key)
+        while subqueue is not None and len(taken) < limit and index < len(subqueue):
+            if self._group(subqueue[index][2]) == group:
+                taken.append(self._pop(key, index))
+                subqueue = self._queues.get(key)
+            else:
+                index += 1
+        return taken
+
+    def _pop(self, key: Hashable, index: int):
+        """Despacha el elemento index de la subcola de key"""
+        subqueue = self._queues[key]
+        finish, enqueued, item = subqueue[index]
+        del subqueue[index]
+        if not subqueue:
+            # Una clave sin servicios encolados no acumula crédito: al volver
+            # empieza desde el tiempo virtual actual
+            del self._queues[key]
+            del self._last_finish[key]
+        self._size -= 1
+        self._virtual = max(self._virtual, finish)
+        self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        self._totals['dispatched'] += 1
+        stats = self._key_stats(key)
+        stats['dispatched'] += 1
+        stats['waited_seconds'] += time.monotonic() - enqueued
+        return item
+
+    def task_done(self, item):
+        """El consumidor terminó item; libera su lugar en el tope en vuelo de la clave"""
+        key = self._key(item)
+        with self._cond:
+            self._in_flight[key] = self._in_flight.get(key, 0) - 1
+            if key not in self._queues:
+                self._forget_if_idle(key)
+            self._cond.notify_all()
+
+    def _forget_if_idle(self, key: Hashable):
+        """Borra el estado de key si no tiene encolados ni en vuelo"""
+        if key in self._queues or self._in_flight.get(key, 0) > 0:
+            return
+        self._in_flight.pop(key, None)
+        for group_key in [group_key for group_key in self._last_put if group_key[0] == key]:
+            del self._last_put[group_key]
+            self._put_gap.pop(group_key, None)
+        if self.forget_idle:
+            self._stats.pop(key, None)
+
+    def wait_for_change(self, timeout: float):
+        """Espera hasta timeout a que se tome o termine algún elemento"""
+        with self._cond:
+            self._cond.wait(timeout)
+
+    def finish(self):
+        """No habrá más elementos: get() devuelve None al vaciarse la cola"""
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    def clear(self):
+        """Descarta los elementos encolados"""
+        with self._cond:
+            self._queues.clear()
+            self._last_finish.clear()
+            self._last_put.clear()
+            self._put_gap.clear()
+            for key in set(self._in_flight) | set(self._stats):
+                self._forget_if_idle(key)
+            self._size = 0
+            self._cond.notify_all()
+
+    def qsize(self) -> int:
+        with self._cond:
+            return self._size
+
+    def stats(self) -> Dict[Hashable, dict]:
+        """Encolados, en vuelo, despachados, rechazados y espera media por clave"""
+        with self._cond:
+            result = {}
+            for key, stats in self._stats.items():
+                dispatched = stats['dispatched']
+                result[key] = {
+                    'queued': len(self._queues.get(key, ())),
+                    'in_flight': self._in_flight.get(key, 0),
+                    'dispatched': dispatched,
+                    'batches': stats['batches'],
+                    'deferred': stats['deferred'],
+                    'avg_wait_seconds': stats['waited_seconds'] / dispatched if dispatched else 0.0,
+                    'weight': self.weight(key),
+                    'cap': self.cap(key),
+                }
+            return result
+
+    def batch_stats(self) -> Dict[str, float]:
+        """
+        Micro-lotes despachados: grouping_ratio es la proporción de elementos
+        que se entregaron detrás de otro de su misma clave y grupo
+        """
+        with self._cond:
+            dispatched = self._totals['dispatched']
+            batches = self._totals['batches']
+        return {
+            'services': dispatched,
+            'batches': batches,
+            'avg_batch_size': dispatched / batches if batches else 0.0,
+            'grouping_ratio': 1 - batches / dispatched if dispatched else 0.0,
+        }
@@ -0,0 +1,63 @@
+"""
+Endpoint HTTP mínimo de salud y métricas para el modo continuo.
+
+    GET /health   200 {"status": "ok", ...} o 503 si el proceso está drenando
+                  o el feed lleva demasiado sin consultar la API
+    GET /metrics  JSON con contadores de servicios, feed, SOAP y API
+
+Corre en un hilo propio (ThreadingHTTPServer) y solo lee el estado que le
+entregan las funciones health() y metrics().
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+from utils.debug_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class HealthServer:
+    """Servidor de /health y /metrics sobre funciones que devuelven dicts"""
+
+    def __init__(self, port: int, health: Callable[[], dict], metrics: Callable[[], dict],
+                 host: str = '127.0.0.1'):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/health':
+                    data = health()
+                    status = 200 if data.get('status') == 'ok' else 503
+                elif path == '/metrics':
+                    data, status = metrics(), 200
+                else:
+                    data, status = {'detail': 'Not found.'}, 404
+                body = json.dumps(data, default=str).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> 'HealthServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name="HealthServer", daemon=True)
+        self._thread.start()
+        logger.info("Health/metrics en http://%s:%s/health", *self._server.server_address[:2])
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
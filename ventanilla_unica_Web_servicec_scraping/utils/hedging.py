@@ -0,0 +1,175 @@
+"""
+Peticiones "hedged" para recortar la cola de latencia.
+
+Si una petición no ha respondido después del percentil configurado de la
+latencia reciente de su endpoint, se lanza un duplicado y se usa la primera
+respuesta que llegue. Un presupuesto limita los duplicados a una fracción
+pequeña de las peticiones para no aumentar de forma apreciable la carga sobre
+VUCEM.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait, FIRST_COMPLETED
+from typing import Dict, Optional
+
+from config.settings import SETTINGS
+from utils.retry_policy import RetryBudget
+
+
+class RequestHedger:
+    """Calcula el umbral de hedging por endpoint y ejecuta las peticiones duplicadas"""
+
+    def __init__(self, endpoints=None, percentile: float = None, min_samples: int = None,
+                 max_ratio: float = None, window: int = 200, max_workers: int = None):
+        self.endpoints = tuple(endpoints if endpoints is not None else SETTINGS.SOAP_HEDGE_ENDPOINTS)
+        self.percentile = percentile or SETTINGS.SOAP_HEDGE_PERCENTILE
+        self.min_samples = min_samples or SETTINGS.SOAP_HEDGE_MIN_SAMPLES
+        self.window = window
+        self.max_workers = max_workers or SETTINGS.SOAP_POOL_MAX_CONNECTIONS * 2
+        # Mismo mecanismo que el presupuesto de reintentos: cada petición
+        # deposita max_ratio fichas y cada duplicado consume una
+        self.budget = RetryBudget(ratio=max_ratio or SETTINGS.SOAP_HEDGE_MAX_RATIO, reserve=1)
+        self._latencies: Dict[str, deque] = {}
+        self._stats: Dict[str, dict] = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def applies_to(self, endpoint: str) -> bool:
+        return any(name in endpoint for name in self.endpoints)
+
+    def record_latency(self, endpoint: str, latency: float):
+        """Registra la latencia de una respuesta exitosa"""
+        with self._lock:
+            samples = self._latencies.get(endpoint)
+            if samples is None:
+                samples = self._latencies[endpoint] = deque(maxlen=self.window)
+            samples.append(latency)
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """Percentil de la latencia reciente, o None si aún no hay muestras suficientes"""
+        with self._lock:
+            samples = self._latencies.get(endpoint)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[index]
+
+    def _count(self, endpoint: str, key: str):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {'requests': 0, 'hedged': 0, 'hedge_wins': 0})
+            stats[key] += 1
+
+    def _start(self, endpoint: str) -> Optional[float]:
+        """Registra la petición y devuelve el umbral de hedging (None = no aplica)"""
+        self.budget.record_request()
+        self._count(endpoint, 'requests')
+        return self.hedge_delay(endpoint)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="SOAPHedge")
+        return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _admit(self, rate_limiter) -> bool:
+        """Presupuesto de duplicados y, si hay límite global, una ficha libre"""
+        # La ficha del rate limit solo se toma si el duplicado va a salir:
+        # una ficha gastada sin petición bajaría la tasa real bajo la configurada
+        if not self.budget.try_spend():
+            return False
+        if rate_limiter is not None and not rate_limiter.try_acquire():
+            self.budget.refund()
+            return False
+        return True
+
+    def call(self, endpoint: str, send, rate_limiter=None):
+        """
+        Ejecuta send() y, si tarda más que el umbral, un duplicado en paralelo
+
+        Args:
+            endpoint: Endpoint de la petición
+            send: Función sin argumentos que hace la petición y lanza excepción si falla
+            rate_limiter: Opcional; el duplicado solo sale si hay ficha disponible sin esperar
+
+        Returns:
+            El resultado de la primera llamada exitosa
+        """
+        delay = self._start(endpoint)
+        if delay is None:
+            return send()
+
+        primary = self.executor.submit(send)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        if not self._admit(rate_limiter):
+            return primary.result()
+
+        self._count(endpoint, 'hedged')
+        hedge = self.executor.submit(send)
+        pending = {primary, hedge}
+        first_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is not None:
+                    first_error = first_error or error
+                    continue
+                if future is hedge:
+                    self._count(endpoint, 'hedge_wins')
+                return future.result()
+        raise first_error
+
+    async def acall(self, endpoint: str, send, rate_limiter=None):
+        """
+        Versión asyncio de call(); send es una función que devuelve una corrutina
+        """
+        delay = self._start(endpoint)
+        if delay is None:
+            return await send()
+
+        primary = asyncio.ensure_future(send())
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._admit(rate_limiter):
+            return await primary
+
+        self._count(endpoint, 'hedged')
+        hedge = asyncio.ensure_future(send())
+        pending = {primary, hedge}
+        first_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is not None:
+                        first_error = first_error or error
+                        continue
+                    if task is hedge:
+                        self._count(endpoint, 'hedge_wins')
+                    return task.result()
+            raise first_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, dict]:
+        """Peticiones, duplicados y duplicados ganadores por endpoint"""
+        with self._lock:
+            stats = {endpoint: dict(values) for endpoint, values in self._stats.items()}
+        for endpoint in stats:
+            stats[endpoint]['hedge_delay'] = self.hedge_delay(endpoint)
+        return stats
@@ -0,0 +1,60 @@
+"""
+Latencia por endpoint de las peticiones a la API.
+
+Los ids en la ruta (servicio, pedimento, documento) y la query se quitan
+del nombre del endpoint, así todas las actualizaciones de estado cuentan
+juntas como 'customs/procesamientopedimentos/{id}/'.
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Dict
+
+_ID_SEGMENT = re.compile(r'(?<=/)[^/]*\d[^/]*(?=/|$)')
+
+
+def endpoint_key(endpoint: str) -> str:
+    """'customs/procesamientopedimentos/12/?x=1' -> 'customs/procesamientopedimentos/{id}/'"""
+    return _ID_SEGMENT.sub('{id}', endpoint.split('?', 1)[0])
+
+
+class LatencyStats:
+    """Peticiones, errores y percentiles de latencia (ventana reciente) por endpoint"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._stats: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, ok: bool = True):
+        key = endpoint_key(endpoint)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {
+                    'requests': 0, 'errors': 0, 'total_seconds': 0.0,
+                    'samples': deque(maxlen=self.window)
+                }
+            stats['requests'] += 1
+            stats['errors'] += int(not ok)
+            stats['total_seconds'] += seconds
+            stats['samples'].append(seconds)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Resumen por endpoint con latencias en milisegundos"""
+        with self._lock:
+            copies = {key: (dict(stats), sorted(stats['samples'])) for key, stats in self._stats.items()}
+        result = {}
+        for key, (stats, ordered) in copies.items():
+            def percentile(p):
+                return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+            result[key] = {
+                'requests': stats['requests'],
+                'errors': stats['errors'],
+                'avg_ms': stats['total_seconds'] / stats['requests'] * 1000,
+                'p50_ms': percentile(50),
+                'p95_ms': percentile(95),
+                'max_ms': ordered[-1] * 1000,
+            }
+        return result
@@ -0,0 +1,87 @@
+"""
+Cuerpo multipart/form-data sin copias para subir documentos a la API.
+
+requests arma el multipart de `files=` completo en memoria (una copia del
+XML más la del BytesIO). MultipartBody en cambio expone los encabezados de
+cada parte y el buffer de la respuesta SOAP como una secuencia de vistas
+(memoryview) que http.client envía por bloques, con Content-Length
+calculado de antemano: el XML nunca se copia ni se escribe a disco.
+"""
+
+import uuid
+from typing import Any, Dict, List
+
+
+class MultipartBody:
+    """
+    Objeto tipo archivo (read/tell/seek/__len__) con el cuerpo multipart
+
+    Se puede pasar directamente como `data=` a requests junto con los
+    headers de `headers()`. seek(0) permite que urllib3 lo rebobine si
+    reintenta la petición.
+    """
+
+    def __init__(self, fields: Dict[str, Any], file_field: str, file_name: str,
+                 content: bytes, content_type: str):
+        self.boundary = uuid.uuid4().hex
+        buffers: List[memoryview] = []
+        for name, value in fields.items():
+            buffers.append(memoryview(
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f'{value}\r\n'.encode('utf-8')
+            ))
+        buffers.append(memoryview(
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{file_name}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8')
+        ))
+        buffers.append(memoryview(content))
+        buffers.append(memoryview(f'\r\n--{self.boundary}--\r\n'.encode('utf-8')))
+        self._buffers = [buffer for buffer in buffers if len(buffer)]
+        self._length = sum(len(buffer) for buffer in self._buffers)
+        self._index = 0
+        self._offset = 0
+        self._position = 0
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def headers(self) -> Dict[str, str]:
+        """Content-Type y Content-Length del cuerpo"""
+        return {'Content-Type': self.content_type, 'Content-Length': str(self._length)}
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1):
+        """
+        Siguiente bloque de hasta `size` bytes (nunca cruza de una parte a otra)
+
+        Devuelve una vista sobre el buffer original; b'' al terminar. Sin
+        `size` devuelve el resto del cuerpo, lo que sí implica una copia.
+        """
+        if size is None or size < 0:
+            rest = [self.read(len(self)) for _ in range(self._index, len(self._buffers))]
+            return b''.join(rest)
+        if self._index >= len(self._buffers):
+            return b''
+        buffer = self._buffers[self._index]
+        end = min(len(buffer), self._offset + size)
+        chunk = buffer[self._offset:end]
+        self._position += len(chunk)
+        if end == len(buffer):
+            self._index, self._offset = self._index + 1, 0
+        else:
+            self._offset = end
+        return chunk
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, position: int, whence: int = 0) -> int:
+        if whence != 0 or position != 0:
+            raise ValueError("MultipartBody solo admite seek(0)")
+        self._index = self._offset = self._position = 0
+        return 0
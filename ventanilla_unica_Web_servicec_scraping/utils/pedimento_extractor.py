@@ -0,0 +1,88 @@
+"""
+Extracción de campos de la respuesta de pedimento completo.
+
+ventanilla_unica_document_scraping descargaba de la API el XML ya subido
+solo para leer numero de operación, pedimento, CURP del apoderado y RFC del
+agente aduanal con ET.fromstring + find. Aquí se leen los mismos campos de
+la respuesta SOAP recién recibida, en una sola pasada incremental que se
+detiene al tener todos (están en los primeros KB de la respuesta).
+"""
+
+from typing import Dict, Optional, Tuple, Union
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+PEDIMENTO_COMPLETO_NS = 'http://www.ventanillaunica.gob.mx/pedimentos/ws/oxml/consultarpedimentocompleto'
+
+FIRST_CHUNK_SIZE = 1024
+CHUNK_SIZE = 65536
+
+
+def parse_fields(spec: str) -> Dict[str, str]:
+    """
+    Convierte 'campo=ruta,campo=ruta' en un diccionario
+
+    La ruta son nombres de elemento separados por '/', relativa a cualquier
+    nivel del documento (equivale a './/ns2:a/ns2:b' en ElementTree).
+    """
+    fields = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        key, separator, path = item.partition('=')
+        if not separator or not key.strip() or not path.strip():
+            raise ValueError(f"Campo mal definido: '{item}' (se espera campo=ruta)")
+        fields[key.strip()] = path.strip().strip('/')
+    return fields
+
+
+class FieldExtractor:
+    """Extrae un conjunto fijo de campos de un XML con un solo recorrido"""
+
+    def __init__(self, fields: Dict[str, str], namespace: str = PEDIMENTO_COMPLETO_NS):
+        self.fields = dict(fields)
+        self.namespace = namespace
+        self._paths: Dict[str, Tuple[str, ...]] = {
+            key: tuple(f'{{{namespace}}}{part}' for part in path.split('/'))
+            for key, path in self.fields.items()
+        }
+
+    def extract(self, content: Union[bytes, bytearray, str]) -> Dict[str, Optional[str]]:
+        """
+        Lee los campos configurados
+
+        Args:
+            content: XML de la respuesta (bytes o str)
+
+        Returns:
+            Diccionario campo -> texto; None para los campos no encontrados.
+            Si el XML está truncado se devuelve lo encontrado hasta ese punto.
+        """
+        values: Dict[str, Optional[str]] = dict.fromkeys(self._paths)
+        pending = dict(self._paths)
+        if not content or not pending:
+            return values
+        data = memoryview(content.encode('utf-8') if isinstance(content, str) else content)
+
+        parser = XMLPullParser(events=('start', 'end'))
+        stack = []
+        try:
+            offset, size = 0, FIRST_CHUNK_SIZE
+            while offset < len(data):
+                parser.feed(data[offset:offset + size])
+                offset += size
+                size = min(size * 2, CHUNK_SIZE)
+                for event, elem in parser.read_events():
+                    if event == 'start':
+                        stack.append(elem.tag)
+                        continue
+                    for key, path in list(pending.items()):
+                        if tuple(stack[-len(path):]) == path:
+                            values[key] = (elem.text or '').strip() or None
+                            del pending[key]
+                    if not pending:
+                        return values
+                    stack.pop()
+                    elem.clear()
+        except ParseError:
+            pass
+        return values
@@ -0,0 +1,118 @@
+"""
+Límite global de peticiones por segundo (token bucket) por destino.
+
+Cada petición que sale hacia VUCEM o hacia la API toma una ficha del bucket
+de su destino; el bucket se rellena a `rate` fichas por segundo hasta
+`burst`. Como los buckets son compartidos por todo el proceso (hilos, event
+loop y todos los controladores), la tasa total queda en `rate` sin importar
+cuántos hilos haya. Reemplaza a las pausas fijas de REQUEST_DELAY_SECONDS.
+
+Las fichas se reservan bajo el lock y la espera ocurre fuera de él: cada
+petición sabe de antemano cuánto le toca esperar, en orden de llegada y sin
+sondear.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict
+
+from config.settings import SETTINGS
+
+VUCEM = 'vucem'
+API = 'api'
+
+
+class TokenBucket:
+    """Token bucket thread-safe; rate <= 0 desactiva el límite"""
+
+    def __init__(self, rate: float, burst: float = None, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, burst if burst else rate)
+        self._clock = clock
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self._stats = {'acquired': 0, 'delayed': 0, 'waited_seconds': 0.0}
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self, tokens: float) -> float:
+        """Descuenta las fichas (el saldo puede quedar negativo) y devuelve la espera"""
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self._stats['acquired'] += 1
+            if wait > 0:
+                self._stats['delayed'] += 1
+                self._stats['waited_seconds'] += wait
+            return wait
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Bloquea hasta que toque el turno; devuelve los segundos esperados"""
+        if self.unlimited:
+            return 0.0
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1) -> float:
+        """Como acquire() pero esperando en el event loop"""
+        if self.unlimited:
+            return 0.0
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Toma las fichas solo si están disponibles ahora, sin reservar"""
+        if self.unlimited:
+            return True
+        with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            self._stats['acquired'] += 1
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['rate'] = self.rate
+        stats['burst'] = self.burst
+        return stats
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_rate_limiter(target: str) -> TokenBucket:
+    """
+    Bucket compartido del destino (VUCEM o API), creado con la configuración
+
+    Args:
+        target: rate_limiter.VUCEM o rate_limiter.API
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(target)
+        if bucket is None:
+            if target == VUCEM:
+                bucket = TokenBucket(SETTINGS.SOAP_RATE_LIMIT_RPS, SETTINGS.SOAP_RATE_LIMIT_BURST)
+            elif target == API:
+                bucket = TokenBucket(SETTINGS.API_RATE_LIMIT_RPS, SETTINGS.API_RATE_LIMIT_BURST)
+            else:
+                raise ValueError(f"Destino de rate limit desconocido: {target}")
+            _buckets[target] = bucket
+        return bucket
@@ -0,0 +1,152 @@
+"""
+Cache en disco de respuestas SOAP de VUCEM.
+
+Los servicios de un mismo pedimento se vuelven a encolar (servicio 8 tras
+el 3, reprocesos de fallidos) y cada vez se descargaba de nuevo el XML
+completo. Las respuestas exitosas se guardan comprimidas con gzip en un
+archivo cuyo nombre es el sha256 de la consulta
+(servicio, aduana, patente, pedimento[, partida]), con TTL y un tamaño
+máximo en disco que se respeta desalojando las entradas usadas hace más
+tiempo (LRU).
+"""
+
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from config.settings import SETTINGS
+
+# Temporales de put() más viejos que esto son de una escritura interrumpida;
+# los recientes pueden ser de otro proceso que comparte el directorio
+STALE_TEMP_SECONDS = 3600
+
+
+class SOAPResponseCache:
+    """Cache LRU con TTL de cuerpos de respuesta SOAP comprimidos"""
+
+    SUFFIX = '.xml.gz'
+    TEMP_SUFFIX = '.tmp'
+
+    def __init__(self, cache_dir: str = None, ttl_seconds: float = None, max_bytes: int = None):
+        self.cache_dir = cache_dir or SETTINGS.SOAP_CACHE_DIR
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else SETTINGS.SOAP_CACHE_TTL_SECONDS
+        self.max_bytes = max_bytes if max_bytes is not None else SETTINGS.SOAP_CACHE_MAX_BYTES
+        # digest -> (tamaño en disco, momento de escritura); el orden es el de uso (LRU primero)
+        self._index: "OrderedDict[str, tuple]" = OrderedDict()
+        self._total_bytes = 0
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(service: str, *parts) -> str:
+        """Digest de la consulta, p. ej. make_key('pedimento_completo', aduana, patente, pedimento)"""
+        raw = '|'.join(str(part) for part in (service,) + parts)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], digest + self.SUFFIX)
+
+    def _load_index(self):
+        """
+        Reconstruye el índice a partir de los archivos existentes (más viejos
+        primero) y borra los temporales que dejó una escritura interrumpida
+        """
+        entries = []
+        stale_before = time.time() - STALE_TEMP_SECONDS
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(self.SUFFIX):
+                    stat = os.stat(os.path.join(root, name))
+                    entries.append((stat.st_mtime, name[:-len(self.SUFFIX)], stat.st_size))
+                elif name.endswith(self.TEMP_SUFFIX):
+                    path = os.path.join(root, name)
+                    try:
+                        if os.stat(path).st_mtime < stale_before:
+                            os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+        for mtime, digest, size in sorted(entries):
+            self._index[digest] = (size, mtime)
+            self._total_bytes += size
+        self._evict()
+
+    def _remove(self, digest: str):
+        size, _ = self._index.pop(digest)
+        self._total_bytes -= size
+        try:
+            os.unlink(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while self._index and self._total_bytes > self.max_bytes:
+            self._remove(next(iter(self._index)))
+            self._stats['evictions'] += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cuerpo de la respuesta o None si no está o ya expiró"""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            if time.time() - entry[1] > self.ttl_seconds:
+                self._remove(key)
+                self._stats['expired'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._index.move_to_end(key)
+            path = self._path(key)
+        try:
+            with gzip.open(path, 'rb') as file:
+                body = file.read()
+        except (OSError, EOFError):
+            with self._lock:
+                if key in self._index:
+                    self._remove(key)
+                self._stats['misses'] += 1
+            return None
+        with self._lock:
+            self._stats['hits'] += 1
+        return body
+
+    def put(self, key: str, body: bytes):
+        """
+        Guarda el cuerpo comprimido; escritura atómica vía archivo temporal
+
+        Raises:
+            OSError: Si no se pudo escribir (disco lleno, permisos); el
+                temporal se borra para que no quede fuera de max_bytes
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=self.TEMP_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(gzip.compress(body))
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        size = os.path.getsize(path)
+        with self._lock:
+            if key in self._index:
+                self._total_bytes -= self._index.pop(key)[0]
+            self._index[key] = (size, time.time())
+            self._total_bytes += size
+            self._stats['stores'] += 1
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, 'entries': len(self._index), 'bytes': self._total_bytes}
@@ -0,0 +1,204 @@
+"""
+Política de reintentos para las peticiones SOAP a VUCEM.
+
+Clasifica cada fallo, reintenta solo los transitorios con backoff exponencial
+acotado + jitter y limita el total de reintentos del proceso con un
+presupuesto global, para que un pedimento muerto no dispare ráfagas de
+peticiones contra VUCEM.
+"""
+
+import random
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+import httpx
+
+from config.settings import SETTINGS
+from utils.soap_errors import detect_soap_error
+
+# Tipos de fallo
+CONNECT_TIMEOUT = "connect_timeout"
+READ_TIMEOUT = "read_timeout"
+CONNECTION_ERROR = "connection_error"
+THROTTLED = "throttled"
+SERVER_ERROR = "server_error"
+CLIENT_ERROR = "client_error"
+CREDENTIALS_ERROR = "credentials_error"
+SOAP_FAULT = "soap_fault"
+UNKNOWN = "unknown"
+
+# Fallos que vale la pena reintentar: el mismo request puede funcionar después
+TRANSIENT_FAILURES = frozenset({
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    CONNECTION_ERROR,
+    THROTTLED,
+    SERVER_ERROR,
+})
+
+
+def classify_response(response: httpx.Response) -> Optional[str]:
+    """
+    Clasifica una respuesta HTTP
+
+    Returns:
+        Tipo de fallo o None si la respuesta es exitosa
+    """
+    status = response.status_code
+    if status < 400:
+        return None
+    if status in (401, 403):
+        return CREDENTIALS_ERROR
+    if status == 429:
+        return THROTTLED
+    if status >= 500:
+        # VUCEM responde 500 con tieneError=true para errores de negocio;
+        # esos no cambian al reintentar. Un S:Fault con faultcode Client
+        # indica una petición mal formada, que tampoco se corrige sola
+        error = detect_soap_error(response.content)
+        if error is None:
+            return SERVER_ERROR
+        if not error.fault:
+            return SOAP_FAULT
+        if error.codigo and _local_code(error.codigo) == 'Client':
+            return CLIENT_ERROR
+        return SERVER_ERROR
+    return CLIENT_ERROR
+
+
+def _local_code(codigo: str) -> str:
+    """faultcode sin prefijo: 'S:Client' -> 'Client'"""
+    return codigo.rpartition(':')[2]
+
+
+def classify_exception(error: Exception) -> str:
+    """Clasifica una excepción lanzada al hacer la petición"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return classify_response(error.response) or UNKNOWN
+    if isinstance(error, httpx.ConnectTimeout):
+        return CONNECT_TIMEOUT
+    if isinstance(error, httpx.TimeoutException):
+        return READ_TIMEOUT
+    if isinstance(error, (httpx.NetworkError, httpx.RemoteProtocolError)):
+        return CONNECTION_ERROR
+    return UNKNOWN
+
+
+class RetryBudget:
+    """
+    Presupuesto global de reintentos.
+
+    Cada petición deposita `ratio` fichas y cada reintento consume una, así
+    que a largo plazo los reintentos no pasan de `ratio` veces el tráfico
+    normal. `reserve` es el saldo inicial (y máximo) para absorber ráfagas.
+    """
+
+    def __init__(self, ratio: float, reserve: int):
+        self.ratio = ratio
+        self.reserve = reserve
+        self._balance = float(reserve)
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self._balance = min(self.reserve, self._balance + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._balance >= 1:
+                self._balance -= 1
+                return True
+            return False
+
+    def refund(self):
+        """Devuelve una ficha tomada con try_spend() que al final no se usó"""
+        with self._lock:
+            self._balance = min(self.reserve, self._balance + 1)
+
+    @property
+    def balance(self) -> float:
+        return self._balance
+
+
+class RetryPolicy:
+    """
+    Decide si un fallo se reintenta y cuánto esperar, y lleva las
+    estadísticas de reintentos por endpoint.
+    """
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float,
+                 budget: RetryBudget = None, retryable=TRANSIENT_FAILURES):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.retryable = retryable
+        self._stats: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> "RetryPolicy":
+        """Política configurada con las variables SOAP_RETRY_* de SETTINGS"""
+        return cls(
+            max_attempts=SETTINGS.SOAP_RETRY_MAX_ATTEMPTS,
+            base_delay=SETTINGS.SOAP_RETRY_BASE_DELAY_SECONDS,
+            max_delay=SETTINGS.SOAP_RETRY_MAX_DELAY_SECONDS,
+            budget=RetryBudget(
+                ratio=SETTINGS.SOAP_RETRY_BUDGET_RATIO,
+                reserve=SETTINGS.SOAP_RETRY_BUDGET_RESERVE
+            )
+        )
+
+    def _endpoint_stats(self, endpoint: str) -> dict:
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = self._stats[endpoint] = {
+                'requests': 0,
+                'retries': 0,
+                'budget_exhausted': 0,
+                'failures': Counter(),
+            }
+        return stats
+
+    def record_request(self, endpoint: str):
+        """Registra una petición nueva (no cuenta reintentos)"""
+        with self._lock:
+            self._endpoint_stats(endpoint)['requests'] += 1
+        if self.budget:
+            self.budget.record_request()
+
+    def should_retry(self, endpoint: str, failure: str, attempt: int, max_attempts: int = None) -> bool:
+        """
+        Registra el fallo del intento `attempt` (1-based) y decide si reintentar
+
+        Args:
+            endpoint: Endpoint de la petición
+            failure: Tipo de fallo (ver constantes del módulo)
+            attempt: Número de intento que acaba de fallar
+            max_attempts: Límite de intentos para esta petición (default self.max_attempts)
+        """
+        max_attempts = max_attempts or self.max_attempts
+        with self._lock:
+            stats = self._endpoint_stats(endpoint)
+            stats['failures'][failure] += 1
+            if failure not in self.retryable or attempt >= max_attempts:
+                return False
+            if self.budget and not self.budget.try_spend():
+                stats['budget_exhausted'] += 1
+                return False
+            stats['retries'] += 1
+            return True
+
+    def backoff(self, attempt: int) -> float:
+        """Espera antes del siguiente intento: backoff exponencial con full jitter"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    def stats(self) -> Dict[str, dict]:
+        """Copia de las estadísticas por endpoint"""
+        with self._lock:
+            return {
+                endpoint: {**stats, 'failures': dict(stats['failures'])}
+                for endpoint, stats in self._stats.items()
+            }
@@ -0,0 +1,276 @@
+"""
+Feed de servicios pendientes: un productor y varios consumidores.
+
+Un hilo productor recorre el listado paginado de
+customs/procesamientopedimentos/ por delante de los consumidores y deja cada
+servicio en una cola acotada; los hilos de trabajo toman servicios sueltos,
+así que una página lenta no deja hilos ociosos. La cola llena frena al
+productor: nunca se adelanta más de `maxsize` servicios.
+
+El listado filtra estado=1 y los consumidores cambian el estado mientras el
+productor avanza, así que las páginas se recorren de nuevo desde el inicio
+(otra "pasada") hasta que una pasada completa no trae servicios nuevos. Los
+ids ya encolados se ignoran, de modo que un servicio que sigue pendiente
+(p. ej. circuito abierto) no se procesa dos veces en la misma corrida.
+
+En modo continuo (daemon) el productor no termina: cuando una pasada no trae
+nada nuevo espera con backoff exponencial entre idle_min_seconds e
+idle_max_seconds y vuelve a consultar; los ids vistos se olvidan después de
+seen_ttl segundos para reintentar los servicios que quedaron pendientes.
+
+La cola es una FairQueue (utils/fair_queue.py): los consumidores reciben
+los servicios repartidos por importador en vez de en el orden de la API. Si
+un importador ya tiene su tope de servicios encolados, los suyos se dejan
+para la siguiente pasada y el productor sigue leyendo hasta lookahead_pages
+páginas sin nada que encolar, buscando servicios de otros importadores.
+Con batch_size > 1 los consumidores iteran batches(): micro-lotes de
+servicios del mismo importador y tipo (ver FairQueue.get_batch).
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.debug_logger import get_logger
+from utils.fair_queue import FairQueue
+
+logger = get_logger(__name__)
+
+# Cada cuánto revisa el productor si el feed se cerró mientras espera lugar en la cola
+_PUT_POLL_SECONDS = 0.5
+
+
+@dataclass
+class FeedItem:
+    """Servicio encolado junto con los datos de su página"""
+    service: Dict[str, Any]
+    organizacion: str = ''
+    page: int = 0
+    envelope: Optional[bytes] = None
+
+
+@dataclass
+class FeedStats:
+    pages: int = 0
+    sweeps: int = 0
+    services: int = 0
+    duplicates: int = 0
+    deferred: int = 0  # Servicios dejados para otra pasada por el tope del importador
+    idle_polls: int = 0
+    last_poll: float = field(default_factory=time.time)  # Última página leída con éxito
+    # Acotado: en modo continuo una API caída agrega un error por consulta
+    errors: deque = field(default_factory=lambda: deque(maxlen=100))
+
+
+class ServiceFeed:
+    """
+    Productor de servicios pendientes sobre una cola acotada
+
+    Uso:
+        feed = ServiceFeed(fetch_page).start()
+        for item in feed:      # en cada hilo consumidor
+            ...
+        feed.close()
+
+    o, por micro-lotes del mismo importador y tipo:
+        for batch in feed.batches():
+            ...
+    """
+
+    def __init__(self, fetch_page: Callable[[int], Optional[dict]],
+                 prepare_page: Callable[[List[dict]], Dict[Any, bytes]] = None,
+                 start_page: int = 1, end_page: int = None, maxsize: int = 50,
+                 continuous: bool = False, idle_min_seconds: float = 1.0,
+                 idle_max_seconds: float = 60.0, seen_ttl: float = 300.0,
+                 scheduler: FairQueue = None, lookahead_pages: int = 20,
+                 batch_size: int = 1, batch_delay: float = 0.0):
+        """
+        Args:
+            fetch_page: Devuelve la respuesta paginada de la API para una página (None si falla)
+            prepare_page: Opcional; recibe los servicios nuevos de una página y devuelve
+                          envelopes por id de servicio (ver MainProcess._render_page_envelopes)
+            start_page: Primera página de cada pasada
+            end_page: Última página; None recorre el feed completo hasta vaciarlo.
+                      Con límite se hace una sola pasada
+            maxsize: Servicios que el productor puede tener encolados por delante
+            continuous: No terminar al vaciar el feed; seguir consultando hasta close()
+            idle_min_seconds: Espera tras la primera pasada sin servicios nuevos (modo continuo)
+            idle_max_seconds: Tope de la espera, que se duplica en cada pasada vacía
+            seen_ttl: Segundos tras los que un id ya encolado puede volver a encolarse
+            scheduler: Cola con reparto por importador (default FairQueue(maxsize)
+                       sin pesos ni topes); si se da, maxsize no se usa
+            lookahead_pages: Páginas seguidas sin nada que encolar tras las que
+                             la pasada se corta mientras hay servicios diferidos
+            batch_size: Servicios máximos por micro-lote en batches()
+            batch_delay: Segundos que batches() espera a completar un micro-lote
+        """
+        self.fetch_page = fetch_page
+        self.prepare_page = prepare_page
+        self.start_page = start_page
+        self.end_page = end_page
+        self.continuous = continuous
+        self.idle_min_seconds = idle_min_seconds
+        self.idle_max_seconds = idle_max_seconds
+        self.seen_ttl = seen_ttl
+        self.lookahead_pages = lookahead_pages
+        self.batch_size = max(1, batch_size)
+        self.batch_delay = batch_delay
+        self.stats = FeedStats()
+        self.scheduler = scheduler or FairQueue(max(1, maxsize))
+        self._seen: Dict[Any, float] = {}
+        self._closed = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> 'ServiceFeed':
+        self._thread = threading.Thread(target=self._produce, name="ServiceFeed", daemon=True)
+        self._thread.start()
+        return self
+
+    def get(self) -> Optional[FeedItem]:
+        """Siguiente servicio; None cuando el feed terminó. Llamar task_done(item) al terminarlo"""
+        return self.scheduler.get()
+
+    def task_done(self, item: FeedItem):
+        self.scheduler.task_done(item)
+
+    def __iter__(self):
+        """Itera servicios; cada uno se da por terminado al pedir el siguiente"""
+        while True:
+            item = self.get()
+            if item is None:
+                return
+            try:
+                yield item
+            finally:
+                self.task_done(item)
+
+    def batches(self):
+        """Itera micro-lotes (listas de FeedItem); se dan por terminados al pedir el siguiente"""
+        while True:
+            batch = self.scheduler.get_batch(self.batch_size, self.batch_delay)
+            if not batch:
+                return
+            try:
+                yield batch
+            finally:
+                for item in batch:
+                    self.task_done(item)
+
+    def close(self):
+        """Detiene el productor (si sigue corriendo) y espera a que termine"""
+        self._closed.set()
+        while self._thread is not None and self._thread.is_alive():
+            # Sin consumidores la cola puede estar llena: se vacía para que
+            # el productor no quede esperando lugar y pueda salir
+            self.scheduler.clear()
+            self._thread.join(timeout=_PUT_POLL_SECONDS)
+        self.scheduler.clear()
+        self.scheduler.finish()
+
+    def _put(self, item) -> bool:
+        """Encola esperando lugar; False si el importador está en su tope o el feed se cerró"""
+        while not self._closed.is_set():
+            try:
+                return self.scheduler.put(item, timeout=_PUT_POLL_SECONDS)
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        idle = self.idle_min_seconds
+        try:
+            while not self._closed.is_set():
+                self.stats.sweeps += 1
+                nuevos, diferidos = self._sweep()
+                if diferidos:
+                    # Hay servicios esperando lugar en la subcola de su importador:
+                    # otra pasada cuando los consumidores avancen
+                    self.scheduler.wait_for_change(_PUT_POLL_SECONDS)
+                if not self.continuous:
+                    if (self.end_page is not None and not diferidos) or (nuevos == 0 and diferidos == 0):
+                        break
+                    continue
+                if nuevos or diferidos:
+                    idle = self.idle_min_seconds
+                    continue
+                # Sin trabajo nuevo: esperar cada vez más, interrumpible por close()
+                self.stats.idle_polls += 1
+                self._closed.wait(idle)
+                idle = min(idle * 2, self.idle_max_seconds)
+                self._forget_expired()
+        except Exception as e:
+            error_msg = f"Error en el productor de servicios: {str(e)}"
+            logger.error("%s", error_msg)
+            self.stats.errors.append(error_msg)
+        finally:
+            # Los consumidores terminan al vaciarse la cola
+            self.scheduler.finish()
+
+    def _forget_expired(self):
+        limit = time.monotonic() - self.seen_ttl
+        for service_id in [service_id for service_id, seen in self._seen.items() if seen < limit]:
+            del self._seen[service_id]
+
+    def _sweep(self):
+        """
+        Recorre las páginas una vez
+
+        Returns:
+            (servicios nuevos encolados, servicios diferidos por el tope de su importador)
+        """
+        nuevos = diferidos = 0
+        pages_without_new = 0
+        page = self.start_page
+        while not self._closed.is_set() and (self.end_page is None or page <= self.end_page):
+            data = self.fetch_page(page)
+            if not data:
+                # Con el listado encogiéndose la página puede ya no existir;
+                # si hay servicios pendientes los encontrará la siguiente pasada
+                if page == self.start_page or self.end_page is not None:
+                    self.stats.errors.append(f"No se pudieron obtener servicios para página {page}")
+                break
+            self.stats.pages += 1
+            self.stats.last_poll = time.time()
+
+            services = []
+            for service in data.get('results', []):
+                service_id = service.get('id')
+                if service_id is not None:
+                    if service_id in self._seen:
+                        self.stats.duplicates += 1
+                        continue
+                    self._seen[service_id] = time.monotonic()
+                services.append(service)
+
+            envelopes = self.prepare_page(services) if self.prepare_page and services else {}
+            organizacion = data.get('organizacion', '')
+            encolados = 0
+            for service in services:
+                item = FeedItem(service, organizacion, page, envelopes.get(service.get('id')))
+                if not self._put(item):
+                    if self._closed.is_set():
+                        return nuevos, diferidos
+                    # Subcola del importador llena: se vuelve a leer en otra pasada
+                    self._seen.pop(service.get('id'), None)
+                    diferidos += 1
+                    self.stats.deferred += 1
+                    continue
+                encolados += 1
+                self.stats.services += 1
+            nuevos += encolados
+            logger.debug("Página %s: %s servicios nuevos encolados", page, encolados)
+
+            pages_without_new = 0 if encolados else pages_without_new + 1
+            if diferidos and pages_without_new >= self.lookahead_pages:
+                break
+            if not data.get('next'):
+                break
+            page += 1
+        return nuevos, diferidos
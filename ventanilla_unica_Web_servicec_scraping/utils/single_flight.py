@@ -0,0 +1,123 @@
+"""
+Coalescencia de llamadas idénticas concurrentes ("single flight").
+
+Si varios hilos piden lo mismo al mismo tiempo, solo el primero hace la
+llamada; los demás esperan y reciben el mismo resultado (o la misma
+excepción). Al terminar la llamada la clave se libera, así que esto no es
+un cache: solo une duplicados que están en vuelo a la vez.
+"""
+
+import asyncio
+import hashlib
+import re
+import threading
+from typing import Dict
+
+# Encabezado WS-Security con usuario y contraseña de VUCEM
+_SECURITY_HEADER = re.compile(rb'<(?:\w+:)?Security\b.*?</(?:\w+:)?Security>', re.S)
+
+
+def soap_request_key(endpoint: str, content: bytes) -> str:
+    """
+    Clave de coalescencia de una petición SOAP: endpoint + consulta sin credenciales
+
+    Dos importadores con credenciales distintas que piden el mismo pedimento
+    obtienen la misma respuesta de VUCEM, así que las credenciales no forman
+    parte de la clave.
+    """
+    query = _SECURITY_HEADER.sub(b'', content or b'')
+    return f"{endpoint}|{hashlib.sha256(query).hexdigest()}"
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Une llamadas concurrentes con la misma clave en una sola ejecución"""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._stats = {'calls': 0, 'coalesced': 0}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn):
+        """
+        Ejecuta fn() salvo que ya haya una llamada en vuelo con la misma clave
+
+        Args:
+            key: Clave de la llamada
+            fn: Función sin argumentos a ejecutar
+
+        Returns:
+            El resultado de fn(), compartido con todas las llamadas coalescidas
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats['calls'] += 1
+            else:
+                self._stats['coalesced'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+
+class AsyncSingleFlight:
+    """Versión asyncio de SingleFlight; fn devuelve una corrutina"""
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._stats = {'calls': 0, 'coalesced': 0}
+
+    async def do(self, key: str, fn):
+        future = self._calls.get(key)
+        if future is not None:
+            self._stats['coalesced'] += 1
+            # shield: si un seguidor se cancela no debe cancelar la llamada del líder
+            return await asyncio.shield(future)
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self._stats['calls'] += 1
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Evita el aviso de "exception was never retrieved" si nadie más espera
+            future.exception()
+            raise
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return dict(self._stats)
@@ -0,0 +1,116 @@
+"""
+Detección de errores en las respuestas SOAP de VUCEM.
+
+VUCEM marca los errores de negocio con <tieneError>true</tieneError> al
+inicio de la respuesta y los errores de infraestructura con un S:Fault.
+En lugar de decodificar y recorrer toda la respuesta (varios MB en
+pedimento completo) se alimenta un parser incremental por bloques y se
+detiene en cuanto se sabe el resultado, casi siempre en los primeros KB.
+El parser resuelve los prefijos, así que no depende de que el namespace
+se llame ns3, y no confunde texto de los datos con elementos.
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Union
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+# El primer bloque es chico porque tieneError suele estar en el primer KB;
+# los siguientes se duplican hasta CHUNK_SIZE para respuestas sin indicador
+FIRST_CHUNK_SIZE = 512
+CHUNK_SIZE = 65536
+
+_MENSAJE_TAGS = frozenset({'mensaje', 'descripcion', 'faultstring'})
+_CODIGO_TAGS = frozenset({'codigo', 'codigoError', 'clave', 'faultcode'})
+
+
+@dataclass(frozen=True)
+class SOAPError:
+    """Error reportado por VUCEM en una respuesta SOAP"""
+    mensaje: Optional[str] = None
+    codigo: Optional[str] = None
+    fault: bool = False  # True si es un S:Fault, False si es tieneError=true
+
+
+def _local(tag: str) -> str:
+    return tag.rpartition('}')[2]
+
+
+def _text(elem) -> Optional[str]:
+    text = (elem.text or '').strip()
+    return text or None
+
+
+def detect_soap_error(content: Union[bytes, bytearray, str],
+                      chunk_size: int = CHUNK_SIZE) -> Optional[SOAPError]:
+    """
+    Busca el indicador de error de una respuesta SOAP leyendo solo lo necesario
+
+    Args:
+        content: Cuerpo de la respuesta (bytes o str)
+        chunk_size: Tamaño máximo de los bloques con que se alimenta el parser
+
+    Returns:
+        SOAPError con el mensaje/código si la respuesta trae tieneError=true o
+        un S:Fault; None si tieneError=false o no hay indicador de error
+    """
+    if not content:
+        return None
+    raw = content.encode('utf-8') if isinstance(content, str) else content
+    # Sin ninguna de las dos marcas no hay nada que parsear
+    if b'tieneError' not in raw and b'Fault' not in raw:
+        return None
+    data = memoryview(raw)
+
+    parser = XMLPullParser(events=('start', 'end'))
+    # Una vez visto tieneError=true (o el Fault) se recogen mensaje/código
+    # hasta cerrar el elemento que lo contiene
+    collecting_until = None
+    fault = False
+    mensaje = codigo = None
+    depth = 0
+
+    try:
+        offset, size = 0, min(FIRST_CHUNK_SIZE, chunk_size)
+        while offset < len(data):
+            parser.feed(data[offset:offset + size])
+            offset += size
+            size = min(size * 2, chunk_size)
+            for event, elem in parser.read_events():
+                name = _local(elem.tag)
+                if event == 'start':
+                    depth += 1
+                    if collecting_until is None:
+                        if name == 'Fault':
+                            collecting_until, fault = depth, True
+                        elif any(_local(key) == 'tieneError' and value.strip().lower() == 'true'
+                                 for key, value in elem.attrib.items()):
+                            collecting_until = depth
+                    continue
+
+                depth -= 1
+                if collecting_until is None:
+                    if name == 'tieneError':
+                        if (elem.text or '').strip().lower() != 'true':
+                            return None
+                        # El error viene en los hermanos de tieneError
+                        collecting_until = depth
+                elif depth + 1 == collecting_until:
+                    return SOAPError(mensaje, codigo, fault)
+                elif name in _MENSAJE_TAGS and mensaje is None:
+                    mensaje = _text(elem)
+                elif name in _CODIGO_TAGS and codigo is None:
+                    codigo = _text(elem)
+                elem.clear()
+        parser.close()
+    except ParseError:
+        # Respuesta truncada o mal formada: conservar lo ya detectado y, si no
+        # se alcanzó el indicador, caer a la búsqueda simple en bytes
+        if collecting_until is not None:
+            return SOAPError(mensaje, codigo, fault)
+        if b'tieneError>true<' in raw:
+            return SOAPError()
+        return None
+
+    if collecting_until is not None:
+        return SOAPError(mensaje, codigo, fault)
+    return None
@@ -0,0 +1,51 @@
+"""
+Bytes transferidos por endpoint SOAP.
+
+Todas las peticiones a VUCEM piden compresión (Accept-Encoding) y httpx
+descomprime el cuerpo por bloques conforme lo lee del socket, así que la
+respuesta comprimida nunca se guarda completa en memoria. Aquí se lleva la
+cuenta de lo que viajó por la red frente a lo que se obtuvo descomprimido
+para ver cuánto ahorra la compresión en cada servicio.
+"""
+
+import threading
+from typing import Dict
+
+import httpx
+
+
+def wire_bytes(response: httpx.Response) -> int:
+    """Bytes del cuerpo tal como llegaron por la red (comprimidos si aplica)"""
+    if response.num_bytes_downloaded:
+        return response.num_bytes_downloaded
+    # Respuestas que no vinieron de un socket (p. ej. MockTransport en pruebas)
+    content_length = response.headers.get('Content-Length')
+    return int(content_length) if content_length else len(response.content)
+
+
+class TransferStats:
+    """Bytes comprimidos vs descomprimidos por endpoint"""
+
+    def __init__(self):
+        self._stats: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, response: httpx.Response):
+        """Registra una respuesta ya leída"""
+        wire = wire_bytes(response)
+        decoded = len(response.content)
+        compressed = bool(response.headers.get('Content-Encoding'))
+        with self._lock:
+            stats = self._stats.get(endpoint)
+            if stats is None:
+                stats = self._stats[endpoint] = {
+                    'responses': 0, 'compressed_responses': 0, 'wire_bytes': 0, 'decoded_bytes': 0
+                }
+            stats['responses'] += 1
+            stats['compressed_responses'] += int(compressed)
+            stats['wire_bytes'] += wire
+            stats['decoded_bytes'] += decoded
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return {endpoint: dict(stats) for endpoint, stats in self._stats.items()}
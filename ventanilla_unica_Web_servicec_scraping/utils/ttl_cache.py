@@ -0,0 +1,169 @@
+"""
+Cache en memoria con TTL por entrada, refresco anticipado y cache negativo.
+
+Pensado para datos que se leen en cada servicio y cambian rara vez (p. ej.
+credenciales VUCEM por importador):
+
+- Las lecturas no toman lock: cada entrada es una tupla inmutable que se
+  reemplaza entera, así que un hilo ve la entrada vieja o la nueva.
+- Cada entrada vence a los `ttl` segundos. Pasado `refresh_ahead` del TTL
+  (fracción, p. ej. 0.8) la siguiente lectura devuelve el valor vigente y
+  dispara la recarga en segundo plano, así los hilos de trabajo no esperan
+  a la API cuando el valor vence.
+- Los resultados "negativos" (por defecto None) se guardan con
+  `negative_ttl`, más corto, para no consultar en cada servicio una clave
+  que no tiene datos pero sí ver pronto cuando aparecen.
+- La carga de una misma clave es single-flight: los hilos que fallan el
+  cache al mismo tiempo comparten una sola llamada al loader.
+
+Si el loader lanza una excepción no se guarda nada (un error de red no es
+un resultado negativo); en un refresco en segundo plano el valor anterior
+se sigue sirviendo hasta que vence.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable
+
+from utils.debug_logger import get_logger
+from utils.single_flight import SingleFlight
+
+logger = get_logger(__name__)
+
+_Entry = namedtuple('_Entry', 'value negative expires_at refresh_at')
+
+
+class TTLCache:
+    """Cache thread-safe de loader(key) con TTL, refresh-ahead y cache negativo"""
+
+    def __init__(self, loader: Callable, ttl: float, negative_ttl: float = None,
+                 refresh_ahead: float = 0.8, is_negative: Callable = None,
+                 name: str = 'cache', clock=time.monotonic):
+        """
+        Args:
+            loader: Función key -> valor que consulta la fuente
+            ttl: Segundos de vida de un valor positivo
+            negative_ttl: Segundos de vida de un resultado negativo (default = ttl)
+            refresh_ahead: Fracción del TTL tras la que se recarga en segundo plano
+                (>= 1 o <= 0 lo desactiva)
+            is_negative: Predicado valor -> bool (default: valor is None)
+            name: Prefijo de los hilos de refresco
+        """
+        self._loader = loader
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.refresh_ahead = refresh_ahead
+        self._is_negative = is_negative or (lambda value: value is None)
+        self._name = name
+        self._clock = clock
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._single_flight = SingleFlight()
+        self._refreshing = set()
+        self._executor = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'negative_hits': 0, 'misses': 0, 'loads': 0,
+                       'refreshes': 0, 'errors': 0, 'refresh_errors': 0}
+
+    def get(self, key: Hashable):
+        """
+        Valor de la clave: del cache si está vigente, si no desde el loader
+
+        Raises:
+            La excepción del loader si la clave no está en cache y la carga falla
+        """
+        entry = self._entries.get(key)
+        now = self._clock()
+        if entry is not None and now < entry.expires_at:
+            self._count('negative_hits' if entry.negative else 'hits')
+            if now >= entry.refresh_at:
+                self._schedule_refresh(key)
+            return entry.value
+
+        self._count('misses')
+        try:
+            return self._single_flight.do(key, lambda: self._load(key))
+        except Exception:
+            self._count('errors')
+            raise
+
+    def __contains__(self, key: Hashable) -> bool:
+        """True si la clave tiene una entrada vigente (positiva o negativa)"""
+        entry = self._entries.get(key)
+        return entry is not None and self._clock() < entry.expires_at
+
+    def put(self, key: Hashable, value):
+        """Guarda un valor obtenido por fuera del loader (p. ej. en una consulta masiva)"""
+        self._store(key, value)
+
+    def values(self) -> list:
+        """Valores positivos vigentes"""
+        now = self._clock()
+        return [entry.value for entry in list(self._entries.values())
+                if not entry.negative and now < entry.expires_at]
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _load(self, key: Hashable):
+        value = self._loader(key)
+        self._store(key, value)
+        self._count('loads')
+        return value
+
+    def _store(self, key: Hashable, value):
+        negative = self._is_negative(value)
+        ttl = self.negative_ttl if negative else self.ttl
+        now = self._clock()
+        refresh_at = now + ttl * self.refresh_ahead if 0 < self.refresh_ahead < 1 else now + ttl
+        with self._lock:
+            self._entries[key] = _Entry(value, negative, now + ttl, refresh_at)
+
+    def _schedule_refresh(self, key: Hashable):
+        with self._lock:
+            if self._closed or key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"{self._name}-refresh")
+            executor = self._executor
+        executor.submit(self._refresh, key)
+
+    def _refresh(self, key: Hashable):
+        try:
+            self._single_flight.do(key, lambda: self._load(key))
+            self._count('refreshes')
+        except Exception as e:
+            # Se sigue sirviendo el valor anterior hasta que venza
+            self._count('refresh_errors')
+            logger.warning("Error al refrescar %s en segundo plano: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def close(self):
+        """Detiene los refrescos en segundo plano"""
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['negative_entries'] = sum(1 for entry in self._entries.values() if entry.negative)
+        stats['coalesced'] = self._single_flight.stats()['coalesced']
+        return stats